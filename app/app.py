@@ -25,14 +25,18 @@ def create_app():
     # Configure CORS with proper settings
     CORS(app, 
          origins=["http://localhost:5173"],
-         allow_headers=["Content-Type", "Authorization", "Accept"],
-         expose_headers=["Content-Disposition", "Content-Length", "Content-Type"],
+         allow_headers=["Content-Type", "Authorization", "Accept", "Idempotency-Key",
+                        "Range", "If-None-Match", "If-Range", "If-Modified-Since", "Upload-Offset"],
+         expose_headers=["Content-Disposition", "Content-Length", "Content-Type",
+                         "Content-Range", "Accept-Ranges", "ETag", "Last-Modified", "Upload-Offset"],
          supports_credentials=True,
          methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
          max_age=3600)
 
     # Basic Configuration
     app.config["SECRET_KEY"] = os.getenv("SECRET_KEY")
+    # Behind nginx/Apache, let the proxy send files instead of the worker
+    app.config["USE_X_SENDFILE"] = os.getenv("USE_X_SENDFILE", "False").lower() == "true"
 
     # Email Configuration
     app.config.update(
@@ -65,6 +69,9 @@ def create_app():
     from app.controllers.reports_controller import reports_bp
     from app.controllers.billing_controller import billing_bp
     from app.controllers.prescription_controller import prescription_bp
+    from app.controllers.metrics_controller import metrics_bp
+    from app.controllers.search_controller import search_bp
+    from app.controllers.patient_controller import patient_bp
 
     app.register_blueprint(reports_bp, url_prefix="/api/reports")
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
@@ -72,6 +79,28 @@ def create_app():
     app.register_blueprint(appointment_bp, url_prefix="/api/appointments")
     app.register_blueprint(billing_bp, url_prefix="/api/billing")
     app.register_blueprint(prescription_bp, url_prefix="/api/prescriptions")
+    app.register_blueprint(metrics_bp, url_prefix="/api/metrics")
+    app.register_blueprint(search_bp, url_prefix="/api/search")
+    app.register_blueprint(patient_bp, url_prefix="/api/patients")
+
+    # Make sure the indexes backing our queries exist
+    from app.services.db_indexes import ensure_indexes
+    ensure_indexes()
+
+    # Revenue reports read rollup rows; build them once for existing payments
+    from app.controllers.billing_controller import revenue_rollup
+    try:
+        revenue_rollup.seed_if_empty()
+    except Exception as e:
+        logger.error(f"Failed to seed revenue rollups: {str(e)}")
+
+    # Resume report conversions queued before a restart
+    from app.controllers.reports_controller import report_jobs, uploads_compactor
+    report_jobs.start()
+    # Reclaim orphaned and expired files under uploads/ in the background.
+    # It deletes files, so it only runs where it has been switched on.
+    if os.getenv("UPLOADS_COMPACTOR_ENABLED", "False").lower() == "true":
+        uploads_compactor.start()
 
     # Configure email notifier
     email_notifier.set_mailer(send_otp_email)
@@ -85,8 +114,8 @@ def create_app():
         response.headers.update({
             'Access-Control-Allow-Origin': 'http://localhost:5173',
             'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-            'Access-Control-Allow-Headers': 'Content-Type, Authorization, Accept',
-            'Access-Control-Expose-Headers': 'Content-Disposition, Content-Length, Content-Type'
+            'Access-Control-Allow-Headers': 'Content-Type, Authorization, Accept, Idempotency-Key, Range, If-None-Match, If-Range, If-Modified-Since, Upload-Offset',
+            'Access-Control-Expose-Headers': 'Content-Disposition, Content-Length, Content-Type, Content-Range, Accept-Ranges, ETag, Last-Modified, Upload-Offset'
         })
         return response
 
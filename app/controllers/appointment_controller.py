@@ -5,8 +5,16 @@ from app.middleware.auth_middleware import token_required
 from app.services.observer.appointment_subject import AppointmentSubject
 from app.services.observer.appointment_logger import AppointmentLogger
 from app.services.appointment_factory import AppointmentFactory
+from app.services.slot_reservation import SlotReservationService, SlotAlreadyBookedError
+from app.services.availability_calendar import AvailabilityCalendar
+from app.utils.pagination import paginate, parse_page_size, InvalidCursorError
+from app.models.datetime_codec import APPOINTMENT_CODEC, combine, day_range
 from bson import ObjectId
-from datetime import datetime
+from pymongo.errors import PyMongoError
+from datetime import datetime, timedelta
+import logging
+
+logger = logging.getLogger(__name__)
 
 appointment_bp = Blueprint("appointment", __name__)
 
@@ -20,23 +28,114 @@ appointment_subject = AppointmentSubject()
 appointment_logger = AppointmentLogger()
 appointment_subject.attach(appointment_logger)
 appointment_factory = AppointmentFactory()
+slot_reservation = SlotReservationService(appointments_collection)
+availability_calendar = AvailabilityCalendar(db_instance["DoctorCalendar"], appointments_collection)
+
+MAX_AVAILABILITY_DAYS = 31
+MAX_BULK_APPOINTMENTS = 100
+
+REQUIRED_APPOINTMENT_FIELDS = [
+    "patient_email", "patient_name", "doctor_email",
+    "doctor_name", "date", "time", "status", "payment_id"
+]
+INVALID_SCHEDULE_ERROR = "Invalid date or time. Use YYYY-MM-DD and HH:MM."
 
 
-# GET: Retrieve all appointments
+def update_calendar(write, *args):
+    """
+    Apply a calendar write after the appointment change it follows has been
+    stored. A failure is logged rather than failing a request whose booking
+    already happened; python -m app.services.availability_calendar repairs it.
+    """
+    try:
+        write(*args)
+    except PyMongoError as e:
+        logger.error(f"Availability calendar not updated by {write.__name__}{args}: {str(e)}")
+
+
+def build_appointment_document(data):
+    # Create appointment using factory and add the fields stored alongside it
+    appointment = appointment_factory.create_appointment(data)
+    appointment_data = appointment.to_dict()
+    appointment_data.update({
+        "patient_name": data["patient_name"],
+        "doctor_name": data["doctor_name"],
+        "payment_id": data["payment_id"]
+    })
+    return appointment_data
+
+
+# GET: Retrieve appointments, one keyset-paginated page at a time
+# Query params: doctor_email, patient_email, status, from, to (YYYY-MM-DD), limit, cursor
 
 @appointment_bp.route("/", methods=["GET"])
 @token_required
 def get_all_appointments(decoded_token):
     try:
-        appointments = list(appointments_collection.find({}, {"password": 0}))
+        query = {}
+        for field in ("doctor_email", "patient_email", "status"):
+            if request.args.get(field):
+                query[field] = request.args[field]
+
+        try:
+            scheduled_range = day_range(request.args.get("from"), request.args.get("to"))
+        except ValueError:
+            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+        if scheduled_range:
+            query["scheduled_at"] = scheduled_range
+
+        try:
+            limit = parse_page_size(request.args.get("limit"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        try:
+            appointments, next_cursor = paginate(
+                appointments_collection, query, "scheduled_at", limit,
+                cursor=request.args.get("cursor"),
+                projection={"password": 0}
+            )
+        except InvalidCursorError as e:
+            return jsonify({"error": str(e)}), 400
+
         for appointment in appointments:
-            if "_id" in appointment:
-                appointment["_id"] = str(appointment["_id"])
-        return jsonify({"appointments": appointments}), 200
+            appointment["_id"] = str(appointment["_id"])
+            APPOINTMENT_CODEC.to_wire(appointment)
+        return jsonify({"appointments": appointments, "next_cursor": next_cursor}), 200
     except Exception as e:
         return jsonify({"error": "Failed to retrieve appointments", "details": str(e)}), 500
 
 
+# GET: Free and booked slots of a doctor, from the precomputed calendar
+# Query params: doctor_email, from, to (YYYY-MM-DD, at most MAX_AVAILABILITY_DAYS days)
+
+@appointment_bp.route("/availability", methods=["GET"])
+@token_required
+def get_doctor_availability(decoded_token):
+    doctor_email = request.args.get("doctor_email")
+    if not doctor_email:
+        return jsonify({"error": "doctor_email is required"}), 400
+
+    try:
+        start = datetime.strptime(request.args.get("from", datetime.now().strftime("%Y-%m-%d")), "%Y-%m-%d").date()
+        end = datetime.strptime(request.args["to"], "%Y-%m-%d").date() if request.args.get("to") else start + timedelta(days=6)
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+
+    if end < start or (end - start).days >= MAX_AVAILABILITY_DAYS:
+        return jsonify({"error": f"Date range must cover 1 to {MAX_AVAILABILITY_DAYS} days"}), 400
+
+    try:
+        days = availability_calendar.availability(doctor_email, start, end)
+        return jsonify({
+            "doctor_email": doctor_email,
+            "slot_minutes": availability_calendar.slot_minutes,
+            "days": days
+        }), 200
+    except Exception as e:
+        return jsonify({"error": "Failed to retrieve availability", "details": str(e)}), 500
+
+
 # POST: Create a new appointment
 
 @appointment_bp.route("/", methods=["POST"])
@@ -44,21 +143,18 @@ def get_all_appointments(decoded_token):
 def create_appointment(decoded_token):
     try:
         data = request.json
-        print(f"Received appointment data: {data}")
-        
-        required_fields = [
-            "patient_email", "patient_name", "doctor_email", 
-            "doctor_name", "date", "time", "status", "payment_id"
-        ]
-        
+
         # Validate required fields
-        missing_fields = [field for field in required_fields if not data.get(field)]
+        missing_fields = [field for field in REQUIRED_APPOINTMENT_FIELDS if not data.get(field)]
         if missing_fields:
             return jsonify({
                 "error": f"Missing required appointment fields: {', '.join(missing_fields)}",
                 "success": False
             }), 400
 
+        if combine(data["date"], data["time"]) is None:
+            return jsonify({"error": INVALID_SCHEDULE_ERROR, "success": False}), 400
+
         # Verify payment exists
         payment = billing_collection.find_one({"transaction_id": data["payment_id"]})
         if not payment:
@@ -73,50 +169,32 @@ def create_appointment(decoded_token):
                 "success": False
             }), 400
 
-        # Check for duplicate appointments
-        existing_appointment = appointments_collection.find_one({
-            "doctor_email": data["doctor_email"],
-            "date": data["date"],
-            "time": data["time"],
-            "status": {"$ne": "Cancelled"}
-        })
+        # Create appointment using factory
+        appointment_data = build_appointment_document(data)
         
-        if existing_appointment:
+        # Insert into database; the unique slot index rejects double bookings
+        try:
+            new_appt = slot_reservation.reserve(appointment_data)
+        except SlotAlreadyBookedError:
             return jsonify({
                 "error": "This time slot is already booked",
                 "success": False
             }), 400
-        
-        # Create appointment using factory
-        appointment = appointment_factory.create_appointment(data)
-        appointment_data = appointment.to_dict()
-        appointment_data.update({
-            "patient_name": data["patient_name"],
-            "doctor_name": data["doctor_name"],
-            "payment_id": data["payment_id"],
-            "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        })
-        
-        # Insert into database
-        result = appointments_collection.insert_one(appointment_data)
-        
-        # Get the created appointment
-        new_appt = appointments_collection.find_one({"_id": result.inserted_id})
-        if not new_appt:
-            return jsonify({
-                "error": "Failed to retrieve created appointment",
-                "success": False
-            }), 500
+            
+        if slot_reservation.holds_slot(new_appt.get("status")):
+            update_calendar(availability_calendar.book, new_appt["doctor_email"], new_appt["date"], new_appt["time"])
             
         # Convert ObjectId to string for JSON serialization
         new_appt["_id"] = str(new_appt["_id"])
         
         # Notify observers
         appointment_subject.notify_creation(new_appt)
+
+        # Observers may still be reading new_appt, so format a copy for the response
+        new_appt = APPOINTMENT_CODEC.to_wire(dict(new_appt))
         
-        print(f"Successfully created appointment: {new_appt}")
-        
+        logger.info(f"Created appointment {new_appt['_id']}")
+
         return jsonify({
             "message": "Appointment created successfully",
             "appointment": new_appt,
@@ -124,13 +202,121 @@ def create_appointment(decoded_token):
         }), 201
 
     except Exception as e:
-        print(f"Error creating appointment: {str(e)}")
+        logger.error(f"Error creating appointment: {str(e)}")
         return jsonify({
             "error": f"Failed to create appointment: {str(e)}",
             "success": False
         }), 500
 
 
+# POST: Book a batch of appointments (e.g. a recurring series) at once
+# Body: {"appointments": [<same fields as POST />], ...}
+# Each item is reported on separately; valid items are booked even if others fail.
+
+@appointment_bp.route("/bulk", methods=["POST"])
+@token_required
+def create_appointments_bulk(decoded_token):
+    try:
+        items = (request.json or {}).get("appointments")
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "appointments must be a non-empty list", "success": False}), 400
+        if len(items) > MAX_BULK_APPOINTMENTS:
+            return jsonify({
+                "error": f"At most {MAX_BULK_APPOINTMENTS} appointments can be booked at once",
+                "success": False
+            }), 400
+
+        results = [None] * len(items)
+
+        def reject(index, error):
+            results[index] = {"index": index, "success": False, "error": error}
+
+        # Validate required fields
+        candidates = []
+        for index, data in enumerate(items):
+            if not isinstance(data, dict):
+                reject(index, "Appointment must be an object")
+                continue
+            missing_fields = [field for field in REQUIRED_APPOINTMENT_FIELDS if not data.get(field)]
+            if missing_fields:
+                reject(index, f"Missing required appointment fields: {', '.join(missing_fields)}")
+            elif combine(data["date"], data["time"]) is None:
+                reject(index, INVALID_SCHEDULE_ERROR)
+            else:
+                candidates.append(index)
+
+        # Verify all payments with one query
+        payment_ids = list({items[i]["payment_id"] for i in candidates})
+        payments = {
+            payment["transaction_id"]: payment
+            for payment in billing_collection.find(
+                {"transaction_id": {"$in": payment_ids}},
+                {"_id": 0, "transaction_id": 1, "patient_email": 1}
+            )
+        }
+
+        # Detect clashes inside the batch and against the database in one pass
+        slots = {}
+        accepted = []
+        for index in candidates:
+            data = items[index]
+            payment = payments.get(data["payment_id"])
+            if not payment:
+                reject(index, "Invalid payment reference")
+                continue
+            if payment["patient_email"] != data["patient_email"]:
+                reject(index, "Payment reference does not match patient")
+                continue
+            if slot_reservation.holds_slot(data["status"]):
+                slot = (data["doctor_email"], data["date"], data["time"])
+                if slot in slots:
+                    reject(index, "This time slot is booked twice in the batch")
+                    continue
+                slots[slot] = index
+            accepted.append(index)
+
+        for slot in slot_reservation.find_booked(list(slots)):
+            reject(slots[slot], "This time slot is already booked")
+
+        to_insert = [
+            (index, build_appointment_document(items[index]))
+            for index in accepted if results[index] is None
+        ]
+
+        # Write the batch; the unique slot index still guards against concurrent bookings
+        failures = slot_reservation.reserve_many([doc for _, doc in to_insert])
+        created = []
+        for position, (index, appointment_data) in enumerate(to_insert):
+            if position in failures:
+                reject(index, failures[position])
+                continue
+            appointment_data["_id"] = str(appointment_data["_id"])
+            results[index] = {"index": index, "success": True, "appointment": APPOINTMENT_CODEC.to_wire(dict(appointment_data))}
+            created.append(appointment_data)
+
+        update_calendar(availability_calendar.book_many, [
+            (appt["doctor_email"], appt["date"], appt["time"])
+            for appt in created if appt.get("slot_active")
+        ])
+
+        # Notify observers once for the whole batch
+        if created:
+            appointment_subject.notify_bulk_creation(created)
+
+        return jsonify({
+            "message": f"{len(created)} of {len(items)} appointments created",
+            "results": results,
+            "success": bool(created)
+        }), 201 if created else 400
+
+    except Exception as e:
+        logger.error(f"Error creating appointments in bulk: {str(e)}")
+        return jsonify({
+            "error": f"Failed to create appointments: {str(e)}",
+            "success": False
+        }), 500
+
+
 # PUT: Update appointment status
 
 @appointment_bp.route("/<appointment_id>", methods=["PUT"])
@@ -141,21 +327,28 @@ def update_appointment_status(decoded_token, appointment_id):
         if "status" not in data:
             return jsonify({"error": "Status field is required"}), 400
 
-        # Get the current appointment to check old status
-        current_appointment = appointments_collection.find_one({"_id": ObjectId(appointment_id)})
+        new_status = data["status"]
+
+        # Update the status (claiming or releasing the slot) and get the old document back
+        try:
+            current_appointment = slot_reservation.change_status(appointment_id, new_status)
+        except SlotAlreadyBookedError:
+            return jsonify({"error": "This time slot is already booked"}), 400
         if not current_appointment:
             return jsonify({"error": "Appointment not found"}), 404
 
         old_status = current_appointment.get("status")
-        new_status = data["status"]
-
-        # Update the appointment status
-        result = appointments_collection.update_one(
-            {"_id": ObjectId(appointment_id)},
-            {"$set": {"status": new_status}}
-        )
+        # A booking that lost its slot in the backfill never counted in the calendar
+        held_before = bool(current_appointment.get(SlotReservationService.ACTIVE_FIELD))
+        holds_now = slot_reservation.holds_slot(new_status)
+        if held_before != holds_now:
+            slot_args = (current_appointment["doctor_email"], current_appointment["date"], current_appointment["time"])
+            if holds_now:
+                update_calendar(availability_calendar.book, *slot_args)
+            else:
+                update_calendar(availability_calendar.release, *slot_args)
 
-        if result.modified_count > 0:
+        if old_status != new_status:
             # Notify observers about the status change
             appointment_subject.set_status(appointment_id, old_status, new_status)
             return jsonify({"message": "Appointment status updated successfully"}), 200
@@ -172,9 +365,11 @@ def update_appointment_status(decoded_token, appointment_id):
 @token_required
 def delete_appointment(decoded_token, appointment_id):
     try:
-        result = appointments_collection.delete_one({"_id": ObjectId(appointment_id)})
-        if result.deleted_count == 0:
+        deleted = appointments_collection.find_one_and_delete({"_id": ObjectId(appointment_id)})
+        if not deleted:
             return jsonify({"error": "Appointment not found"}), 404
+        if deleted.get("slot_active"):
+            update_calendar(availability_calendar.release, deleted["doctor_email"], deleted["date"], deleted["time"])
         return jsonify({"message": "Appointment deleted successfully"}), 200
     except Exception as e:
         return jsonify({"error": "Failed to delete appointment", "details": str(e)}), 500
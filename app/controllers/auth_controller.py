@@ -1,11 +1,17 @@
 from flask import Blueprint, request, jsonify
-from app.models.user_model import users_collection
-from app.utils.encryption import hash_password, check_password
+from app.models.user_model import users_collection, db_instance
+from app.utils.encryption import (
+    check_password, needs_rehash, rehash_in_background, hash_password_async, wait_for_hash, PasswordHasherBusyError
+)
 from app.utils.jwt_auth import generate_jwt
+from app.middleware.auth_middleware import token_required, revocation_list, token_id
 from app.utils.mailer import send_otp_email
 from app.services.observer.auth_observer import AuthSubject, AuthLogger, EmailNotifier
+from app.services.otp_store import (
+    create_otp_store, OTP_VALID, OTP_EXPIRED, OTP_NOT_FOUND, OTP_TOO_MANY_ATTEMPTS
+)
 from random import randint
-from datetime import datetime, timedelta
+from datetime import datetime
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/api/auth")
 
@@ -17,9 +23,16 @@ email_notifier.set_mailer(send_otp_email)
 auth_subject.attach(auth_logger)
 auth_subject.attach(email_notifier)
 
+# OTPs live in their own store, not on the Users documents
+otp_store = create_otp_store(db_instance)
+OTP_TTL_SECONDS = 600
+
 def gen_otp():
     return f"{randint(100000, 999999)}"
 
+def hasher_busy_response(e):
+    return jsonify({"error": str(e)}), 503, {"Retry-After": "1"}
+
 # ─── SIGNUP ────────────────────────────────────────────────────────────────
 @auth_bp.route("/signup", methods=["POST"])
 def signup():
@@ -32,24 +45,25 @@ def signup():
     if not all([name, email, password, role]):
         return jsonify({"error": "All fields are required"}), 400
 
+    # Hash while checking the email is free
+    hashing = hash_password_async(password)
     if users_collection.find_one({"email": email}):
+        hashing.cancel()
         return jsonify({"error": "Email already registered"}), 400
 
     try:
-        # Hash & store user with is_verified=False
-        hashed_pw = hash_password(password)
+        # Store user with is_verified=False
+        hashed_pw = wait_for_hash(hashing)
         signup_otp = gen_otp()
-        otp_expires = datetime.utcnow() + timedelta(minutes=10)
         
         users_collection.insert_one({
             "name": name,
             "email": email,
             "password": hashed_pw,
             "role": role,
-            "is_verified": False,
-            "otp": signup_otp,
-            "otp_expiry": otp_expires
+            "is_verified": False
         })
+        otp_store.issue(email, "signup", signup_otp, OTP_TTL_SECONDS)
 
         # Notify observers about OTP generation
         auth_subject.notify(
@@ -61,6 +75,8 @@ def signup():
         return jsonify({
             "message": "Signup successful. Please verify your email with the OTP sent."
         }), 201
+    except PasswordHasherBusyError as e:
+        return hasher_busy_response(e)
     except Exception as e:
         return jsonify({"error": f"Failed to complete signup: {str(e)}"}), 500
 
@@ -71,19 +87,16 @@ def verify_email():
     email = data.get("email")
     otp   = data.get("otp")
 
-    user = users_collection.find_one({"email": email})
-    if not user:
-        return jsonify({"error": "User not found"}), 404
+    if not all([email, otp]):
+        return jsonify({"error": "Email and OTP are required"}), 400
 
-    if user.get("otp") == otp and datetime.utcnow() < user.get("otp_expiry"):
-        users_collection.update_one(
-            {"email": email},
-            {"$set": {"is_verified": True},
-             "$unset": {"otp": "", "otp_expiry": ""}}
-        )
-        return jsonify({"message": "Email verified successfully"}), 200
+    if otp_store.verify(email, "signup", otp) != OTP_VALID:
+        return jsonify({"error": "Invalid or expired OTP"}), 400
 
-    return jsonify({"error": "Invalid or expired OTP"}), 400
+    result = users_collection.update_one({"email": email}, {"$set": {"is_verified": True}})
+    if result.matched_count == 0:
+        return jsonify({"error": "User not found"}), 404
+    return jsonify({"message": "Email verified successfully"}), 200
 
 # ─── LOGIN STEP 1: CREDENTIALS ─────────────────────────────────────────────
 @auth_bp.route("/login", methods=["POST"])
@@ -96,43 +109,38 @@ def login():
         return jsonify({"error": "Email and password are required"}), 400
 
     user = users_collection.find_one({"email": email})
-    if not user or not check_password(user["password"], password):
-        return jsonify({"error": "Invalid email or password"}), 401
+    try:
+        if not user or not check_password(user["password"], password):
+            return jsonify({"error": "Invalid email or password"}), 401
+    except PasswordHasherBusyError as e:
+        return hasher_busy_response(e)
 
     if not user.get("is_verified", False):
         return jsonify({"error": "Please verify your email first"}), 401
 
+    # Upgrade hashes made with an outdated bcrypt cost, off the request path
+    if needs_rehash(user["password"]):
+        old_hash = user["password"]
+        rehash_in_background(password, lambda new_hash: users_collection.update_one(
+            {"email": email, "password": old_hash},
+            {"$set": {"password": new_hash}}
+        ))
+
     try:
         # Generate and store login OTP
         login_otp = gen_otp()
-        expires_at = datetime.utcnow() + timedelta(minutes=10)
-        
-        result = users_collection.update_one(
-            {"email": email},
-            {"$set": {
-                "otp": login_otp,
-                "otp_expiry": expires_at
-            }}
-        )
+        otp_store.issue(email, "login", login_otp, OTP_TTL_SECONDS)
 
-        if result.modified_count > 0:
-            # Notify observers about OTP generation
-            auth_subject.notify(
-                "OTP_GENERATED",
-                email,
-                {"otp": login_otp, "type": "login"}
-            )
-            return jsonify({
-                "message": "OTP sent to your email",
-                "step": "verify_otp"
-            }), 200
-        else:
-            auth_subject.notify(
-                "OTP_FAILED",
-                email,
-                {"error": "Failed to update user record"}
-            )
-            return jsonify({"error": "Failed to generate OTP"}), 500
+        # Notify observers about OTP generation
+        auth_subject.notify(
+            "OTP_GENERATED",
+            email,
+            {"otp": login_otp, "type": "login"}
+        )
+        return jsonify({
+            "message": "OTP sent to your email",
+            "step": "verify_otp"
+        }), 200
 
     except Exception as e:
         auth_subject.notify(
@@ -158,32 +166,25 @@ def verify_login_otp():
             auth_subject.notify("VERIFICATION_FAILED", email, {"error": "User not found"})
             return jsonify({"error": "User not found"}), 404
 
-        stored_otp = user.get("otp")
-        otp_expiry = user.get("otp_expiry")
+        # Checks the code and consumes it on success
+        outcome = otp_store.verify(email, "login", otp)
 
-        if not stored_otp or not otp_expiry:
+        if outcome == OTP_NOT_FOUND:
             auth_subject.notify("VERIFICATION_FAILED", email, {"error": "No OTP request found"})
             return jsonify({"error": "No OTP request found"}), 400
 
-        if datetime.utcnow() > otp_expiry:
-            # Clear expired OTP
-            users_collection.update_one(
-                {"email": email},
-                {"$unset": {"otp": "", "otp_expiry": ""}}
-            )
+        if outcome == OTP_EXPIRED:
             auth_subject.notify("VERIFICATION_FAILED", email, {"error": "OTP expired"})
             return jsonify({"error": "OTP has expired"}), 400
 
-        if stored_otp != otp:
+        if outcome == OTP_TOO_MANY_ATTEMPTS:
+            auth_subject.notify("VERIFICATION_FAILED", email, {"error": "Too many attempts"})
+            return jsonify({"error": "Too many attempts. Please log in again to get a new OTP"}), 429
+
+        if outcome != OTP_VALID:
             auth_subject.notify("VERIFICATION_FAILED", email, {"error": "Invalid OTP"})
             return jsonify({"error": "Invalid OTP"}), 400
 
-        # Clear OTP fields after successful verification
-        users_collection.update_one(
-            {"email": email},
-            {"$unset": {"otp": "", "otp_expiry": ""}}
-        )
-
         # Generate JWT with complete user info
         token = generate_jwt({
             "email": user["email"],
@@ -206,3 +207,18 @@ def verify_login_otp():
     except Exception as e:
         auth_subject.notify("VERIFICATION_FAILED", email, {"error": str(e)})
         return jsonify({"error": f"Failed to verify OTP: {str(e)}"}), 500
+
+# ─── LOGOUT: REVOKE THE CURRENT TOKEN ──────────────────────────────────────
+@auth_bp.route("/logout", methods=["POST"])
+@token_required
+def logout(decoded_token):
+    try:
+        raw_token = request.headers["Authorization"].split(" ")[1]
+        revocation_list.revoke(
+            token_id(decoded_token, raw_token),
+            datetime.utcfromtimestamp(decoded_token["exp"])
+        )
+        auth_subject.notify("LOGOUT", decoded_token.get("email"), None)
+        return jsonify({"message": "Logged out successfully"}), 200
+    except Exception as e:
+        return jsonify({"error": f"Failed to log out: {str(e)}"}), 500
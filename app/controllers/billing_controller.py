@@ -1,14 +1,31 @@
 # app/controllers/billing_controller.py
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, Response, stream_with_context
 from app.services.db_connection import DatabaseConnection
 from app.middleware.auth_middleware import token_required
+from app.middleware.idempotency_middleware import idempotent
 from app.models.billing_model import BillingModel
+from app.models.datetime_codec import BILLING_CODEC, day_range
 from app.services.payment_service import CardPaymentStrategy, PaymentProcessor
+from app.services.revenue_rollup import RevenueRollup
+from app.utils.money import Money, InvalidAmountError
+from datetime import datetime
+import csv
+import io
+import json
+import zlib
 
 billing_bp = Blueprint("billing", __name__)
 db_instance = DatabaseConnection().get_database()
 billing_collection = db_instance["Billing"]
+revenue_rollup = RevenueRollup(db_instance["RevenueRollups"], billing_collection)
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FIELDS = [
+    "transaction_id", "patient_email", "patient_name", "doctor_email", "doctor_name",
+    "amount", "amount_cents", "card_number", "card_holder", "expiry_date", "schedule_date", "schedule_time",
+    "payment_date", "payment_time", "paid_at", "payment_status", "created_at"
+]
 
 
 # GET: Retrieve all billing records (admin)
@@ -18,16 +35,104 @@ billing_collection = db_instance["Billing"]
 def get_all_billings(decoded_token):
     try:
         # Retrieve every billing document, exclude _id
-        payments = list(billing_collection.find({}, {"_id": 0}))
+        payments = BILLING_CODEC.to_wire_many(billing_collection.find({}, {"_id": 0}))
         return jsonify({"payments": payments}), 200
     except Exception as e:
         return jsonify({"error": f"Failed to fetch billing data: {str(e)}"}), 500
 
 
+def export_value(value):
+    # JSON encoder fallback for the non-JSON types stored in Billing
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def export_row(payment):
+    # Both formats write datetimes the same way, csv would otherwise use str()
+    return {field: export_value(value) if isinstance(value, datetime) else value
+            for field, value in payment.items()}
+
+
+# GET: Stream billing records for finance exports
+# Query params: format=ndjson|csv, from, to (payment date, YYYY-MM-DD), doctor_email, gzip=1
+# Rows go from a batched cursor straight to the client, so memory stays flat however many there are.
+
+@billing_bp.route("/export", methods=["GET"])
+@token_required
+def export_billings(decoded_token):
+    export_format = request.args.get("format", "ndjson").lower()
+    if export_format not in ("ndjson", "csv"):
+        return jsonify({"error": "Invalid format. Supported formats: ndjson, csv"}), 400
+
+    query = {}
+    if request.args.get("doctor_email"):
+        query["doctor_email"] = request.args["doctor_email"]
+    try:
+        paid_range = day_range(request.args.get("from"), request.args.get("to"))
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+    if paid_range:
+        query["paid_at"] = paid_range
+
+    use_gzip = request.args.get("gzip", "").lower() in ("1", "true", "yes")
+    projection = {"_id": 0, **{field: 1 for field in EXPORT_FIELDS}}
+    cursor = billing_collection.find(query, projection).batch_size(EXPORT_BATCH_SIZE)
+
+    def rows():
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            for payment in cursor:
+                writer.writerow(export_row(payment))
+                if buffer.tell() >= 64 * 1024:
+                    yield buffer.getvalue().encode("utf-8")
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue().encode("utf-8")
+        else:
+            chunk = []
+            size = 0
+            for payment in cursor:
+                line = json.dumps(export_row(payment), default=export_value) + "\n"
+                chunk.append(line)
+                size += len(line)
+                if size >= 64 * 1024:
+                    yield "".join(chunk).encode("utf-8")
+                    chunk, size = [], 0
+            yield "".join(chunk).encode("utf-8")
+
+    def gzipped(chunks):
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+        for data in chunks:
+            compressed = compressor.compress(data)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
+
+    def stream():
+        try:
+            yield from (gzipped(rows()) if use_gzip else rows())
+        finally:
+            cursor.close()
+
+    extension = "csv" if export_format == "csv" else "ndjson"
+    filename = f"billing_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}" + (".gz" if use_gzip else "")
+    mimetype = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return Response(
+        stream_with_context(stream()),
+        mimetype="application/gzip" if use_gzip else mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
 # POST: process_payment (updated)
+# Send an Idempotency-Key header to make retries safe: a repeat returns the first response.
 
 @billing_bp.route("/", methods=["POST"])
 @token_required
+@idempotent
 def process_payment(decoded_token):
     try:
         data = request.json
@@ -46,10 +151,10 @@ def process_payment(decoded_token):
 
         # Validate amount format
         try:
-            amount = float(data["amount"])
-            if amount <= 0:
+            amount = Money.parse(data["amount"])
+            if amount.cents <= 0:
                 return jsonify({"error": "Invalid amount"}), 400
-        except ValueError:
+        except InvalidAmountError:
             return jsonify({"error": "Invalid amount format"}), 400
             
         # Strategy Pattern implementation
@@ -67,7 +172,7 @@ def process_payment(decoded_token):
                     patient_name=data["patient_name"],
                     doctor_email=data["doctor_email"],
                     doctor_name=data["doctor_name"],
-                    amount=data["amount"],
+                    amount=amount,
                     card_number=data["card_number"],
                     card_holder=data["card_holder"],
                     expiry_date=data["expiry_date"],
@@ -80,7 +185,14 @@ def process_payment(decoded_token):
                 )
                 
                 # Save to database
-                billing_collection.insert_one(billing.to_dict())
+                billing_doc = billing.to_dict()
+                billing_collection.insert_one(billing_doc)
+
+                # Keep the hospital revenue report current; a rebuild repairs any miss
+                try:
+                    revenue_rollup.record_payment(billing_doc)
+                except Exception as rollup_error:
+                    print(f"Failed to update revenue rollup: {str(rollup_error)}")
                 
                 return jsonify({
                     "message": "Payment processed successfully",
@@ -113,7 +225,7 @@ def get_payment_history(decoded_token, email):
         query = {"patient_email": email}
         print(f"Query: {query}")
         
-        payments = list(billing_collection.find(
+        payments = BILLING_CODEC.to_wire_many(billing_collection.find(
             query,
             {"_id": 0}  # Exclude MongoDB _id
         ))
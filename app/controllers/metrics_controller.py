@@ -0,0 +1,22 @@
+# app/controllers/metrics_controller.py
+from flask import Blueprint, jsonify
+from app.middleware.auth_middleware import token_required, token_cache, revocation_list
+from app.services.observer.event_bus import event_bus
+from app.controllers.reports_controller import conversion_cache, pdf_text_cache, uploads_compactor
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+# GET: Runtime counters of the in-process subsystems
+
+@metrics_bp.route("/", methods=["GET"])
+@token_required
+def get_metrics(decoded_token):
+    return jsonify({
+        "event_bus": event_bus.stats(),
+        "token_cache": token_cache.stats(),
+        "token_revocation": revocation_list.stats(),
+        "conversion_cache": conversion_cache.stats(),
+        "pdf_text_cache": pdf_text_cache.stats(),
+        "uploads_compactor": uploads_compactor.stats()
+    }), 200
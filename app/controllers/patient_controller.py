@@ -0,0 +1,33 @@
+# app/controllers/patient_controller.py
+from flask import Blueprint, request, jsonify
+from app.middleware.auth_middleware import token_required
+from app.services.hms_facade import HMSFacade
+from app.utils.pagination import parse_page_size
+
+patient_bp = Blueprint("patient", __name__)
+facade = HMSFacade()
+
+DEFAULT_CHART_SECTION_SIZE = 20
+MAX_CHART_SECTION_SIZE = 100
+
+
+# GET: A patient's prescriptions, reports, appointments and payments in one response
+# Query params: doctor_email, limit (per section)
+
+@patient_bp.route("/<email>/chart", methods=["GET"])
+@token_required
+def get_patient_chart(decoded_token, email):
+    # Patients only ever see their own chart
+    if decoded_token.get("role") == "patient" and decoded_token.get("email") != email:
+        return jsonify({"error": "Patients can only view their own chart"}), 403
+
+    try:
+        limit = parse_page_size(request.args.get("limit"), DEFAULT_CHART_SECTION_SIZE, MAX_CHART_SECTION_SIZE)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        chart = facade.get_patient_chart(email, request.args.get("doctor_email"), limit)
+        return jsonify({"patient_email": email, "limit": limit, **chart}), 200
+    except Exception as e:
+        return jsonify({"error": "Failed to fetch patient chart", "details": str(e)}), 500
@@ -2,11 +2,18 @@ from flask import Blueprint, request, jsonify
 from app.services.db_connection import DatabaseConnection
 from app.middleware.auth_middleware import token_required
 from app.models.prescription_model import PrescriptionModel
+from app.models.datetime_codec import PRESCRIPTION_CODEC, parse_timestamp
+from datetime import datetime
 from app.services.hms_facade import HMSFacade #  Facade Design Pattern applied here
+from app.services.search_index import SearchIndex
+import logging
+
+logger = logging.getLogger(__name__)
 
 prescription_bp = Blueprint("prescription", __name__)
 db_instance = DatabaseConnection().get_database()
 prescription_collection = db_instance["Prescriptions"]
+search_index = SearchIndex(db_instance["SearchIndex"])
 facade = HMSFacade()
 
 @prescription_bp.route("/", methods=["POST"])
@@ -27,9 +34,14 @@ def create_prescription(decoded_token):
             "patient_name": data.get("patient_name"),
             "tests": data.get("tests", []),
             "tests_total": data.get("tests_total", 0),
-            "createdAt": data.get("createdAt")
+            "created_at": parse_timestamp(data.get("createdAt")) or datetime.now()
         }
         prescription_collection.insert_one(prescription_doc)
+        try:
+            search_index.index_prescription(prescription_doc)
+        except Exception as e:
+            # Searchable again after the next backfill; the prescription itself is saved
+            logger.error(f"Failed to index prescription {prescription_doc['_id']}: {str(e)}")
         # Update appointment status to 'visited' for this patient and doctor
         db_instance["Appointments"].update_many(
             {
@@ -53,7 +65,7 @@ def get_prescriptions(decoded_token):
         query["patient_email"] = patient_email
     if doctor_email:
         query["doctor_email"] = doctor_email
-    prescriptions = list(prescription_collection.find(query, {"_id": 0}))
+    prescriptions = PRESCRIPTION_CODEC.to_wire_many(prescription_collection.find(query, {"_id": 0}))
     return jsonify({"prescriptions": prescriptions}), 200
 
 @prescription_bp.route("/records", methods=["GET"])
@@ -1,18 +1,29 @@
-from flask import Blueprint, jsonify, request, send_from_directory, Response, make_response, send_file
+from flask import Blueprint, jsonify, request, send_from_directory, make_response, send_file
 from app.services.db_connection import DatabaseConnection
 from app.middleware.auth_middleware import token_required
+from app.services.revenue_rollup import RevenueRollup
+from app.services.report_formats import JSONAdapter, render_report, FORMAT_ADAPTERS
+from app.services.conversion_cache import ConversionCache
+from app.services.uploads_compactor import create_uploads_compactor
+from app.services.blob_store import BlobStore
+from app.services.upload_sessions import (
+    UploadSessionStore, UploadError, UploadNotFoundError, UploadOffsetMismatchError,
+    UploadTooLargeError, UploadChecksumMismatchError, UPLOAD_COMPLETE
+)
+from app.utils.files import file_sha256
+from app.services.report_jobs import create_report_job_queue, JOB_QUEUED, SEARCH_STEP
+from app.services.search_index import SearchIndex, KIND_REPORT
+from app.utils.money import Money, InvalidAmountError
+from app.services.analytics_engine import AnalyticsEngine, load_billing_columns, load_appointment_columns
 from datetime import datetime
 from abc import ABC, abstractmethod
+from werkzeug.exceptions import HTTPException
 from werkzeug.utils import secure_filename
 from werkzeug.wsgi import FileWrapper
 import os
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-import json
 from bson import ObjectId
 import mimetypes
 import logging
-import PyPDF2
 import io
 
 # Configure logging
@@ -45,26 +56,21 @@ class AllReportsAdapter(ReportAdapter):
                     d[k] = v.isoformat()
         return {"reports": data}
 
-# Concrete Adapter for Hospital Reports
+# Concrete Adapter for Hospital Reports, served from the materialized revenue rollups
 class HospitalReportsAdapter(ReportAdapter):
-    def __init__(self, collection):
-        self.collection = collection
+    def __init__(self, revenue_rollup):
+        self.revenue_rollup = revenue_rollup
 
     def get_data(self, query_params=None):
-        query = {}
+        start = end = None
         if query_params and 'start' in query_params and 'end' in query_params:
             try:
-                start = datetime.strptime(query_params['start'], "%Y-%m-%d")
-                end   = datetime.strptime(query_params['end'],   "%Y-%m-%d")
-                query["date"] = {"$gte": start, "$lte": end}
+                start = datetime.strptime(query_params['start'], "%Y-%m-%d").strftime("%Y-%m-%d")
+                end   = datetime.strptime(query_params['end'],   "%Y-%m-%d").strftime("%Y-%m-%d")
             except Exception:
                 return None
 
-        pipeline = [
-            {"$match": query},
-            {"$group": {"_id": None, "totalEarnings": {"$sum": "$amount"}}}
-        ]
-        return list(self.collection.aggregate(pipeline))
+        return self.revenue_rollup.totals(start, end)
 
     def format_response(self, data):
         totalEarnings = data[0]["totalEarnings"] if data else 0
@@ -73,120 +79,60 @@ class HospitalReportsAdapter(ReportAdapter):
         ]
         return {"reports": report_data}
 
-# File Format Adapter Interface
-class FileFormatAdapter(ABC):
-    @abstractmethod
-    def convert_to_format(self, data, output_path):
-        """Convert data to specific format and save to output path"""
-        pass
-    
-    @abstractmethod
-    def convert_from_format(self, input_path):
-        """Convert from the format back to data dictionary"""
-        pass
-
-# PDF Adapter Implementation
-class PDFAdapter(FileFormatAdapter):
-    def convert_to_format(self, data, output_path):
-        try:
-            # Create a new PDF with ReportLab (more suitable for text content)
-            c = canvas.Canvas(output_path, pagesize=letter)
-            y = 750  # Starting y position from top
-            
-            # Add title
-            c.setFont("Helvetica-Bold", 16)
-            c.drawString(50, y, "Hospital Report")
-            y -= 30
-            
-            # Add report details
-            c.setFont("Helvetica", 12)
-            for key, value in data.items():
-                if key not in ['file', '_id'] and value is not None:  # Skip file and id fields
-                    # Format the key name
-                    key_name = key.replace('_', ' ').title()
-                    content = f"{key_name}: {str(value)}"
-                    
-                    # Handle long lines
-                    if len(content) > 70:  # If content is too long
-                        words = content.split()
-                        line = ""
-                        for word in words:
-                            if len(line + " " + word) < 70:
-                                line += " " + word
-                            else:
-                                c.drawString(50, y, line.strip())
-                                y -= 20
-                                line = word
-                        if line:  # Draw any remaining text
-                            c.drawString(50, y, line.strip())
-                    else:
-                        c.drawString(50, y, content)
-                    
-                    y -= 20
-                    
-                    # Add a new page if we're running out of space
-                    if y < 50:
-                        c.showPage()
-                        y = 750
-                        c.setFont("Helvetica", 12)
-            
-            c.save()
-            return True
-        except Exception as e:
-            logger.error(f"Error converting to PDF: {str(e)}")
-            return False
-
-    def convert_from_format(self, input_path):
-        try:
-            with open(input_path, 'rb') as file:
-                reader = PyPDF2.PdfReader(file)
-                text = ""
-                for page in reader.pages:
-                    text += page.extract_text()
-                return {"content": text}
-        except Exception as e:
-            logger.error(f"Error reading PDF: {str(e)}")
-            return None
-
-# JSON Adapter Implementation
-class JSONAdapter(FileFormatAdapter):
-    def convert_to_format(self, data, output_path):
-        try:
-            with open(output_path, 'w') as f:
-                json.dump(data, f, indent=4)
-            return True
-        except Exception as e:
-            logger.error(f"Error converting to JSON: {str(e)}")
-            return False
-            
-    def convert_from_format(self, input_path):
-        try:
-            with open(input_path, 'r') as f:
-                data = json.load(f)
-            return data
-        except Exception as e:
-            logger.error(f"Error converting from JSON: {str(e)}")
-            return None
-
 reports_bp         = Blueprint("reports", __name__)
 db_instance       = DatabaseConnection().get_database()
 billing_collection= db_instance["Billing"]
 reports_collection= db_instance["Reports"]
+appointments_collection = db_instance["Appointments"]
 
 # instantiate adapters
 all_reports_adapter      = AllReportsAdapter(reports_collection)
-hospital_reports_adapter = HospitalReportsAdapter(billing_collection)
-pdf_adapter              = PDFAdapter()
+revenue_rollup           = RevenueRollup(db_instance["RevenueRollups"], billing_collection)
+hospital_reports_adapter = HospitalReportsAdapter(revenue_rollup)
 json_adapter             = JSONAdapter()
-
-# Upload config
+pdf_text_cache           = FORMAT_ADAPTERS["pdf"].text_cache
+analytics_engine         = AnalyticsEngine(
+    lambda: load_billing_columns(billing_collection),
+    lambda: load_appointment_columns(appointments_collection)
+)
+
+# Upload config. Files are kept in the content-addressed blob store; the
+# flat reports folder only holds files uploaded before it existed.
 UPLOAD_FOLDER = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'uploads', 'reports'))
+BLOB_FOLDER = os.path.abspath(os.path.join(UPLOAD_FOLDER, '..', 'blobs'))
 ALLOWED_EXTENSIONS = {'pdf', 'jpg', 'jpeg', 'png', 'json'}
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+blob_store = BlobStore(BLOB_FOLDER, db_instance["Blobs"])
+search_index = SearchIndex(db_instance["SearchIndex"])
+upload_sessions = UploadSessionStore(
+    db_instance["UploadSessions"],
+    os.path.abspath(os.path.join(UPLOAD_FOLDER, '..', 'partial')),
+    blob_store
+)
+report_jobs = create_report_job_queue(db_instance, blob_store, search_index)
+
+# Converted downloads, see convert_report
+CONVERSION_CACHE_FOLDER = os.path.abspath(os.path.join(UPLOAD_FOLDER, '..', 'cache', 'conversions'))
+CONVERT_EXTENSIONS = {'pdf': 'pdf', 'text': 'txt', 'json': 'json'}
+conversion_cache = ConversionCache(CONVERSION_CACHE_FOLDER)
+
+uploads_compactor = create_uploads_compactor(db_instance, blob_store, upload_sessions, conversion_cache, UPLOAD_FOLDER,
+                                             pdf_text_cache)
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def stored_file_path(filename):
+    """
+    Where a file named on a report lives: the blob store for content-addressed
+    names, the legacy reports folder otherwise
+    """
+    digest = BlobStore.digest_of(filename)
+    if digest:
+        return blob_store.path(digest)
+    return os.path.join(UPLOAD_FOLDER, secure_filename(filename))
+
 @reports_bp.route("/all", methods=["GET"])
 @token_required
 def get_all_reports(decoded_token):
@@ -222,41 +168,186 @@ def get_hospital_reports(decoded_token):
             "details": str(e)
         }), 500
 
+def parse_analytics_range(args):
+    """
+    Optional from/to (YYYY-MM-DD) query params; raises ValueError when malformed
+    """
+    start, end = args.get("from"), args.get("to")
+    for value in (start, end):
+        if value:
+            datetime.strptime(value, "%Y-%m-%d")
+    return start or None, end or None
+
+@reports_bp.route("/analytics/revenue", methods=["GET"])
+@token_required
+def get_revenue_analytics(decoded_token):
+    group_by = request.args.get("group_by", "doctor")
+    if group_by not in ("doctor", "day", "week"):
+        return jsonify({"error": "group_by must be one of doctor, day, week"}), 400
+    try:
+        start, end = parse_analytics_range(request.args)
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+    try:
+        revenue = analytics_engine.revenue(group_by, start, end, request.args.get("doctor_email"))
+        return jsonify({"group_by": group_by, "revenue": revenue}), 200
+    except Exception as e:
+        return jsonify({
+            "error":   "Failed to compute revenue analytics.",
+            "details": str(e)
+        }), 500
+
+@reports_bp.route("/analytics/appointments", methods=["GET"])
+@token_required
+def get_appointment_volume_analytics(decoded_token):
+    try:
+        start, end = parse_analytics_range(request.args)
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+    try:
+        volumes = analytics_engine.appointment_volumes(start, end, request.args.get("doctor_email"))
+        return jsonify({"volumes": volumes, "total": sum(volumes.values())}), 200
+    except Exception as e:
+        return jsonify({
+            "error":   "Failed to compute appointment analytics.",
+            "details": str(e)
+        }), 500
+
+@reports_bp.route("/analytics/no-show", methods=["GET"])
+@token_required
+def get_no_show_analytics(decoded_token):
+    try:
+        start, end = parse_analytics_range(request.args)
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+    try:
+        return jsonify(analytics_engine.no_show_rates(start, end)), 200
+    except Exception as e:
+        return jsonify({
+            "error":   "Failed to compute no-show analytics.",
+            "details": str(e)
+        }), 500
+
+@reports_bp.route("/analytics/payment-percentiles", methods=["GET"])
+@token_required
+def get_payment_percentile_analytics(decoded_token):
+    try:
+        start, end = parse_analytics_range(request.args)
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+    try:
+        percentiles = [float(p) for p in request.args.get("percentiles", "50,75,90,95,99").split(",")]
+        if not all(0 <= p <= 100 for p in percentiles):
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": "percentiles must be comma-separated numbers between 0 and 100"}), 400
+    percentiles = tuple(int(p) if p.is_integer() else p for p in percentiles)
+    try:
+        stats = analytics_engine.payment_percentiles(percentiles, start, end, request.args.get("doctor_email"))
+        return jsonify(stats), 200
+    except Exception as e:
+        return jsonify({
+            "error":   "Failed to compute payment analytics.",
+            "details": str(e)
+        }), 500
+
+def build_report_data(fields, uploaded_by):
+    """
+    The report document for upload form fields (or the JSON of a resumable
+    upload); raises ValueError with a client-facing message when invalid
+    """
+    # Parse date and time if provided
+    report_date = fields.get("report_date", "") or ""
+    report_time = fields.get("report_time", "") or ""
+
+    # Combine date and time if both are provided
+    try:
+        if report_date and report_time:
+            report_datetime = datetime.strptime(f"{report_date} {report_time}", "%Y-%m-%d %H:%M")
+        elif report_date:
+            report_datetime = datetime.strptime(report_date, "%Y-%m-%d")
+        else:
+            report_datetime = datetime.now()
+    except ValueError:
+        raise ValueError("Invalid date or time format")
+
+    try:
+        amount = Money.parse(fields.get("amount") or 0)
+    except InvalidAmountError:
+        raise ValueError("Invalid amount format")
+
+    return {
+        "upload_date": report_datetime,
+        "uploaded_by": uploaded_by,
+        "patient_name": fields.get("patient_name", ""),
+        "patient_email": fields.get("patient_email", ""),
+        "doctor_email": fields.get("doctor_email", ""),
+        "service": fields.get("service", ""),
+        **amount.to_document(),
+        "status": "Unpaid",
+        "report_date": report_date,
+        "report_time": report_time
+    }
+
+def insert_report(report_data, filename, digest, size):
+    """
+    Insert a report whose original file is already in the blob store (the
+    caller's reference passes to the report, or is released if the insert
+    fails). Returns the report id.
+    """
+    report_data["original_file"] = BlobStore.name(digest, filename.rsplit('.', 1)[-1])
+    report_data["original_filename"] = filename
+    report_data["original_sha256"], report_data["original_size"] = digest, size
+    report_data["conversion_status"] = JOB_QUEUED
+
+    # Insert into DB
+    try:
+        result = reports_collection.insert_one(report_data)
+    except Exception:
+        blob_store.release(digest)
+        raise
+    if not result.inserted_id:
+        raise Exception("Failed to insert report into database")
+
+    # Searchable by its details right away; the job adds the file's text
+    report_id = result.inserted_id
+    try:
+        search_index.index_report(report_data)
+    except Exception as e:
+        logger.error(f"Failed to index report {report_id}: {str(e)}")
+
+    return report_id
+
+def queue_conversions(report_id):
+    # PDF and JSON versions are rendered by the report job queue
+    return report_jobs.enqueue(report_id, ["pdf", "json", SEARCH_STEP])
+
+def create_report(report_data, filename, digest, size):
+    """
+    insert_report, then queue its conversions. Returns (report id, job id).
+    """
+    report_id = insert_report(report_data, filename, digest, size)
+    return report_id, queue_conversions(report_id)
+
+def report_created_response(report_id, job_id, original_file):
+    return jsonify({
+        "message": "Report uploaded, conversion queued",
+        "job_id": str(job_id),
+        "status_url": f"/api/reports/jobs/{job_id}",
+        "report": {
+            "id": str(report_id),
+            "original": original_file
+        }
+    }), 202
+
 @reports_bp.route("/upload", methods=["POST"])
 @token_required
 def upload_report(decoded_token):
     try:
-        # Create upload folder if it doesn't exist
-        if not os.path.exists(UPLOAD_FOLDER):
-            os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-        # Parse date and time if provided
-        report_date = request.form.get("report_date", "")
-        report_time = request.form.get("report_time", "")
-        
-        # Combine date and time if both are provided
         try:
-            if report_date and report_time:
-                report_datetime = datetime.strptime(f"{report_date} {report_time}", "%Y-%m-%d %H:%M")
-            elif report_date:
-                report_datetime = datetime.strptime(report_date, "%Y-%m-%d")
-            else:
-                report_datetime = datetime.now()
+            report_data = build_report_data(request.form, decoded_token["email"])
         except ValueError as e:
-            return jsonify({"error": "Invalid date or time format"}), 400
-
-        report_data = {
-            "upload_date": report_datetime,
-            "uploaded_by": decoded_token["email"],
-            "patient_name": request.form.get("patient_name", ""),
-            "patient_email": request.form.get("patient_email", ""),
-            "doctor_email": request.form.get("doctor_email", ""),
-            "service": request.form.get("service", ""),
-            "amount": float(request.form.get("amount", 0)),
-            "status": "Unpaid",
-            "report_date": report_date,
-            "report_time": report_time
-        }
+            return jsonify({"error": str(e)}), 400
 
         # Handle file upload if provided
         if 'file' not in request.files:
@@ -269,44 +360,146 @@ def upload_report(decoded_token):
         if not allowed_file(file.filename):
             return jsonify({"error": "File type not allowed"}), 400
         
-        # Save original file
-        orig_filename = secure_filename(file.filename)
-        file_path = os.path.join(UPLOAD_FOLDER, orig_filename)
-        file.save(file_path)
-        report_data["original_file"] = orig_filename
-
-        # Generate PDF version
-        pdf_filename = f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        pdf_path = os.path.join(UPLOAD_FOLDER, pdf_filename)
-        if pdf_adapter.convert_to_format(report_data, pdf_path):
-            report_data["pdf_file"] = pdf_filename
-
-        # Generate JSON version
-        json_filename = f"report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        json_path = os.path.join(UPLOAD_FOLDER, json_filename)
-        if json_adapter.convert_to_format(report_data, json_path):
-            report_data["json_file"] = json_filename
-
-        # Insert into DB
-        result = reports_collection.insert_one(report_data)
-        if not result.inserted_id:
-            raise Exception("Failed to insert report into database")
+        # Save original file under its content hash; re-uploading the same
+        # file adds a reference instead of a copy
+        digest, size = blob_store.put_stream(file.stream)
+        report_id, job_id = create_report(report_data, secure_filename(file.filename), digest, size)
+        return report_created_response(report_id, job_id, report_data["original_file"])
 
+    except Exception as e:
         return jsonify({
-            "message": "Report uploaded and converted successfully",
-            "report": {
-                "pdf": pdf_filename if "pdf_file" in report_data else None,
-                "json": json_filename if "json_file" in report_data else None,
-                "original": report_data.get("original_file")
-            }
-        }), 201
+            "error": "Failed to upload and convert report",
+            "details": str(e)
+        }), 500
 
+# Resumable uploads for large files: POST /uploads opens a session, PUT
+# /uploads/<id> appends the body at the Upload-Offset header, GET reports
+# the offset to resume from, and POST /uploads/<id>/complete creates the report.
+
+def upload_session_response(session, status=200):
+    response = jsonify({
+        "upload_id": str(session["_id"]),
+        "upload_url": f"/api/reports/uploads/{session['_id']}",
+        "filename": session["filename"],
+        "size": session["size"],
+        "offset": session["received"],
+        "status": session["status"],
+        "report_id": str(session["report_id"]) if session.get("report_id") else None
+    })
+    response.headers["Upload-Offset"] = str(session["received"])
+    response.headers["Cache-Control"] = "no-store"
+    return response, status
+
+@reports_bp.route("/uploads", methods=["POST"])
+@token_required
+def create_upload(decoded_token):
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get("filename") or "")
+    if not filename or not allowed_file(filename):
+        return jsonify({"error": "File type not allowed"}), 400
+    try:
+        size = int(data.get("size"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "size is required"}), 400
+    try:
+        report_data = build_report_data(data, decoded_token["email"])
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        session = upload_sessions.create(decoded_token["email"], filename, size, report_data, data.get("sha256"))
+        return upload_session_response(session, 201)
+    except UploadTooLargeError as e:
+        return jsonify({"error": str(e)}), 413
+    except UploadError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({
+            "error": "Failed to start upload",
+            "details": str(e)
+        }), 500
+
+@reports_bp.route("/uploads/<upload_id>", methods=["GET", "PUT", "DELETE"])
+@token_required
+def resumable_upload(decoded_token, upload_id):
+    owner = decoded_token["email"]
+    try:
+        if request.method == "GET":
+            return upload_session_response(upload_sessions.get(upload_id, owner))
+
+        if request.method == "DELETE":
+            upload_sessions.abort(upload_id, owner)
+            return jsonify({"message": "Upload cancelled"}), 200
+
+        try:
+            offset = int(request.headers["Upload-Offset"])
+        except (KeyError, ValueError):
+            return jsonify({"error": "Upload-Offset header is required"}), 400
+        # Read the body as it arrives rather than letting Flask buffer it
+        upload_sessions.write_chunk(upload_id, owner, offset, request.stream, request.content_length)
+        return upload_session_response(upload_sessions.get(upload_id, owner))
+
+    except UploadNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except UploadOffsetMismatchError as e:
+        response = jsonify({"error": str(e), "offset": e.offset})
+        response.headers["Upload-Offset"] = str(e.offset)
+        return response, 409
+    except UploadTooLargeError as e:
+        return jsonify({"error": str(e)}), 413
+    except UploadError as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        logger.error(f"Error handling upload {upload_id}: {str(e)}")
+        return jsonify({
+            "error": "Failed to process upload",
+            "details": str(e)
+        }), 500
+
+@reports_bp.route("/uploads/<upload_id>/complete", methods=["POST"])
+@token_required
+def complete_upload(decoded_token, upload_id):
+    owner = decoded_token["email"]
+    try:
+        session = upload_sessions.get(upload_id, owner)
+        if session["status"] == UPLOAD_COMPLETE:
+            # A retried finalize whose response was lost
+            return upload_session_response(session)
+        session, (digest, size) = upload_sessions.finalize(upload_id, owner)
+        report_data = session["report"]
+        try:
+            report_id = insert_report(report_data, session["filename"], digest, size)
+        except Exception:
+            # The blob reference was released; the client can complete again
+            upload_sessions.reopen(session["_id"])
+            raise
+        upload_sessions.complete(session["_id"], report_id)
+        job_id = queue_conversions(report_id)
+        return report_created_response(report_id, job_id, report_data["original_file"])
+
+    except UploadNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    except UploadChecksumMismatchError as e:
+        return jsonify({"error": str(e)}), 422
+    except UploadError as e:
+        return jsonify({"error": str(e)}), 409
     except Exception as e:
         return jsonify({
             "error": "Failed to upload and convert report",
             "details": str(e)
         }), 500
 
+@reports_bp.route("/jobs/<job_id>", methods=["GET"])
+@token_required
+def get_report_job(decoded_token, job_id):
+    try:
+        job = report_jobs.get(job_id)
+    except Exception:
+        return jsonify({"error": "Invalid job ID"}), 400
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
 @reports_bp.route("/doctor-patient-history", methods=["GET"])
 @token_required
 def get_doctor_patient_reports(decoded_token):
@@ -321,6 +514,33 @@ def get_doctor_patient_reports(decoded_token):
     reports = list(reports_collection.find(query, {"_id": 0}))
     return jsonify({"reports": reports}), 200
 
+# Report fields holding a stored file name, and the field with that file's SHA-256
+FILE_HASH_FIELDS = {
+    'original_file': 'original_sha256',
+    'pdf_file': 'pdf_sha256',
+    'json_file': 'json_sha256'
+}
+DOWNLOAD_ALLOW_HEADERS = 'Authorization, Content-Type, Accept, Range, If-None-Match, If-Range, If-Modified-Since'
+DOWNLOAD_EXPOSE_HEADERS = 'Content-Disposition, Content-Length, Content-Type, Content-Range, Accept-Ranges, ETag, Last-Modified'
+
+def stored_file_hash(filename, file_path):
+    """
+    Content hash recorded for a file in the legacy reports folder. Files
+    stored before hashes were recorded are hashed once and the result saved.
+    """
+    report = reports_collection.find_one(
+        {"$or": [{field: filename} for field in FILE_HASH_FIELDS]},
+        {field: 1 for field in (*FILE_HASH_FIELDS, *FILE_HASH_FIELDS.values())},
+        sort=[("_id", -1)]  # the most recent upload wrote the file last
+    )
+    field = next((f for f in FILE_HASH_FIELDS if report and report.get(f) == filename), None)
+    if field and report.get(FILE_HASH_FIELDS[field]):
+        return report[FILE_HASH_FIELDS[field]]
+    content_hash = file_sha256(file_path)
+    if field:
+        reports_collection.update_one({"_id": report["_id"]}, {"$set": {FILE_HASH_FIELDS[field]: content_hash}})
+    return content_hash
+
 # Add new download endpoint
 @reports_bp.route("/download/<path:filename>", methods=["GET", "OPTIONS"])
 @token_required
@@ -330,44 +550,55 @@ def download_file(decoded_token, filename):
         response.headers.update({
             'Access-Control-Allow-Origin': 'http://localhost:5173',
             'Access-Control-Allow-Methods': 'GET, OPTIONS',
-            'Access-Control-Allow-Headers': 'Authorization, Content-Type, Accept',
+            'Access-Control-Allow-Headers': DOWNLOAD_ALLOW_HEADERS,
             'Access-Control-Max-Age': '3600'
         })
         return response, 200  # Important: return 200 status for OPTIONS
 
     try:
         safe_filename = secure_filename(filename)
-        file_path = os.path.join(UPLOAD_FOLDER, safe_filename)
-        
+        file_path = stored_file_path(safe_filename)
+        digest = BlobStore.digest_of(safe_filename)
+
         if not os.path.exists(file_path):
             logger.error(f"File not found: {file_path}")
             return jsonify({"error": f"File {filename} not found"}), 404
 
-        # Get file size and type
-        file_size = os.path.getsize(file_path)
         mime_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
 
         try:
+            # send_file streams through the WSGI file wrapper (sendfile where the
+            # server supports it) and, being conditional, answers Range with 206,
+            # If-None-Match / If-Modified-Since with 304 and honours If-Range
             response = send_file(
                 file_path,
                 mimetype=mime_type,
                 as_attachment=False,
                 download_name=safe_filename,
-                max_age=0
+                etag=digest or stored_file_hash(safe_filename, file_path),
+                conditional=True
             )
+            response.cache_control.private = True
+            if digest:
+                # A content-addressed name never changes content
+                response.cache_control.no_cache = None
+                response.cache_control.max_age = 31536000
+                response.cache_control.immutable = True
+            else:
+                response.cache_control.no_cache = True
 
             # Add CORS headers
             response.headers.update({
                 'Access-Control-Allow-Origin': 'http://localhost:5173',
                 'Access-Control-Allow-Methods': 'GET, OPTIONS',
-                'Access-Control-Allow-Headers': 'Authorization, Content-Type, Accept',
-                'Access-Control-Expose-Headers': 'Content-Disposition, Content-Length, Content-Type',
-                'Content-Length': str(file_size),
-                'Cache-Control': 'no-cache, no-store, must-revalidate'
+                'Access-Control-Allow-Headers': DOWNLOAD_ALLOW_HEADERS,
+                'Access-Control-Expose-Headers': DOWNLOAD_EXPOSE_HEADERS
             })
 
             return response
 
+        except HTTPException:
+            raise  # e.g. 416 for a range past the end of the file
         except Exception as e:
             logger.error(f"Error reading file: {str(e)}")
             return jsonify({
@@ -375,6 +606,8 @@ def download_file(decoded_token, filename):
                 "details": str(e)
             }), 500
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error serving file: {str(e)}")
         return jsonify({
@@ -414,52 +647,47 @@ def convert_report(decoded_token, report_id):
         if 'json_file' not in report:
             return jsonify({"error": "No JSON file available for this report"}), 404
 
-        json_path = os.path.join(UPLOAD_FOLDER, report['json_file'])
-        
-        # Use JSON adapter to get data
-        data = json_adapter.convert_from_format(json_path)
-        if not data:
-            return jsonify({"error": "Failed to read JSON data"}), 500
+        json_path = stored_file_path(report['json_file'])
+        if not os.path.exists(json_path):
+            return jsonify({"error": "No JSON file available for this report"}), 404
 
-        if output_format == 'json':
-            return send_file(
-                json_path,
-                mimetype='application/json',
-                as_attachment=True,
-                download_name=f"report_{report_id}.json"
-            )
-        
-        elif output_format == 'pdf':
-            # Generate new PDF file
-            pdf_filename = f"converted_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-            pdf_path = os.path.join(UPLOAD_FOLDER, pdf_filename)
-            
-            if pdf_adapter.convert_to_format(data, pdf_path):
-                return send_file(
-                    pdf_path,
-                    mimetype='application/pdf',
-                    as_attachment=True,
-                    download_name=f"report_{report_id}.pdf"
-                )
-            else:
-                return jsonify({"error": "Failed to convert to PDF"}), 500
-                
-        elif output_format == 'text':
-            # Convert to simple text format
-            text_content = []
-            for key, value in data.items():
-                if key != 'file' and value is not None:
-                    text_content.append(f"{key.replace('_', ' ').title()}: {str(value)}")
-            
-            response = Response(
-                "\n".join(text_content),
-                mimetype='text/plain',
-                headers={
-                    "Content-Disposition": f"attachment;filename=report_{report_id}.txt"
-                }
-            )
+        # The key changes whenever the source does, so it also serves as a strong ETag
+        cache_key = ConversionCache.key(report_id, report.get("json_sha256") or file_sha256(json_path), output_format)
+        if request.if_none_match.contains(cache_key):
+            response = make_response("", 304)
+            response.set_etag(cache_key)
             return response
 
+        if output_format == 'json':
+            path = json_path
+        else:
+            def render(output_path):
+                data = json_adapter.convert_from_format(json_path)
+                if not data:
+                    raise ValueError("Failed to read JSON data")
+                render_report(output_format, data, output_path)
+
+            try:
+                path = conversion_cache.get_or_create(cache_key, output_format, render)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 500
+            except RuntimeError:
+                return jsonify({"error": f"Failed to convert to {output_format.upper()}"}), 500
+
+        extension = CONVERT_EXTENSIONS[output_format]
+        response = send_file(
+            path,
+            mimetype=mimetypes.guess_type(f"x.{extension}")[0],
+            as_attachment=True,
+            download_name=f"report_{report_id}.{extension}",
+            etag=cache_key,
+            conditional=True
+        )
+        # Revalidate every time; unchanged conversions cost a 304
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
     except Exception as e:
         print(f"Error converting report: {str(e)}")
         return jsonify({
@@ -467,6 +695,66 @@ def convert_report(decoded_token, report_id):
             "details": str(e)
         }), 500
 
+# Pages of extracted text per preview request unless ?pages= asks otherwise
+PREVIEW_PAGES = 10
+MAX_PREVIEW_PAGES = 50
+
+def parse_page_range(value):
+    """
+    "5", "3-7" or "3-" to (first, last or None); raises ValueError
+    """
+    if not value:
+        return 1, PREVIEW_PAGES
+    first, _, last = value.partition("-")
+    first = int(first)
+    last = (int(last) if last else None) if "-" in value else first
+    if first < 1 or (last is not None and last < first):
+        raise ValueError
+    return first, last
+
+@reports_bp.route("/<report_id>/text", methods=["GET"])
+@token_required
+def get_report_text(decoded_token, report_id):
+    try:
+        first, last = parse_page_range(request.args.get("pages"))
+    except ValueError:
+        return jsonify({"error": "pages must look like 5, 3-7 or 3-"}), 400
+    last = min(last or first + MAX_PREVIEW_PAGES - 1, first + MAX_PREVIEW_PAGES - 1)
+
+    try:
+        report = reports_collection.find_one(
+            {"_id": ObjectId(report_id)}, {"original_file": 1, "original_sha256": 1}
+        )
+    except Exception:
+        return jsonify({"error": "Invalid report ID"}), 400
+    if not report:
+        return jsonify({"error": "Report not found"}), 404
+    if not report.get("original_file", "").lower().endswith(".pdf"):
+        return jsonify({"error": "Text previews are only available for PDF reports"}), 415
+
+    file_path = stored_file_path(report["original_file"])
+    if not os.path.exists(file_path):
+        return jsonify({"error": "Report file not found"}), 404
+
+    try:
+        digest = report.get("original_sha256") or file_sha256(file_path)
+        page_count = pdf_text_cache.page_count(file_path, digest)
+        texts = pdf_text_cache.pages(file_path, digest, first, last)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 416
+    except Exception as e:
+        logger.error(f"Error extracting text of report {report_id}: {str(e)}")
+        return jsonify({
+            "error": "Failed to extract report text",
+            "details": str(e)
+        }), 500
+
+    return jsonify({
+        "report_id": report_id,
+        "page_count": page_count,
+        "pages": [{"page": first + i, "text": text} for i, text in enumerate(texts)]
+    }), 200
+
 @reports_bp.route("/<report_id>", methods=["PUT", "DELETE"])
 @token_required
 def update_or_delete_report(decoded_token, report_id):
@@ -483,24 +771,36 @@ def update_or_delete_report(decoded_token, report_id):
             if not report:
                 return jsonify({"error": "Report not found"}), 404
 
-            # Delete associated files if they exist
-            for file_key in ['original_file', 'pdf_file', 'json_file']:
-                if file_key in report:
-                    file_path = os.path.join(UPLOAD_FOLDER, report[file_key])
-                    try:
-                        if os.path.exists(file_path):
-                            os.remove(file_path)
-                    except Exception as e:
-                        logger.error(f"Error deleting file {file_path}: {str(e)}")
-
             # Delete the report from database
             result = reports_collection.delete_one({"_id": report_obj_id})
-            
-            if result.deleted_count > 0:
-                return jsonify({"message": "Report deleted successfully"}), 200
-            else:
+            if not result.deleted_count:
                 return jsonify({"error": "Failed to delete report"}), 500
 
+            try:
+                search_index.remove(KIND_REPORT, report_obj_id)
+            except Exception as e:
+                logger.error(f"Failed to remove report {report_id} from search: {str(e)}")
+
+            # Release associated files; a file another report still uses is kept
+            for file_key in ['original_file', 'pdf_file', 'json_file']:
+                if file_key not in report:
+                    continue
+                try:
+                    digest = BlobStore.digest_of(report[file_key])
+                    if digest:
+                        blob_store.release(digest)
+                        continue
+                    # Legacy files were named by the client and may be shared
+                    if reports_collection.count_documents({"$or": [{key: report[file_key]} for key in FILE_HASH_FIELDS]}, limit=1):
+                        continue
+                    file_path = stored_file_path(report[file_key])
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
+                except Exception as e:
+                    logger.error(f"Error deleting file {report[file_key]}: {str(e)}")
+
+            return jsonify({"message": "Report deleted successfully"}), 200
+
         except Exception as e:
             logger.error(f"Error deleting report: {str(e)}")
             return jsonify({
@@ -0,0 +1,57 @@
+# app/controllers/search_controller.py
+from flask import Blueprint, request, jsonify
+from app.services.db_connection import DatabaseConnection
+from app.middleware.auth_middleware import token_required
+from app.services.search_index import SearchIndex, SEARCH_KINDS
+from app.utils.pagination import parse_page_size
+
+search_bp = Blueprint("search", __name__)
+db_instance = DatabaseConnection().get_database()
+search_index = SearchIndex(db_instance["SearchIndex"])
+
+DEFAULT_SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 50
+# Ranked results page by offset; beyond this, refine the query instead
+MAX_SEARCH_RESULTS = 1000
+
+
+# GET: Prescriptions and reports matching a query, best match first
+# Query params: q, kind (prescription|report), doctor_email, patient_email, page, limit
+
+@search_bp.route("/", methods=["GET"])
+@token_required
+def search(decoded_token):
+    query = (request.args.get("q") or "").strip()
+    if not query:
+        return jsonify({"error": "q is required"}), 400
+
+    kinds = [kind for kind in request.args.get("kind", "").split(",") if kind]
+    if any(kind not in SEARCH_KINDS for kind in kinds):
+        return jsonify({"error": f"kind must be one of {', '.join(SEARCH_KINDS)}"}), 400
+
+    try:
+        limit = parse_page_size(request.args.get("limit"), DEFAULT_SEARCH_PAGE_SIZE, MAX_SEARCH_PAGE_SIZE)
+        page = int(request.args.get("page") or 1)
+    except ValueError:
+        return jsonify({"error": "page and limit must be integers"}), 400
+    if page < 1 or page * limit > MAX_SEARCH_RESULTS:
+        return jsonify({"error": f"Only the first {MAX_SEARCH_RESULTS} results can be paged through"}), 400
+
+    # Patients only ever search their own records
+    patient_email = request.args.get("patient_email")
+    if decoded_token.get("role") == "patient":
+        patient_email = decoded_token["email"]
+
+    try:
+        results, has_more = search_index.search(
+            query, kinds, request.args.get("doctor_email"), patient_email, page, limit
+        )
+        return jsonify({
+            "query": query,
+            "results": results,
+            "page": page,
+            "limit": limit,
+            "next_page": page + 1 if has_more else None
+        }), 200
+    except Exception as e:
+        return jsonify({"error": "Search failed", "details": str(e)}), 500
@@ -1,5 +1,21 @@
 from flask import request, jsonify
+from pymongo.errors import PyMongoError
 from app.utils.jwt_auth import decode_jwt
+from app.services.db_connection import DatabaseConnection
+from app.services.token_cache import VerifiedTokenCache, TokenRevocationList, token_digest
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Verified claims are cached so repeat requests skip jwt.decode
+token_cache = VerifiedTokenCache()
+revocation_list = TokenRevocationList(DatabaseConnection().get_database()["RevokedTokens"])
+
+
+def token_id(decoded_token, token):
+    # Tokens issued before ids were added are revoked by their digest
+    return decoded_token.get("jti") or token_digest(token)
+
 
 def token_required(f):
     def decorated_function(*args, **kwargs):
@@ -12,9 +28,22 @@ def token_required(f):
         if len(parts) != 2 or parts[0] != "Bearer":
             return jsonify({"error": "Invalid token format!"}), 401
 
-        decoded_token = decode_jwt(parts[1])
-        if not decoded_token:
-            return jsonify({"error": "Invalid or expired token!"}), 401
+        digest = token_digest(parts[1])
+        decoded_token = token_cache.get(digest)
+        if decoded_token is None:
+            decoded_token = decode_jwt(parts[1])
+            if not decoded_token:
+                return jsonify({"error": "Invalid or expired token!"}), 401
+            token_cache.put(digest, decoded_token)
+
+        try:
+            revoked = revocation_list.is_revoked(decoded_token.get("jti") or digest)
+        except PyMongoError as e:
+            # Without the list a revoked token cannot be told apart, so do not let it through
+            logger.error(f"Failed to check token revocation: {str(e)}")
+            return jsonify({"error": "Unable to verify token, try again shortly"}), 503, {"Retry-After": "1"}
+        if revoked:
+            return jsonify({"error": "Token has been revoked!"}), 401
 
         return f(decoded_token, *args, **kwargs)
     decorated_function.__name__ = f.__name__
@@ -0,0 +1,56 @@
+from flask import request, jsonify, make_response
+from app.services.db_connection import DatabaseConnection
+from app.services.idempotency_store import (
+    IdempotencyStore, IDEMPOTENCY_COMPLETED, IDEMPOTENCY_IN_PROGRESS, IDEMPOTENCY_MISMATCH
+)
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+idempotency_store = IdempotencyStore(DatabaseConnection().get_database()["IdempotencyKeys"])
+
+
+def idempotent(f):
+    """
+    Honour an Idempotency-Key header. Apply below token_required: keys are
+    scoped to the caller's email. Responses below 500 are stored and
+    replayed for retries with the same key and body.
+    """
+    def decorated_function(decoded_token, *args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if not key:
+            return f(decoded_token, *args, **kwargs)
+        if len(key) > 255:
+            return jsonify({"error": "Idempotency-Key must be at most 255 characters"}), 400
+
+        scoped_key = f"{f.__name__}:{decoded_token.get('email')}:{key}"
+        fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+        outcome, stored = idempotency_store.begin(scoped_key, fingerprint)
+
+        if outcome == IDEMPOTENCY_COMPLETED:
+            response = make_response(jsonify(stored["body"]), stored["status"])
+            response.headers["Idempotent-Replayed"] = "true"
+            return response
+        if outcome == IDEMPOTENCY_IN_PROGRESS:
+            return jsonify({"error": "A request with this Idempotency-Key is still being processed"}), 409
+        if outcome == IDEMPOTENCY_MISMATCH:
+            return jsonify({"error": "Idempotency-Key was already used with a different request body"}), 422
+
+        try:
+            response = make_response(f(decoded_token, *args, **kwargs))
+        except Exception:
+            idempotency_store.abandon(scoped_key)
+            raise
+
+        if response.status_code >= 500:
+            # Unexpected failure: let the client retry for real
+            idempotency_store.abandon(scoped_key)
+        else:
+            try:
+                idempotency_store.complete(scoped_key, response.status_code, response.get_json())
+            except Exception as e:
+                logger.error(f"Failed to store idempotent response for {scoped_key}: {str(e)}")
+        return response
+    decorated_function.__name__ = f.__name__
+    return decorated_function
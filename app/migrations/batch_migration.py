@@ -0,0 +1,42 @@
+import logging
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+
+def migrate_in_batches(collection, query, projection, build_update, batch_size=1000, dry_run=False):
+    """
+    Rewrite every document matching query in _id order, batch_size at a time.
+
+    build_update(doc) returns (guard, update) or None to skip the document.
+    guard is merged into the update filter, so a document changed since it
+    was read is left alone and picked up by the next run. Migrations stay
+    idempotent by having query match only documents still to be migrated.
+
+    Returns (updated, skipped).
+    """
+    updated = skipped = 0
+    last_id = None
+    while True:
+        page_query = query if last_id is None else {"$and": [query, {"_id": {"$gt": last_id}}]}
+        batch = list(collection.find(page_query, projection).sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+
+        operations = []
+        for doc in batch:
+            change = build_update(doc)
+            if change is None:
+                skipped += 1
+                continue
+            guard, update = change
+            operations.append(UpdateOne({"_id": doc["_id"], **guard}, update))
+
+        if dry_run:
+            updated += len(operations)
+        elif operations:
+            updated += collection.bulk_write(operations, ordered=False).modified_count
+        logger.info(f"{collection.name}: migrated up to {last_id}")
+    return updated, skipped
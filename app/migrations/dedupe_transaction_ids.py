@@ -0,0 +1,78 @@
+"""
+Give duplicated payment transaction ids a unique replacement so the
+transaction_id_unique index (see app.services.db_indexes) can be built.
+
+Before ids came from app.services.id_generator, two payments in the same
+second shared an id. For each duplicated id the oldest payment keeps it;
+the others get "<id>-<fresh id>" and remember the id they had in
+original_transaction_id. Appointments still point at the oldest payment
+and are listed in the output so they can be checked by hand.
+
+Safe to re-run: renamed payments are unique and no longer match.
+
+    python -m app.migrations.dedupe_transaction_ids [--dry-run]
+"""
+import argparse
+import logging
+
+from app.services.id_generator import create_id_generator
+
+logger = logging.getLogger(__name__)
+
+
+def duplicated_transaction_ids(billing):
+    """
+    Yields (transaction_id, [_id, ...]) for every id held by more than one payment, oldest first
+    """
+    pipeline = [
+        {"$match": {"transaction_id": {"$exists": True}}},
+        {"$sort": {"_id": 1}},
+        {"$group": {"_id": "$transaction_id", "ids": {"$push": "$_id"}}},
+        {"$match": {"ids.1": {"$exists": True}}},
+    ]
+    for group in billing.aggregate(pipeline, allowDiskUse=True):
+        yield group["_id"], group["ids"]
+
+
+def dedupe_transaction_ids(billing, appointments=None, id_generator=None, dry_run=False):
+    """
+    Returns (renamed, affected): payments given a new id, and the duplicated
+    ids that appointments reference
+    """
+    id_generator = id_generator or create_id_generator()
+    renamed = 0
+    affected = []
+    for transaction_id, ids in duplicated_transaction_ids(billing):
+        if appointments is not None and appointments.count_documents({"payment_id": transaction_id}, limit=1):
+            affected.append(transaction_id)
+        for _id in ids[1:]:
+            if dry_run:
+                renamed += 1
+                continue
+            new_id = f"{transaction_id}-{id_generator.new_id()}"
+            result = billing.update_one(
+                {"_id": _id, "transaction_id": transaction_id},
+                {"$set": {"transaction_id": new_id, "original_transaction_id": transaction_id}}
+            )
+            if result.modified_count:
+                logger.info(f"Billing {_id}: transaction id {transaction_id} -> {new_id}")
+                renamed += 1
+    return renamed, affected
+
+
+if __name__ == "__main__":
+    from app.services.db_connection import DatabaseConnection
+    from app.services.db_indexes import ensure_indexes
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="count duplicates without writing")
+    args = parser.parse_args()
+
+    db = DatabaseConnection().get_database()
+    renamed, affected = dedupe_transaction_ids(db["Billing"], db["Appointments"], dry_run=args.dry_run)
+    print(f"Billing: {'would rename' if args.dry_run else 'renamed'} {renamed} duplicated transaction ids")
+    for transaction_id in affected:
+        print(f"  appointments reference duplicated id {transaction_id}, check which payment they belong to")
+
+    if not args.dry_run:
+        ensure_indexes(db)
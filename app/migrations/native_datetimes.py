@@ -0,0 +1,122 @@
+"""
+Store dates and times as BSON datetimes (see app.models.datetime_codec):
+
+  Appointments   scheduled_at from date + time; created_at/updated_at strings parsed
+  Billing        paid_at from payment_date + payment_time
+  Prescriptions  created_at from the client-supplied createdAt (or the _id
+                 timestamp when missing); createdAt is removed
+
+The original string fields of Appointments and Billing are kept: slot
+reservation, the availability calendar and revenue rollups key on them.
+Documents whose date or time cannot be parsed are logged and skipped, so
+they get no scheduled_at/paid_at; a re-run after fixing them picks them up.
+Safe to re-run: migrated documents no longer match the queries.
+
+    python -m app.migrations.native_datetimes [--batch-size 1000] [--dry-run]
+"""
+import argparse
+import logging
+
+from app.migrations.batch_migration import migrate_in_batches
+from app.models.datetime_codec import combine, parse_timestamp
+
+logger = logging.getLogger(__name__)
+
+# Indexes on the string fields, replaced by the datetime ones in db_indexes
+SUPERSEDED_INDEXES = {
+    "Appointments": ["date_id", "doctor_date_id", "patient_date_id", "status_date_id"],
+    "Billing": ["payment_date", "doctor_payment_date"],
+}
+
+
+def migrate_appointments(collection, batch_size=1000, dry_run=False):
+    query = {"$or": [
+        {"scheduled_at": None},
+        {"created_at": {"$type": "string"}},
+        {"updated_at": {"$type": "string"}}
+    ]}
+
+    def build_update(doc):
+        changes = {}
+        scheduled_at = combine(doc.get("date"), doc.get("time"))
+        if scheduled_at is not None:
+            changes["scheduled_at"] = scheduled_at
+        elif doc.get("scheduled_at") is None:
+            # Left without scheduled_at (listed first, outside any date range) until the date/time is fixed
+            logger.warning(f"Appointment {doc['_id']}: unparseable date/time {doc.get('date')!r} {doc.get('time')!r}")
+        for field in ("created_at", "updated_at"):
+            if isinstance(doc.get(field), str):
+                changes[field] = parse_timestamp(doc[field])
+        if not changes:
+            return None
+        guard = {field: doc.get(field) for field in ("date", "time", "created_at", "updated_at")}
+        return guard, {"$set": changes}
+
+    projection = {"date": 1, "time": 1, "scheduled_at": 1, "created_at": 1, "updated_at": 1}
+    return migrate_in_batches(collection, query, projection, build_update, batch_size, dry_run)
+
+
+def migrate_billing(collection, batch_size=1000, dry_run=False):
+    def build_update(doc):
+        paid_at = combine(doc.get("payment_date"), doc.get("payment_time"))
+        if paid_at is None:
+            logger.warning(f"Billing {doc['_id']}: unparseable payment date/time")
+            return None
+        guard = {"payment_date": doc.get("payment_date"), "payment_time": doc.get("payment_time")}
+        return guard, {"$set": {"paid_at": paid_at}}
+
+    query = {"paid_at": None}
+    projection = {"payment_date": 1, "payment_time": 1}
+    return migrate_in_batches(collection, query, projection, build_update, batch_size, dry_run)
+
+
+def migrate_prescriptions(collection, batch_size=1000, dry_run=False):
+    query = {"$or": [
+        {"created_at": {"$not": {"$type": "date"}}},
+        {"createdAt": {"$exists": True}}
+    ]}
+
+    def build_update(doc):
+        created_at = (
+            parse_timestamp(doc.get("created_at"))
+            or parse_timestamp(doc.get("createdAt"))
+            or parse_timestamp(doc["_id"].generation_time)
+        )
+        guard = {"createdAt": doc.get("createdAt")}
+        return guard, {"$set": {"created_at": created_at}, "$unset": {"createdAt": ""}}
+
+    projection = {"created_at": 1, "createdAt": 1}
+    return migrate_in_batches(collection, query, projection, build_update, batch_size, dry_run)
+
+
+MIGRATIONS = {
+    "Appointments": migrate_appointments,
+    "Billing": migrate_billing,
+    "Prescriptions": migrate_prescriptions,
+}
+
+
+if __name__ == "__main__":
+    from pymongo.errors import OperationFailure
+    from app.services.db_connection import DatabaseConnection
+    from app.services.db_indexes import ensure_indexes
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="count documents without writing")
+    args = parser.parse_args()
+
+    db = DatabaseConnection().get_database()
+    for name, migrate in MIGRATIONS.items():
+        updated, skipped = migrate(db[name], args.batch_size, args.dry_run)
+        print(f"{name}: {'would migrate' if args.dry_run else 'migrated'} {updated} documents, {skipped} skipped")
+
+    if not args.dry_run:
+        ensure_indexes(db)
+        for name, index_names in SUPERSEDED_INDEXES.items():
+            for index_name in index_names:
+                try:
+                    db[name].drop_index(index_name)
+                    print(f"{name}: dropped index {index_name}")
+                except OperationFailure:
+                    pass  # never created or already dropped
@@ -0,0 +1,61 @@
+"""
+Rewrite stored amounts into the canonical money fields (see app.utils.money):
+a numeric amount plus an exact integer amount_cents.
+
+Safe to re-run: normalized documents no longer match the query, and each
+update is guarded on the amount it was computed from, so a document
+changed concurrently is left for the next run.
+
+    python -m app.migrations.normalize_money [--batch-size 1000] [--dry-run]
+"""
+import argparse
+import logging
+
+from app.migrations.batch_migration import migrate_in_batches
+from app.utils.money import Money, InvalidAmountError
+
+logger = logging.getLogger(__name__)
+
+COLLECTIONS = ("Billing", "Reports")
+NEEDS_NORMALIZING = {
+    "amount": {"$exists": True},
+    "$or": [
+        {"amount_cents": {"$not": {"$type": ["int", "long"]}}},
+        {"amount": {"$not": {"$type": "double"}}}
+    ]
+}
+
+
+def normalize_collection(collection, batch_size=1000, dry_run=False):
+    """
+    Returns (updated, invalid): documents rewritten and amounts that could not be parsed
+    """
+    def build_update(doc):
+        try:
+            money = Money.parse(doc["amount"])
+        except InvalidAmountError:
+            logger.warning(f"{collection.name} {doc['_id']}: unparseable amount {doc['amount']!r}")
+            return None
+        return {"amount": doc["amount"]}, {"$set": money.to_document()}
+
+    return migrate_in_batches(collection, NEEDS_NORMALIZING, {"amount": 1}, build_update, batch_size, dry_run)
+
+
+if __name__ == "__main__":
+    from app.services.db_connection import DatabaseConnection
+    from app.services.revenue_rollup import RevenueRollup
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="count documents without writing")
+    args = parser.parse_args()
+
+    db = DatabaseConnection().get_database()
+    for name in COLLECTIONS:
+        updated, invalid = normalize_collection(db[name], args.batch_size, args.dry_run)
+        print(f"{name}: {'would normalize' if args.dry_run else 'normalized'} {updated} amounts, {invalid} unparseable")
+
+    if not args.dry_run:
+        # Rollup rows hold integer cents; rebuild them from the normalized amounts
+        rows = RevenueRollup(db["RevenueRollups"], db["Billing"]).rebuild()
+        print(f"Rebuilt {rows} revenue rollup rows")
@@ -0,0 +1,56 @@
+"""
+Extract the text of every PDF report into the page cache (see
+app.services.pdf_text), so text previews and search indexing of existing
+reports never wait on PyPDF2. Uploads after this point are cached as they
+are first read.
+
+Safe to re-run: pages already cached are not extracted again.
+
+    python -m app.migrations.pdf_text_backfill [--workers N] [--max-pending N]
+"""
+import argparse
+import os
+
+from app.services.blob_store import BlobStore
+from app.services.pdf_text import backfill
+from app.utils.files import file_sha256
+
+UPLOADS = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "uploads"))
+
+
+def pdf_reports(reports, blob_store, legacy_folder):
+    """
+    Yields (path, digest) of each report whose original is a PDF on disk
+    """
+    cursor = reports.find(
+        {"original_file": {"$regex": r"\.pdf$", "$options": "i"}},
+        {"original_file": 1, "original_sha256": 1}
+    )
+    for report in cursor:
+        name = report["original_file"]
+        digest = BlobStore.digest_of(name)
+        path = blob_store.path(digest) if digest else os.path.join(legacy_folder, name)
+        if os.path.exists(path):
+            yield path, digest or report.get("original_sha256") or file_sha256(path)
+
+
+if __name__ == "__main__":
+    from app.services.db_connection import DatabaseConnection
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=None, help="extraction processes (default: CPU count)")
+    parser.add_argument("--max-pending", type=int, default=None, help="files queued at once (default: 2 per worker)")
+    args = parser.parse_args()
+
+    db = DatabaseConnection().get_database()
+    store = BlobStore(os.path.join(UPLOADS, "blobs"), db["Blobs"])
+    items = pdf_reports(db["Reports"], store, os.path.join(UPLOADS, "reports"))
+    extracted = failed = pages = 0
+    for digest, result in backfill(items, workers=args.workers, max_pending=args.max_pending):
+        if isinstance(result, Exception):
+            failed += 1
+            print(f"{digest}: {result}")
+        else:
+            extracted += 1
+            pages += result
+    print(f"PDFs: {extracted} cached ({pages} pages), {failed} failed")
@@ -0,0 +1,81 @@
+"""
+Move report files from the flat uploads/reports folder into the
+content-addressed blob store (see app.services.blob_store): each file name
+on a report is replaced by the blob name of its content, and reports that
+shared a file name, or uploaded the same file twice, end up sharing a blob.
+
+The legacy files are copied, not moved; once no report names them they are
+plain orphans. Safe to re-run: migrated reports no longer match the query,
+and a report changed concurrently keeps its old name for the next run.
+
+    python -m app.migrations.report_blobs [--batch-size 1000] [--dry-run]
+"""
+import argparse
+import logging
+import os
+import re
+
+from app.services.blob_store import BlobStore
+
+logger = logging.getLogger(__name__)
+
+UPLOADS = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "uploads"))
+FILE_FIELDS = ("original_file", "pdf_file", "json_file")
+LEGACY_NAME = {"$exists": True, "$type": "string", "$not": re.compile(r"^[0-9a-f]{64}(\.[A-Za-z0-9]+)?$")}
+
+
+def migrate_reports(reports, blob_store, upload_folder, batch_size=1000, dry_run=False):
+    """
+    Returns (moved, missing): file references rewritten and files not found on disk
+    """
+    query = {"$or": [{field: LEGACY_NAME} for field in FILE_FIELDS]}
+    projection = {field: 1 for field in FILE_FIELDS}
+    moved = missing = 0
+    last_id = None
+    while True:
+        page_query = query if last_id is None else {"$and": [query, {"_id": {"$gt": last_id}}]}
+        batch = list(reports.find(page_query, projection).sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+
+        for report in batch:
+            for field in FILE_FIELDS:
+                name = report.get(field)
+                if not isinstance(name, str) or BlobStore.digest_of(name):
+                    continue
+                path = os.path.join(upload_folder, name)
+                if not os.path.exists(path):
+                    logger.warning(f"Report {report['_id']}: {field} {name!r} is missing")
+                    missing += 1
+                    continue
+                if dry_run:
+                    moved += 1
+                    continue
+
+                with open(path, "rb") as f:
+                    digest, size = blob_store.put_stream(f)
+                changes = {field: BlobStore.name(digest, os.path.splitext(name)[1].lstrip(".")),
+                           field.replace("_file", "_sha256"): digest}
+                if field == "original_file":
+                    changes.update(original_filename=name, original_size=size)
+                result = reports.update_one({"_id": report["_id"], field: name}, {"$set": changes})
+                if result.modified_count:
+                    moved += 1
+                else:
+                    blob_store.release(digest)
+    return moved, missing
+
+
+if __name__ == "__main__":
+    from app.services.db_connection import DatabaseConnection
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--dry-run", action="store_true", help="count files without copying")
+    args = parser.parse_args()
+
+    db = DatabaseConnection().get_database()
+    store = BlobStore(os.path.join(UPLOADS, "blobs"), db["Blobs"])
+    moved, missing = migrate_reports(db["Reports"], store, os.path.join(UPLOADS, "reports"), args.batch_size, args.dry_run)
+    print(f"Reports: {'would move' if args.dry_run else 'moved'} {moved} files into the blob store, {missing} missing")
@@ -0,0 +1,92 @@
+"""
+(Re)build the SearchIndex entries of existing prescriptions and reports
+(see app.services.search_index). New records are indexed as they are
+saved; this covers records from before search existed, or entries lost to
+an indexing error. Report text is extracted from the original files.
+
+Safe to re-run: entries are upserted per record.
+
+    python -m app.migrations.search_backfill [--batch-size 500] [--skip-text]
+"""
+import argparse
+import logging
+import os
+
+from app.services.blob_store import BlobStore
+from app.services.report_formats import extract_text
+from app.services.search_index import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+UPLOADS = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "uploads"))
+
+
+def _batches(collection, projection, batch_size):
+    last_id = None
+    while True:
+        query = {} if last_id is None else {"_id": {"$gt": last_id}}
+        batch = list(collection.find(query, projection).sort("_id", 1).limit(batch_size))
+        if not batch:
+            return
+        last_id = batch[-1]["_id"]
+        yield batch
+
+
+def backfill_prescriptions(prescriptions, search_index, batch_size=500):
+    indexed = 0
+    for batch in _batches(prescriptions, None, batch_size):
+        search_index.index_many([SearchIndex.prescription_entry(doc) for doc in batch])
+        indexed += len(batch)
+    return indexed
+
+
+def report_text(report, blob_store, legacy_folder):
+    name = report.get("original_file")
+    if not name:
+        return ""
+    digest = BlobStore.digest_of(name)
+    path = blob_store.path(digest) if digest else os.path.join(legacy_folder, name)
+    if not os.path.exists(path):
+        return ""
+    return extract_text(path, name.rsplit(".", 1)[-1] if "." in name else "", report.get("original_sha256"))
+
+
+def backfill_reports(reports, search_index, blob_store, legacy_folder, batch_size=500, with_text=True):
+    """
+    Returns (indexed, unreadable): reports indexed and files whose text could not be read
+    """
+    indexed = unreadable = 0
+    for batch in _batches(reports, None, batch_size):
+        entries = []
+        for report in batch:
+            text = ""
+            if with_text:
+                try:
+                    text = report_text(report, blob_store, legacy_folder)
+                except Exception as e:
+                    logger.warning(f"Report {report['_id']}: {str(e)}")
+                    unreadable += 1
+            entries.append(SearchIndex.report_entry(report, text))
+        search_index.index_many(entries)
+        indexed += len(batch)
+    return indexed, unreadable
+
+
+if __name__ == "__main__":
+    from app.services.db_connection import DatabaseConnection
+    from app.services.db_indexes import ensure_indexes
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--skip-text", action="store_true", help="index report details only, without reading files")
+    args = parser.parse_args()
+
+    db = DatabaseConnection().get_database()
+    ensure_indexes(db)
+    index = SearchIndex(db["SearchIndex"])
+    count = backfill_prescriptions(db["Prescriptions"], index, args.batch_size)
+    print(f"Prescriptions: indexed {count}")
+    store = BlobStore(os.path.join(UPLOADS, "blobs"), db["Blobs"])
+    count, unreadable = backfill_reports(db["Reports"], index, store, os.path.join(UPLOADS, "reports"),
+                                         args.batch_size, not args.skip_text)
+    print(f"Reports: indexed {count}, {unreadable} files unreadable")
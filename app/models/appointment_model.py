@@ -1,4 +1,5 @@
 from datetime import datetime
+from app.models.datetime_codec import combine
 
 class AppointmentModel:
     def __init__(self, patient_email, doctor_email, date, time, status="pending"):
@@ -22,6 +23,8 @@ class AppointmentModel:
             "doctor_name": self.doctor_name,
             "date": self.date,
             "time": self.time,
+            # date and time as one datetime, for indexed range queries
+            "scheduled_at": combine(self.date, self.time),
             "status": self.status,
             "priority": self.priority,
             "payment_id": self.payment_id,
@@ -1,4 +1,6 @@
 from datetime import datetime
+from app.utils.money import Money
+from app.models.datetime_codec import combine
 
 class BillingModel:
     def __init__(self, patient_email, patient_name, doctor_email, doctor_name, amount, 
@@ -8,7 +10,8 @@ class BillingModel:
         self.patient_name = patient_name
         self.doctor_email = doctor_email
         self.doctor_name = doctor_name
-        self.amount = amount
+        # Raises InvalidAmountError for anything that is not a number
+        self.amount = Money.parse(amount)
         # Mask all but last 4 digits of card number
         self.card_number = "*" * 12 + card_number[-4:] if card_number else None
         self.card_holder = card_holder
@@ -27,7 +30,7 @@ class BillingModel:
             "patient_name": self.patient_name,
             "doctor_email": self.doctor_email,
             "doctor_name": self.doctor_name,
-            "amount": self.amount,
+            **self.amount.to_document(),
             "card_number": self.card_number,
             "card_holder": self.card_holder,
             "expiry_date": self.expiry_date,
@@ -35,6 +38,7 @@ class BillingModel:
             "schedule_time": self.schedule_time,
             "payment_date": self.payment_date,
             "payment_time": self.payment_time,
+            "paid_at": combine(self.payment_date, self.payment_time),
             "payment_status": self.payment_status,
             "transaction_id": self.transaction_id,
             "created_at": self.created_at
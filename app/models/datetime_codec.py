@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+
+DATE_FORMAT = "%Y-%m-%d"
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+TIME_FORMATS = ("%H:%M", "%H:%M:%S", "%I:%M %p")
+
+# Timestamps are naive local time, like the datetime.now() values stored elsewhere
+
+
+def parse_time(value):
+    """
+    "HH:MM", "HH:MM:SS" or "HH:MM AM" to a datetime.time, or None
+    """
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).time()
+        except (ValueError, AttributeError):
+            continue
+    return None
+
+
+def combine(date_str, time_str):
+    """
+    Separate date and time strings (appointment date/time, payment_date/payment_time)
+    to one datetime, or None when either is unparseable
+    """
+    try:
+        day = datetime.strptime(date_str.strip(), DATE_FORMAT)
+    except (ValueError, AttributeError):
+        return None
+    clock = parse_time(time_str)
+    if clock is None:
+        return None
+    return datetime.combine(day.date(), clock)
+
+
+def parse_timestamp(value):
+    """
+    A stored or client-supplied timestamp to a naive datetime, or None.
+    Accepts datetimes, "YYYY-MM-DD HH:MM:SS" and ISO 8601 (a trailing Z or
+    offset is converted to local time).
+    """
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, str) and value.strip():
+        text = value.strip()
+        if text.endswith("Z"):
+            text = text[:-1] + "+00:00"
+        try:
+            parsed = datetime.fromisoformat(text)
+        except ValueError:
+            try:
+                parsed = datetime.strptime(text, TIMESTAMP_FORMAT)
+            except ValueError:
+                return None
+    else:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def day_range(start, end):
+    """
+    Inclusive YYYY-MM-DD bounds (either may be None) to a half-open datetime
+    range query: {"$gte": start 00:00, "$lt": the day after end}
+    """
+    bounds = {}
+    if start:
+        bounds["$gte"] = datetime.strptime(start, DATE_FORMAT)
+    if end:
+        bounds["$lt"] = datetime.strptime(end, DATE_FORMAT) + timedelta(days=1)
+    return bounds
+
+
+class DatetimeCodec:
+    """
+    Converts the BSON datetimes a collection stores into the strings its
+    API responses have always carried, so clients are unaffected by the
+    storage format.
+
+    fields maps each stored field to (wire field, strftime format); a None
+    format means ISO 8601.
+    """
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def to_wire(self, doc):
+        for stored, (wire, fmt) in self.fields.items():
+            if stored not in doc:
+                continue
+            value = doc.pop(stored) if wire != stored else doc[stored]
+            if isinstance(value, datetime):
+                value = value.strftime(fmt) if fmt else value.isoformat()
+            doc[wire] = value
+        return doc
+
+    def to_wire_many(self, docs):
+        return [self.to_wire(doc) for doc in docs]
+
+
+APPOINTMENT_CODEC = DatetimeCodec({
+    "scheduled_at": ("scheduled_at", TIMESTAMP_FORMAT),
+    "created_at": ("created_at", TIMESTAMP_FORMAT),
+    "updated_at": ("updated_at", TIMESTAMP_FORMAT),
+})
+
+BILLING_CODEC = DatetimeCodec({
+    "paid_at": ("paid_at", TIMESTAMP_FORMAT),
+})
+
+PRESCRIPTION_CODEC = DatetimeCodec({
+    # Clients have always read the camelCase field they once supplied
+    "created_at": ("createdAt", None),
+})
@@ -1,4 +1,5 @@
 from datetime import datetime
+from app.models.datetime_codec import parse_timestamp
 
 class PrescriptionModel:
     def __init__(self, blood_pressure, heart_rate, temperature, symptoms, disease, medicines, doctor_email, created_at=None):
@@ -9,7 +10,7 @@ class PrescriptionModel:
         self.disease = disease
         self.medicines = medicines  # List of dicts: [{medicine, timetable}]
         self.doctor_email = doctor_email
-        self.created_at = created_at or datetime.now().isoformat()
+        self.created_at = parse_timestamp(created_at) or datetime.now()
 
     def to_dict(self):
         return {
@@ -3,6 +3,8 @@ from flask import Blueprint
 from app.controllers.appointment_controller import (
     get_all_appointments,
     create_appointment,
+    create_appointments_bulk,
+    get_doctor_availability,
     update_appointment_status,
     delete_appointment
 )
@@ -12,5 +14,7 @@ appointment_routes = Blueprint("appointment_routes", __name__)
 # Register routes
 appointment_routes.route("/", methods=["GET"])(get_all_appointments)
 appointment_routes.route("/", methods=["POST"])(create_appointment)
+appointment_routes.route("/bulk", methods=["POST"])(create_appointments_bulk)
+appointment_routes.route("/availability", methods=["GET"])(get_doctor_availability)
 appointment_routes.route("/<appointment_id>", methods=["PUT"])(update_appointment_status)
 appointment_routes.route("/<appointment_id>", methods=["DELETE"])(delete_appointment)
@@ -1,13 +1,16 @@
 # app/routes/billing_routes.py
 
 from flask import Blueprint
-from app.controllers.billing_controller import get_all_billings, process_payment, get_payment_history
+from app.controllers.billing_controller import get_all_billings, process_payment, get_payment_history, export_billings
 
 billing_routes = Blueprint("billing_routes", __name__)
 
 # GET all billings
 billing_routes.route("/", methods=["GET"])(get_all_billings)
 
+# GET a streamed NDJSON/CSV export
+billing_routes.route("/export", methods=["GET"])(export_billings)
+
 # POST a new payment
 billing_routes.route("/", methods=["POST"])(process_payment)
 
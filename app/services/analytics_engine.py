@@ -0,0 +1,299 @@
+from threading import Lock
+import os
+import time
+
+import numpy as np
+
+NO_SHOW_STATUSES = {"no-show", "no show", "noshow", "missed"}
+ATTENDED_STATUSES = {"visited", "completed"}
+DEFAULT_PERCENTILES = (50, 75, 90, 95, 99)
+
+
+class ColumnEncoder:
+    """
+    Maps strings (doctor emails, statuses) to dense integer codes so they
+    can be grouped with np.bincount.
+    """
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def _parse_days(date_strings):
+    """
+    "YYYY-MM-DD" strings to int64 days since 1970-01-01; unparseable values become -1
+    """
+    try:
+        return np.array(date_strings, dtype="datetime64[D]").astype(np.int64)
+    except ValueError:
+        days = np.full(len(date_strings), -1, dtype=np.int64)
+        for i, value in enumerate(date_strings):
+            try:
+                days[i] = np.datetime64(value, "D").astype(np.int64)
+            except (ValueError, TypeError):
+                pass
+        return days
+
+
+def _parse_amounts(values):
+    try:
+        # None becomes NaN here; count it as zero like the unparseable values below
+        return np.nan_to_num(np.array(values, dtype=np.float64))
+    except (ValueError, TypeError):
+        amounts = np.zeros(len(values), dtype=np.float64)
+        for i, value in enumerate(values):
+            try:
+                amounts[i] = float(value)
+            except (ValueError, TypeError):
+                pass
+        return amounts
+
+
+def _day_label(day):
+    return str(np.datetime64(int(day), "D"))
+
+
+class BillingColumns:
+    def __init__(self, amounts, doctors, days, doctor_encoder):
+        self.amounts = amounts
+        self.doctors = doctors
+        self.days = days
+        self.doctor_encoder = doctor_encoder
+
+
+class AppointmentColumns:
+    def __init__(self, statuses, doctors, days, status_encoder, doctor_encoder):
+        self.statuses = statuses
+        self.doctors = doctors
+        self.days = days
+        self.status_encoder = status_encoder
+        self.doctor_encoder = doctor_encoder
+
+
+def load_billing_columns(collection, batch_size=10000):
+    """
+    Stream Billing into NumPy columns, converting one batch at a time
+    """
+    encoder = ColumnEncoder()
+    amounts, doctors, days = [], [], []
+    batch_amounts, batch_doctors, batch_days = [], [], []
+
+    def flush():
+        amounts.append(_parse_amounts(batch_amounts))
+        doctors.append(np.array(batch_doctors, dtype=np.int32))
+        days.append(_parse_days(batch_days))
+        batch_amounts.clear()
+        batch_doctors.clear()
+        batch_days.clear()
+
+    cursor = collection.find(
+        {}, {"_id": 0, "amount": 1, "amount_cents": 1, "doctor_email": 1, "payment_date": 1}
+    ).batch_size(batch_size)
+    for doc in cursor:
+        cents = doc.get("amount_cents")
+        batch_amounts.append(cents / 100 if cents is not None else doc.get("amount", 0))
+        batch_doctors.append(encoder.encode(doc.get("doctor_email")))
+        batch_days.append(doc.get("payment_date") or "NaT")
+        if len(batch_amounts) >= batch_size:
+            flush()
+    flush()
+
+    return BillingColumns(np.concatenate(amounts), np.concatenate(doctors), np.concatenate(days), encoder)
+
+
+def load_appointment_columns(collection, batch_size=10000):
+    status_encoder = ColumnEncoder()
+    doctor_encoder = ColumnEncoder()
+    statuses, doctors, days = [], [], []
+    batch_statuses, batch_doctors, batch_days = [], [], []
+
+    def flush():
+        statuses.append(np.array(batch_statuses, dtype=np.int32))
+        doctors.append(np.array(batch_doctors, dtype=np.int32))
+        days.append(_parse_days(batch_days))
+        batch_statuses.clear()
+        batch_doctors.clear()
+        batch_days.clear()
+
+    cursor = collection.find(
+        {}, {"_id": 0, "status": 1, "doctor_email": 1, "date": 1}
+    ).batch_size(batch_size)
+    for doc in cursor:
+        batch_statuses.append(status_encoder.encode((doc.get("status") or "unknown").strip().lower()))
+        batch_doctors.append(doctor_encoder.encode(doc.get("doctor_email")))
+        batch_days.append(doc.get("date") or "NaT")
+        if len(batch_statuses) >= batch_size:
+            flush()
+    flush()
+
+    return AppointmentColumns(
+        np.concatenate(statuses), np.concatenate(doctors), np.concatenate(days),
+        status_encoder, doctor_encoder
+    )
+
+
+class AnalyticsEngine:
+    """
+    Hospital analytics computed with vectorized NumPy operations over
+    columns loaded from Billing and Appointments.
+
+    Loaded columns and computed results are cached for cache_ttl seconds,
+    so dashboards polling the endpoints trigger at most one reload per
+    period. Load functions are injectable so the engine can be benchmarked
+    on synthetic data.
+    """
+
+    def __init__(self, billing_loader, appointment_loader, cache_ttl=None):
+        self.billing_loader = billing_loader
+        self.appointment_loader = appointment_loader
+        self.cache_ttl = float(cache_ttl if cache_ttl is not None else os.getenv("ANALYTICS_CACHE_SECONDS", 60))
+        self._cache = {}
+        self._lock = Lock()
+
+    def _cached(self, key, compute):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry and now - entry[1] < self.cache_ttl:
+            return entry[0]
+        value = compute()
+        with self._lock:
+            self._cache[key] = (value, now)
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._cache.clear()
+
+    def billing(self):
+        return self._cached(("columns", "billing"), self.billing_loader)
+
+    def appointments(self):
+        return self._cached(("columns", "appointments"), self.appointment_loader)
+
+    # ── Filtering ────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _mask(columns, start=None, end=None, doctor_email=None):
+        mask = np.ones(len(columns.days), dtype=bool)
+        if start is not None:
+            mask &= columns.days >= np.datetime64(start, "D").astype(np.int64)
+        if end is not None:
+            mask &= columns.days <= np.datetime64(end, "D").astype(np.int64)
+        if doctor_email is not None:
+            code = columns.doctor_encoder.codes.get(doctor_email)
+            if code is None:
+                mask[:] = False
+            else:
+                mask &= columns.doctors == code
+        return mask
+
+    # ── Metrics ──────────────────────────────────────────────────────────
+
+    def revenue(self, group_by="doctor", start=None, end=None, doctor_email=None):
+        """
+        Revenue grouped by "doctor", "day" or "week" (weeks start on Monday)
+        """
+        def compute():
+            cols = self.billing()
+            mask = self._mask(cols, start, end, doctor_email)
+            amounts = cols.amounts[mask]
+
+            if group_by == "doctor":
+                totals = np.bincount(cols.doctors[mask], weights=amounts, minlength=len(cols.doctor_encoder.values))
+                counts = np.bincount(cols.doctors[mask], minlength=len(cols.doctor_encoder.values))
+                labels = cols.doctor_encoder.values
+                rows = [
+                    {"doctor_email": labels[i], "total": round(float(totals[i]), 2), "payments": int(counts[i])}
+                    for i in np.flatnonzero(counts)
+                ]
+                return sorted(rows, key=lambda row: row["total"], reverse=True)
+
+            days = cols.days[mask]
+            valid = days >= 0
+            days, amounts = days[valid], amounts[valid]
+            if not len(days):
+                return []
+            if group_by == "week":
+                # 1970-01-05 (day 4) was a Monday
+                days = (days - 4) // 7 * 7 + 4
+            # Dense bincount over the day offsets: linear, unlike np.unique's sort
+            first = days.min()
+            offsets = days - first
+            totals = np.bincount(offsets, weights=amounts)
+            counts = np.bincount(offsets)
+            label = "week_start" if group_by == "week" else "date"
+            return [
+                {label: _day_label(first + i), "total": round(float(totals[i]), 2), "payments": int(counts[i])}
+                for i in np.flatnonzero(counts)
+            ]
+
+        if group_by not in ("doctor", "day", "week"):
+            raise ValueError("group_by must be doctor, day or week")
+        return self._cached(("revenue", group_by, start, end, doctor_email), compute)
+
+    def appointment_volumes(self, start=None, end=None, doctor_email=None):
+        def compute():
+            cols = self.appointments()
+            mask = self._mask(cols, start, end, doctor_email)
+            counts = np.bincount(cols.statuses[mask], minlength=len(cols.status_encoder.values))
+            return {cols.status_encoder.values[i]: int(counts[i]) for i in np.flatnonzero(counts)}
+        return self._cached(("volumes", start, end, doctor_email), compute)
+
+    def no_show_rates(self, start=None, end=None):
+        """
+        Share of no-shows among appointments that reached an outcome
+        (no-show, visited or completed), overall and per doctor
+        """
+        def compute():
+            cols = self.appointments()
+            mask = self._mask(cols, start, end)
+            # Per-status lookup tables, indexed by status code
+            statuses = np.array(cols.status_encoder.values, dtype=object)
+            is_no_show = np.isin(statuses, list(NO_SHOW_STATUSES))
+            is_decided = is_no_show | np.isin(statuses, list(ATTENDED_STATUSES))
+            no_show = mask & is_no_show[cols.statuses]
+            decided = mask & is_decided[cols.statuses]
+
+            size = len(cols.doctor_encoder.values)
+            per_doctor_no_show = np.bincount(cols.doctors[no_show], minlength=size)
+            per_doctor_decided = np.bincount(cols.doctors[decided], minlength=size)
+            doctors = [
+                {
+                    "doctor_email": cols.doctor_encoder.values[i],
+                    "no_shows": int(per_doctor_no_show[i]),
+                    "appointments": int(per_doctor_decided[i]),
+                    "rate": float(per_doctor_no_show[i] / per_doctor_decided[i])
+                }
+                for i in np.flatnonzero(per_doctor_decided)
+            ]
+            total_decided = int(decided.sum())
+            return {
+                "no_shows": int(no_show.sum()),
+                "appointments": total_decided,
+                "rate": float(no_show.sum() / total_decided) if total_decided else 0.0,
+                "doctors": doctors
+            }
+        return self._cached(("no_show", start, end), compute)
+
+    def payment_percentiles(self, percentiles=DEFAULT_PERCENTILES, start=None, end=None, doctor_email=None):
+        def compute():
+            cols = self.billing()
+            amounts = cols.amounts[self._mask(cols, start, end, doctor_email)]
+            if not len(amounts):
+                return {"count": 0, "percentiles": {}}
+            values = np.percentile(amounts, percentiles)
+            return {
+                "count": int(len(amounts)),
+                "mean": round(float(amounts.mean()), 2),
+                "percentiles": {f"p{p}": round(float(v), 2) for p, v in zip(percentiles, values)}
+            }
+        return self._cached(("percentiles", tuple(percentiles), start, end, doctor_email), compute)
@@ -0,0 +1,233 @@
+from pymongo import ReturnDocument, UpdateOne
+from bson import ObjectId
+from datetime import datetime, timedelta
+from threading import Lock
+import logging
+import os
+import time as time_module
+
+logger = logging.getLogger(__name__)
+
+
+class AvailabilityCalendar:
+    """
+    Precomputed per-doctor, per-day slot bookings.
+
+    Each document in the DoctorCalendar collection holds one doctor's day as
+    {"slots": {"<i>": count}}, the number of active appointments in slot i
+    (i * slot_minutes after midnight). Several appointment times can share a
+    slot, so booking and releasing are atomic $inc updates and a slot is
+    free again once its count is back to zero. The appointment endpoints
+    keep the counts current, so answering "which slots are free this week"
+    means reading at most one small document per day rather than scanning
+    Appointments. Recently read days are also kept in a short-lived
+    in-process cache, as bitmaps whose bit i is set when slot i is booked.
+    """
+    MAX_SLOTS_PER_DAY = 63  # availability lists at most this many slots a day
+
+    def __init__(self, collection, appointments_collection, slot_minutes=None,
+                 open_time=None, close_time=None, cache_ttl=None):
+        self.collection = collection
+        self.appointments_collection = appointments_collection
+        self.slot_minutes = int(slot_minutes or os.getenv("APPOINTMENT_SLOT_MINUTES", 30))
+        if self.slot_minutes <= 0 or 24 * 60 // self.slot_minutes > self.MAX_SLOTS_PER_DAY:
+            raise ValueError(f"slot_minutes must give at most {self.MAX_SLOTS_PER_DAY} slots per day")
+        self.open_time = open_time or os.getenv("CLINIC_OPEN_TIME", "09:00")
+        self.close_time = close_time or os.getenv("CLINIC_CLOSE_TIME", "17:00")
+        self.cache_ttl = float(cache_ttl if cache_ttl is not None else os.getenv("CALENDAR_CACHE_SECONDS", 30))
+        self.working_mask = self._range_mask(self.open_time, self.close_time)
+        self._cache = {}
+        self._cache_lock = Lock()
+
+    # ── Slot arithmetic ───────────────────────────────────────────────────
+
+    def slot_index(self, time_str):
+        """
+        Map an appointment time ("HH:MM", "HH:MM:SS" or "HH:MM AM") to its slot number
+        """
+        for fmt in ("%H:%M", "%H:%M:%S", "%I:%M %p"):
+            try:
+                parsed = datetime.strptime(time_str.strip(), fmt)
+                return (parsed.hour * 60 + parsed.minute) // self.slot_minutes
+            except (ValueError, AttributeError):
+                continue
+        return None
+
+    def slot_label(self, index):
+        minutes = index * self.slot_minutes
+        return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+    def _range_mask(self, start, end):
+        first = self.slot_index(start)
+        last = self.slot_index(end)
+        if first is None or last is None or last <= first:
+            raise ValueError(f"Invalid working hours {start}-{end}")
+        return ((1 << (last - first)) - 1) << first
+
+    # ── Cache ────────────────────────────────────────────────────────────
+
+    @staticmethod
+    def _bitmap(doc):
+        return sum(1 << int(index) for index, count in ((doc or {}).get("slots") or {}).items() if count > 0)
+
+    def _cache_put(self, doctor_email, date, bitmap):
+        with self._cache_lock:
+            self._cache[(doctor_email, date)] = (bitmap, time_module.monotonic())
+
+    def _cache_get(self, doctor_email, date):
+        with self._cache_lock:
+            entry = self._cache.get((doctor_email, date))
+        if entry and time_module.monotonic() - entry[1] < self.cache_ttl:
+            return entry[0]
+        return None
+
+    # ── Write path, called by the appointment endpoints ──────────────────
+
+    def book(self, doctor_email, date, time):
+        index = self.slot_index(time)
+        if index is None:
+            logger.warning(f"Unrecognised appointment time {time!r}, calendar not updated")
+            return
+        doc = self.collection.find_one_and_update(
+            {"doctor_email": doctor_email, "date": date},
+            {"$inc": {f"slots.{index}": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self._cache_put(doctor_email, date, self._bitmap(doc))
+
+    def book_many(self, slots):
+        """
+        Count a batch of (doctor_email, date, time) slots booked, with one
+        $inc update per doctor-day sent in a single bulk_write.
+        """
+        counts = {}
+        for doctor_email, date, time in slots:
+            index = self.slot_index(time)
+            if index is None:
+                logger.warning(f"Unrecognised appointment time {time!r}, calendar not updated")
+                continue
+            day = counts.setdefault((doctor_email, date), {})
+            day[f"slots.{index}"] = day.get(f"slots.{index}", 0) + 1
+        if not counts:
+            return
+
+        self.collection.bulk_write([
+            UpdateOne({"doctor_email": doctor, "date": date}, {"$inc": increments}, upsert=True)
+            for (doctor, date), increments in counts.items()
+        ], ordered=False)
+        # bulk_write does not return the new counts, let the next read fetch them
+        with self._cache_lock:
+            for key in counts:
+                self._cache.pop(key, None)
+
+    def release(self, doctor_email, date, time):
+        index = self.slot_index(time)
+        if index is None:
+            return
+        # The count never drops below zero, so a stray release cannot free another booking
+        doc = self.collection.find_one_and_update(
+            {"doctor_email": doctor_email, "date": date, f"slots.{index}": {"$gt": 0}},
+            {"$inc": {f"slots.{index}": -1}},
+            return_document=ReturnDocument.AFTER
+        )
+        if doc:
+            self._cache_put(doctor_email, date, self._bitmap(doc))
+        else:
+            with self._cache_lock:
+                self._cache.pop((doctor_email, date), None)
+
+    # ── Read path ────────────────────────────────────────────────────────
+
+    def get_bitmaps(self, doctor_email, dates):
+        bitmaps = {}
+        missing = []
+        for date in dates:
+            cached = self._cache_get(doctor_email, date)
+            if cached is None:
+                missing.append(date)
+            else:
+                bitmaps[date] = cached
+
+        if missing:
+            found = {
+                doc["date"]: self._bitmap(doc)
+                for doc in self.collection.find(
+                    {"doctor_email": doctor_email, "date": {"$in": missing}},
+                    {"_id": 0, "date": 1, "slots": 1}
+                )
+            }
+            for date in missing:
+                bitmaps[date] = found.get(date, 0)
+                self._cache_put(doctor_email, date, bitmaps[date])
+        return bitmaps
+
+    def availability(self, doctor_email, start, end):
+        """
+        Free and booked slot labels for every day from start to end inclusive (datetime.date)
+        """
+        dates = []
+        day = start
+        while day <= end:
+            dates.append(day.strftime("%Y-%m-%d"))
+            day += timedelta(days=1)
+
+        bitmaps = self.get_bitmaps(doctor_email, dates)
+        days = []
+        for date in dates:
+            booked = bitmaps[date]
+            free = self.working_mask & ~booked
+            days.append({
+                "date": date,
+                "free": [self.slot_label(i) for i in range(self.MAX_SLOTS_PER_DAY) if free >> i & 1],
+                "booked": [self.slot_label(i) for i in range(self.MAX_SLOTS_PER_DAY) if booked >> i & 1]
+            })
+        return days
+
+    # ── Maintenance ──────────────────────────────────────────────────────
+
+    def rebuild(self, batch_size=1000):
+        """
+        Recompute every day's counts from Appointments. Needed once for data
+        booked before the calendar existed, and to repair counts after a
+        failed calendar write: python -m app.services.availability_calendar
+
+        Days are overwritten in place and days without bookings removed
+        afterwards, so readers never see an empty calendar meanwhile.
+        Bookings made while it runs can be miscounted; run it when quiet.
+        """
+        # Documents written from here on carry a newer _id or this run's stamp
+        run = ObjectId()
+        counts = {}
+        cursor = self.appointments_collection.find(
+            {"slot_active": True},
+            {"_id": 0, "doctor_email": 1, "date": 1, "time": 1}
+        ).batch_size(batch_size)
+        for appt in cursor:
+            index = self.slot_index(appt.get("time"))
+            if index is None or not appt.get("doctor_email") or not appt.get("date"):
+                continue
+            day = counts.setdefault((appt["doctor_email"], appt["date"]), {})
+            day[str(index)] = day.get(str(index), 0) + 1
+
+        operations = [
+            UpdateOne(
+                {"doctor_email": doctor, "date": date},
+                {"$set": {"slots": slots, "rebuild": run}, "$unset": {"booked": ""}},
+                upsert=True
+            )
+            for (doctor, date), slots in counts.items()
+        ]
+        for i in range(0, len(operations), batch_size):
+            self.collection.bulk_write(operations[i:i + batch_size], ordered=False)
+        self.collection.delete_many({"rebuild": {"$ne": run}, "_id": {"$lt": run}})
+        with self._cache_lock:
+            self._cache.clear()
+        return len(counts)
+
+if __name__ == "__main__":
+    from app.services.db_connection import DatabaseConnection
+
+    db = DatabaseConnection().get_database()
+    days = AvailabilityCalendar(db["DoctorCalendar"], db["Appointments"]).rebuild()
+    print(f"Rebuilt calendar for {days} doctor-days")
@@ -0,0 +1,163 @@
+from datetime import datetime
+import os
+import re
+import uuid
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.utils.files import save_stream
+
+# A stored file name: the content's SHA-256, optionally with an extension
+BLOB_NAME = re.compile(r"^([0-9a-f]{64})(?:\.[A-Za-z0-9]+)?$")
+
+
+class BlobStore:
+    """
+    Content-addressed file store.
+
+    A file lives at <directory>/ab/cd/<sha256>, so identical uploads share
+    one copy and no two different files can ever claim the same name. The
+    two levels of fan-out keep directories small at millions of blobs.
+
+    Each blob has a document in the Blobs collection counting the records
+    that point at it; put_* takes a reference and release drops one, and
+    the file is deleted only when nothing references it any more.
+    """
+
+    def __init__(self, directory, collection):
+        self.directory = directory
+        self.collection = collection
+        self.tmp_directory = os.path.join(directory, "tmp")
+        os.makedirs(self.tmp_directory, exist_ok=True)
+
+    @staticmethod
+    def name(digest, extension=None):
+        """
+        The public name of a blob; the extension only tells clients the type
+        """
+        return f"{digest}.{extension.lower()}" if extension else digest
+
+    @staticmethod
+    def digest_of(name):
+        """
+        The digest a blob name refers to, or None for any other file name
+        """
+        match = BLOB_NAME.match(name or "")
+        return match.group(1) if match else None
+
+    def path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest[2:4], digest)
+
+    def tmp_path(self):
+        """
+        A scratch path on the store's filesystem, so finished files can be
+        moved into place atomically
+        """
+        return os.path.join(self.tmp_directory, f"{uuid.uuid4().hex}.tmp")
+
+    def put_stream(self, stream):
+        """
+        Store a readable stream, hashing it while it is written.
+        Returns (digest, size) and holds one reference for the caller.
+        """
+        tmp_path = self.tmp_path()
+        try:
+            digest, size = save_stream(stream, tmp_path)
+            self.put_file(tmp_path, digest, size)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return digest, size
+
+    def put_file(self, tmp_path, digest, size=None):
+        """
+        Move a finished file whose digest is already known into the store and
+        take a reference to it. tmp_path is consumed: when the content is
+        already stored the new copy is simply discarded.
+        """
+        if size is None:
+            size = os.path.getsize(tmp_path)
+        self._acquire(digest, size)
+        # The reference is taken before the file is placed; see collect
+        path = self.path(digest)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        return digest
+
+    def _acquire(self, digest, size):
+        now = datetime.now()
+        update = {
+            "$inc": {"refcount": 1},
+            "$set": {"updated_at": now},
+            "$setOnInsert": {"size": size, "created_at": now}
+        }
+        try:
+            self.collection.update_one({"_id": digest}, update, upsert=True)
+        except DuplicateKeyError:
+            # Another upload of the same content inserted the document first
+            self.collection.update_one({"_id": digest}, update, upsert=True)
+
+    def release(self, digest):
+        """
+        Drop one reference; the blob is deleted with its last reference.
+        Returns the number of bytes freed.
+        """
+        blob = self.collection.find_one_and_update(
+            {"_id": digest},
+            {"$inc": {"refcount": -1}, "$set": {"updated_at": datetime.now()}},
+            return_document=ReturnDocument.AFTER
+        )
+        if blob is None or blob["refcount"] > 0:
+            return 0
+        return self.collect(digest)
+
+    def collect(self, digest):
+        """
+        Delete an unreferenced blob; returns the number of bytes freed.
+
+        A concurrent put of the same content may re-reference the blob at any
+        point. The file is therefore first moved aside, and put back if a
+        reference appeared in the meantime: a put takes its reference before
+        it checks for the file, so one of the two always sees the other.
+        """
+        if not self.collection.delete_one({"_id": digest, "refcount": {"$lte": 0}}).deleted_count:
+            return 0
+        return self.discard(digest)
+
+    def discard(self, digest):
+        """
+        Delete a blob file that has no Blobs document, unless a put claims it
+        meanwhile. Returns the number of bytes freed.
+        """
+        path = self.path(digest)
+        trash_path = self.tmp_path()
+        try:
+            os.replace(path, trash_path)
+        except FileNotFoundError:
+            return 0
+        if self.collection.find_one({"_id": digest}, {"_id": 1}):
+            os.replace(trash_path, path)
+            return 0
+        size = os.path.getsize(trash_path)
+        os.remove(trash_path)
+        return size
+
+    def scan(self):
+        """
+        Yield the digest of every stored file, one shard directory at a time
+        """
+        for first in _subdirectories(self.directory):
+            for second in _subdirectories(os.path.join(self.directory, first)):
+                with os.scandir(os.path.join(self.directory, first, second)) as entries:
+                    for entry in entries:
+                        if BLOB_NAME.match(entry.name) and "." not in entry.name:
+                            yield entry.name
+
+
+def _subdirectories(path):
+    with os.scandir(path) as entries:
+        return sorted(e.name for e in entries if e.is_dir() and len(e.name) == 2)
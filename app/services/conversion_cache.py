@@ -0,0 +1,172 @@
+from collections import OrderedDict
+from threading import Lock
+import hashlib
+import os
+import time
+import uuid
+
+
+class ConversionCache:
+    """
+    On-disk LRU of converted reports.
+
+    Entries are keyed by (report id, content hash, format): a report whose
+    source changes gets a new key, so entries never need invalidating. The
+    key digest doubles as a strong ETag. Recency is kept in memory and
+    seeded from file mtimes on startup; once the files exceed max_bytes the
+    least recently used ones are deleted.
+    """
+
+    def __init__(self, directory, max_bytes=None):
+        self.directory = directory
+        self.max_bytes = int(max_bytes or os.getenv("REPORT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+        self._entries = OrderedDict()  # file name -> size, least recently used first
+        self._size = 0
+        self._lock = Lock()
+        self._key_locks = {}
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        files = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or entry.name.startswith("."):
+                    continue
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._size += size
+
+    @staticmethod
+    def key(report_id, content_hash, output_format):
+        return hashlib.sha256(f"{report_id}:{content_hash}:{output_format}".encode("utf-8")).hexdigest()
+
+    def _filename(self, key, output_format):
+        return f"{key}.{output_format}"
+
+    def get(self, key, output_format):
+        """
+        Path of a cached conversion, or None
+        """
+        path = self._lookup(self._filename(key, output_format))
+        with self._lock:
+            if path:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return path
+
+    def _lookup(self, name):
+        with self._lock:
+            if name not in self._entries:
+                return None
+            self._entries.move_to_end(name)
+        path = os.path.join(self.directory, name)
+        try:
+            os.utime(path)  # keeps the order across restarts
+        except FileNotFoundError:
+            with self._lock:
+                self._size -= self._entries.pop(name, 0)
+            return None
+        return path
+
+    def get_or_create(self, key, output_format, render):
+        """
+        Path of the cached conversion, calling render(path) to write it on a
+        miss. Concurrent misses for one key render once.
+        """
+        path = self.get(key, output_format)
+        if path:
+            return path
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, Lock())
+        with key_lock:
+            name = self._filename(key, output_format)
+            path = self._lookup(name)
+            if path:
+                # Rendered by the thread we waited for
+                return path
+            path = os.path.join(self.directory, name)
+            tmp_path = os.path.join(self.directory, f".{uuid.uuid4().hex}.tmp")
+            try:
+                render(tmp_path)
+                os.replace(tmp_path, path)
+                with self._lock:
+                    self._entries[name] = os.path.getsize(path)
+                    self._size += self._entries[name]
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                with self._lock:
+                    self._key_locks.pop(key, None)
+        self._evict()
+        return path
+
+    def _evict(self):
+        while True:
+            with self._lock:
+                if self._size <= self.max_bytes or len(self._entries) <= 1:
+                    return
+                name, size = self._entries.popitem(last=False)
+                self._size -= size
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def expire(self, max_age_seconds):
+        """
+        Delete conversions not used for max_age_seconds, including ones
+        written by other processes. Returns (entries, bytes) removed.
+        """
+        cutoff = time.time() - max_age_seconds
+        removed = freed = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                    if stat.st_mtime >= cutoff:
+                        continue
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+                with self._lock:
+                    self._size -= self._entries.pop(entry.name, 0)
+                removed += 1
+                freed += stat.st_size
+        return removed, freed
+
+    def trim(self, max_bytes):
+        """
+        Evict least recently used conversions until at most max_bytes are
+        cached. Returns the number of bytes freed.
+        """
+        freed = 0
+        while True:
+            with self._lock:
+                if self._size <= max_bytes or not self._entries:
+                    return freed
+                name, size = self._entries.popitem(last=False)
+                self._size -= size
+            try:
+                os.remove(os.path.join(self.directory, name))
+                freed += size
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
@@ -0,0 +1,124 @@
+from pymongo import ASCENDING, TEXT
+from pymongo.errors import ConnectionFailure, PyMongoError
+from app.services.db_connection import DatabaseConnection
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Index definitions per collection: (keys, options)
+INDEXES = {
+    "Appointments": [
+        # Keyset pagination and date ranges of GET /api/appointments, with and without filters
+        ([("scheduled_at", ASCENDING), ("_id", ASCENDING)], {"name": "scheduled_at_id"}),
+        ([("doctor_email", ASCENDING), ("scheduled_at", ASCENDING), ("_id", ASCENDING)], {"name": "doctor_scheduled_at_id"}),
+        ([("patient_email", ASCENDING), ("scheduled_at", ASCENDING), ("_id", ASCENDING)], {"name": "patient_scheduled_at_id"}),
+        ([("status", ASCENDING), ("scheduled_at", ASCENDING), ("_id", ASCENDING)], {"name": "status_scheduled_at_id"}),
+        # One active booking per doctor slot, see SlotReservationService
+        ([("doctor_email", ASCENDING), ("date", ASCENDING), ("time", ASCENDING)], {
+            "name": "active_slot_unique",
+            "unique": True,
+            "partialFilterExpression": {"slot_active": True}
+        }),
+    ],
+    "Billing": [
+        # Appointments look payments up by transaction id; it must identify exactly one
+        ([("transaction_id", ASCENDING)], {"name": "transaction_id_unique", "unique": True}),
+        # Finance exports filtered by payment time, optionally per doctor
+        ([("paid_at", ASCENDING)], {"name": "paid_at"}),
+        ([("doctor_email", ASCENDING), ("paid_at", ASCENDING)], {"name": "doctor_paid_at"}),
+        # Payments section of a patient chart, see HMSFacade.get_patient_chart
+        ([("patient_email", ASCENDING), ("paid_at", ASCENDING)], {"name": "patient_paid_at"}),
+    ],
+    "Prescriptions": [
+        # Patient and doctor prescription histories
+        ([("patient_email", ASCENDING), ("created_at", ASCENDING)], {"name": "patient_created_at"}),
+        ([("doctor_email", ASCENDING), ("patient_email", ASCENDING), ("created_at", ASCENDING)], {"name": "doctor_patient_created_at"}),
+    ],
+    "Reports": [
+        # Reports section of a patient chart, see HMSFacade.get_patient_chart
+        ([("patient_email", ASCENDING), ("upload_date", ASCENDING)], {"name": "patient_upload_date"}),
+        # Lookups of the reports using a legacy (non content-addressed) file,
+        # see stored_file_hash and update_or_delete_report
+        ([("original_file", ASCENDING)], {"name": "original_file"}),
+        ([("pdf_file", ASCENDING)], {"name": "pdf_file"}),
+        ([("json_file", ASCENDING)], {"name": "json_file"}),
+        # Blob reference counts are reconciled by digest, see UploadsCompactor
+        ([("original_sha256", ASCENDING)], {"name": "original_sha256"}),
+        ([("pdf_sha256", ASCENDING)], {"name": "pdf_sha256"}),
+        ([("json_sha256", ASCENDING)], {"name": "json_sha256"}),
+    ],
+    "ReportJobs": [
+        # Oldest queued job first, and expired leases of running ones, see ReportJobQueue
+        ([("status", ASCENDING), ("created_at", ASCENDING)], {"name": "status_created_at"}),
+        ([("status", ASCENDING), ("claimed_at", ASCENDING)], {"name": "status_claimed_at"}),
+    ],
+    "UploadSessions": [
+        # Abandoned resumable uploads expire; UploadsCompactor then deletes their part files
+        ([("expires_at", ASCENDING)], {"name": "expires_at_ttl", "expireAfterSeconds": 0}),
+    ],
+    "SearchIndex": [
+        ([("kind", ASCENDING), ("source_id", ASCENDING)], {"name": "kind_source_id_unique", "unique": True}),
+        # One text index ranks prescriptions and reports together, see SearchIndex
+        ([("title", TEXT), ("disease", TEXT), ("symptoms", TEXT), ("medicines", TEXT), ("text", TEXT)], {
+            "name": "search_text",
+            "weights": {"disease": 10, "medicines": 8, "symptoms": 5, "title": 3, "text": 1},
+            "default_language": "english"
+        }),
+    ],
+    "RevenueRollups": [
+        ([("day", ASCENDING), ("doctor_email", ASCENDING), ("service", ASCENDING)], {"name": "day_doctor_service_unique", "unique": True}),
+    ],
+    "OTPs": [
+        # Expired codes are purged by MongoDB, see MongoOTPStore
+        ([("expires_at", ASCENDING)], {"name": "expires_at_ttl", "expireAfterSeconds": 0}),
+    ],
+    "RevokedTokens": [
+        ([("revoked_at", ASCENDING)], {"name": "revoked_at"}),
+        # Revocations are dropped once the token would have expired anyway
+        ([("expires_at", ASCENDING)], {"name": "expires_at_ttl", "expireAfterSeconds": 0}),
+    ],
+    "IdempotencyKeys": [
+        # Keys are remembered for a day, see IdempotencyStore
+        ([("created_at", ASCENDING)], {"name": "created_at_ttl", "expireAfterSeconds": 86400}),
+    ],
+    "DoctorCalendar": [
+        ([("doctor_email", ASCENDING), ("date", ASCENDING)], {"name": "doctor_date_unique", "unique": True}),
+    ],
+}
+
+
+def _active_slot_index_ready(db):
+    from app.services.slot_reservation import SlotReservationService
+    return not SlotReservationService(db["Appointments"]).needs_backfill()
+
+
+# Indexes that existing data has to be migrated for first: name -> (check, how)
+INDEX_PRECONDITIONS = {
+    "active_slot_unique": (_active_slot_index_ready, "python -m app.services.slot_reservation"),
+}
+
+
+def ensure_indexes(db=None):
+    """
+    Create every index in INDEXES. create_index is a no-op for indexes that
+    already exist, so this is safe to call on every startup. An index in
+    INDEX_PRECONDITIONS is left out until its migration has run.
+    """
+    db = db if db is not None else DatabaseConnection().get_database()
+    for collection_name, specs in INDEXES.items():
+        for keys, options in specs:
+            try:
+                precondition = INDEX_PRECONDITIONS.get(options["name"])
+                if precondition and options["name"] not in db[collection_name].index_information():
+                    ready, migration = precondition
+                    if not ready(db):
+                        logger.warning(f"Not creating index {options['name']} on {collection_name} "
+                                       f"until existing data is migrated: {migration}")
+                        continue
+                db[collection_name].create_index(keys, **options)
+            except ConnectionFailure as e:
+                # No point trying the remaining indexes against an unreachable server
+                logger.error(f"Skipping index creation, database unreachable: {str(e)}")
+                return
+            except PyMongoError as e:
+                logger.error(f"Failed to create index {options.get('name')} on {collection_name}: {str(e)}")
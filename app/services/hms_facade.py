@@ -1,4 +1,34 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import os
+
+from pymongo import DESCENDING
+
 from app.services.db_connection import DatabaseConnection
+from app.models.datetime_codec import APPOINTMENT_CODEC, BILLING_CODEC, PRESCRIPTION_CODEC
+
+# Sections of a patient chart, newest first, each capped at the requested limit
+CHART_SECTIONS = ("prescriptions", "reports", "appointments", "payments")
+
+# Report fields a chart shows; stored file details stay behind the reports API
+CHART_REPORT_FIELDS = (
+    "upload_date", "patient_name", "patient_email", "doctor_email", "service",
+    "amount", "amount_cents", "status", "report_date", "report_time",
+    "original_file", "original_filename", "pdf_file", "json_file", "conversion_status"
+)
+
+# Shared by every request; the chart sections of one request run concurrently
+_chart_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("PATIENT_CHART_WORKERS", 8)), thread_name_prefix="chart"
+)
+
+
+def _report_to_wire(report):
+    report["id"] = str(report.pop("_id"))
+    if isinstance(report.get("upload_date"), datetime):
+        report["upload_date"] = report["upload_date"].isoformat()
+    return report
+
 
 class HMSFacade:
     def __init__(self):
@@ -6,7 +36,7 @@ class HMSFacade:
 
     def get_doctor_patient_records(self, doctor_email):
         # Returns appointments with status 'visited' or 'completed' for a doctor
-        return list(self.db["Appointments"].find(
+        return APPOINTMENT_CODEC.to_wire_many(self.db["Appointments"].find(
             {
                 "doctor_email": doctor_email,
                 "status": {"$in": ["visited", "completed"]}
@@ -16,10 +46,51 @@ class HMSFacade:
 
     def get_patient_prescriptions(self, doctor_email, patient_email):
         # Returns all prescriptions for a patient by a doctor
-        return list(self.db["Prescriptions"].find(
+        return PRESCRIPTION_CODEC.to_wire_many(self.db["Prescriptions"].find(
             {
                 "doctor_email": doctor_email,
                 "patient_email": patient_email
             },
             {"_id": 0}
         ))
+
+    def get_patient_chart(self, patient_email, doctor_email=None, limit=20):
+        """
+        A patient's prescriptions, reports, appointments and payments in one
+        payload. Each section is a single indexed query for the newest
+        limit + 1 records, and the four run in parallel, so a chart costs
+        the slowest query rather than the sum. doctor_email narrows
+        prescriptions and appointments to one doctor; reports and payments
+        are always all of the patient's.
+        Every section is {"items": [...], "has_more": bool}.
+        """
+        patient = {"patient_email": patient_email}
+        visits = {**patient, "doctor_email": doctor_email} if doctor_email else patient
+
+        queries = {
+            "prescriptions": (
+                "Prescriptions", visits, {"_id": 0}, "created_at", PRESCRIPTION_CODEC.to_wire
+            ),
+            "reports": (
+                "Reports", patient, {field: 1 for field in CHART_REPORT_FIELDS}, "upload_date", _report_to_wire
+            ),
+            "appointments": (
+                "Appointments", visits, {"_id": 0}, "scheduled_at", APPOINTMENT_CODEC.to_wire
+            ),
+            "payments": (
+                "Billing", patient, {"_id": 0}, "paid_at", BILLING_CODEC.to_wire
+            ),
+        }
+        futures = {
+            section: _chart_executor.submit(self._chart_section, *queries[section], limit)
+            for section in CHART_SECTIONS
+        }
+        return {section: future.result() for section, future in futures.items()}
+
+    def _chart_section(self, collection_name, query, projection, sort_field, to_wire, limit):
+        docs = list(
+            self.db[collection_name].find(query, projection)
+            .sort(sort_field, DESCENDING)
+            .limit(limit + 1)
+        )
+        return {"items": [to_wire(doc) for doc in docs[:limit]], "has_more": len(docs) > limit}
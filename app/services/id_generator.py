@@ -0,0 +1,99 @@
+from abc import ABC, abstractmethod
+from threading import Lock
+import os
+import secrets
+import time
+
+CROCKFORD_BASE32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+# Two base32 digits per lookup keeps encoding a 128-bit id to 13 steps
+_PAIRS = [a + b for a in CROCKFORD_BASE32 for b in CROCKFORD_BASE32]
+
+
+class IdGenerator(ABC):
+    @abstractmethod
+    def new_id(self):
+        pass
+
+
+class ULIDGenerator(IdGenerator):
+    """
+    ULID-style ids: 26 Crockford base32 characters encoding a 48-bit
+    millisecond timestamp followed by 80 random bits. Ids sort by creation
+    time; within one millisecond a process increments the random part, so
+    its ids are strictly increasing. Separate processes and nodes draw
+    independent 80-bit random parts, which makes a collision between them
+    practically impossible without any coordination.
+    """
+    RANDOM_BITS = 80
+
+    def __init__(self):
+        self._lock = Lock()
+        self._last_ms = -1
+        self._last_random = 0
+        self._pid = os.getpid()
+
+    def new_id(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # A forked child must not continue the parent's sequence
+                self._pid = os.getpid()
+                self._last_ms = -1
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._last_random = secrets.randbits(self.RANDOM_BITS)
+            else:
+                # Same millisecond (or the clock stepped back): keep counting upwards
+                self._last_random += 1
+                if self._last_random >> self.RANDOM_BITS:
+                    self._last_ms += 1
+                    self._last_random = secrets.randbits(self.RANDOM_BITS)
+            value = (self._last_ms << self.RANDOM_BITS) | self._last_random
+
+        # 130 bits as 13 pairs of base32 digits; the top 2 bits are always 0
+        return "".join(_PAIRS[(value >> shift) & 0x3FF] for shift in range(120, -1, -10))
+
+
+class SnowflakeIdGenerator(IdGenerator):
+    """
+    64-bit Snowflake ids: 41 bits of milliseconds since EPOCH_MS, a 10-bit
+    worker id and a 12-bit per-millisecond sequence. Guaranteed unique as
+    long as every process runs with its own worker_id (0-1023).
+    """
+    EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+    WORKER_BITS = 10
+    SEQUENCE_BITS = 12
+
+    def __init__(self, worker_id):
+        if not 0 <= worker_id < 1 << self.WORKER_BITS:
+            raise ValueError(f"worker_id must be between 0 and {(1 << self.WORKER_BITS) - 1}")
+        self.worker_id = worker_id
+        self._lock = Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    def new_id(self):
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000 - self.EPOCH_MS
+            if now_ms < self._last_ms:
+                # Clock stepped back: stay on the last timestamp instead of reusing ids
+                now_ms = self._last_ms
+            if now_ms == self._last_ms:
+                self._sequence = (self._sequence + 1) & ((1 << self.SEQUENCE_BITS) - 1)
+                if self._sequence == 0:
+                    # Sequence exhausted: borrow the next millisecond rather than spin
+                    now_ms = self._last_ms + 1
+            else:
+                self._sequence = 0
+            self._last_ms = now_ms
+            value = (now_ms << (self.WORKER_BITS + self.SEQUENCE_BITS)) | (self.worker_id << self.SEQUENCE_BITS) | self._sequence
+        return str(value)
+
+
+def create_id_generator():
+    """
+    ID_GENERATOR=snowflake (with a distinct ID_WORKER per process) or ulid (default)
+    """
+    if os.getenv("ID_GENERATOR", "ulid").lower() == "snowflake":
+        return SnowflakeIdGenerator(int(os.getenv("ID_WORKER", 0)))
+    return ULIDGenerator()
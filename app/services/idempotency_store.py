@@ -0,0 +1,114 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from threading import Lock
+import os
+
+# Outcomes of IdempotencyStore.begin
+IDEMPOTENCY_STARTED = "started"
+IDEMPOTENCY_COMPLETED = "completed"
+IDEMPOTENCY_IN_PROGRESS = "in_progress"
+IDEMPOTENCY_MISMATCH = "mismatch"
+
+
+class IdempotencyStore:
+    """
+    Remembers the response to each Idempotency-Key so a retried request gets
+    the original answer instead of being executed again.
+
+    Keys are claimed with an insert into a collection whose _id is the key,
+    so only one of several concurrent retries runs the request. The claim
+    is a lease: if the process running the request dies, a retry after
+    locked_until takes the key over instead of getting 409 until the record
+    expires. Records expire through a TTL index on created_at (see
+    db_indexes). Completed responses are also kept in a small in-process
+    LRU, so most replays never reach the database; they expire with the
+    record.
+    """
+
+    def __init__(self, collection, cache_size=1024, lease_seconds=None, ttl_seconds=86400):
+        self.collection = collection
+        self.cache_size = cache_size
+        self.lease = timedelta(seconds=float(lease_seconds or os.getenv("IDEMPOTENCY_LEASE_SECONDS", 60)))
+        # Same as the created_at_ttl index
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self._cache = OrderedDict()
+        self._lock = Lock()
+
+    def _cache_put(self, key, record):
+        with self._lock:
+            self._cache[key] = record
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cache_get(self, key):
+        with self._lock:
+            record = self._cache.get(key)
+            if record is None:
+                return None
+            if record["created_at"] + self.ttl <= datetime.utcnow():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return record
+
+    def _take_over(self, key, fingerprint):
+        # Records from before leases existed have no locked_until and count as lapsed
+        now = datetime.utcnow()
+        return self.collection.find_one_and_update(
+            {"_id": key, "fingerprint": fingerprint, "status": IDEMPOTENCY_IN_PROGRESS,
+             "locked_until": {"$not": {"$gte": now}}},
+            {"$set": {"locked_until": now + self.lease}}
+        ) is not None
+
+    def begin(self, key, fingerprint):
+        """
+        Claim key for a request whose body hashes to fingerprint.
+        Returns (outcome, stored_response); stored_response is only set for
+        IDEMPOTENCY_COMPLETED and is a dict with "status" and "body".
+        """
+        record = self._cache_get(key)
+        if record is None:
+            now = datetime.utcnow()
+            try:
+                self.collection.insert_one({
+                    "_id": key,
+                    "fingerprint": fingerprint,
+                    "status": IDEMPOTENCY_IN_PROGRESS,
+                    "created_at": now,
+                    "locked_until": now + self.lease
+                })
+                return IDEMPOTENCY_STARTED, None
+            except DuplicateKeyError:
+                record = self.collection.find_one({"_id": key})
+                if record is None:
+                    # Expired between the insert and the read; treat as new
+                    return self.begin(key, fingerprint)
+
+        if record["fingerprint"] != fingerprint:
+            return IDEMPOTENCY_MISMATCH, None
+        if record["status"] != IDEMPOTENCY_COMPLETED:
+            if self._take_over(key, fingerprint):
+                return IDEMPOTENCY_STARTED, None
+            return IDEMPOTENCY_IN_PROGRESS, None
+        self._cache_put(key, record)
+        return IDEMPOTENCY_COMPLETED, record["response"]
+
+    def complete(self, key, status, body):
+        response = {"status": status, "body": body}
+        record = self.collection.find_one_and_update(
+            {"_id": key},
+            {"$set": {"status": IDEMPOTENCY_COMPLETED, "response": response}, "$unset": {"locked_until": ""}},
+            return_document=ReturnDocument.AFTER
+        )
+        # None if the record expired meanwhile; nothing to replay then
+        if record is not None:
+            self._cache_put(key, record)
+
+    def abandon(self, key):
+        """
+        Release a key whose request failed unexpectedly so a retry can run again
+        """
+        self.collection.delete_one({"_id": key, "status": IDEMPOTENCY_IN_PROGRESS})
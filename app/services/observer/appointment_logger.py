@@ -7,6 +7,8 @@ class AppointmentLogger(Observer):
         
         if event_type == "creation":
             print(f"[{timestamp}] New appointment created: {new_value}")
+        elif event_type == "bulk_creation":
+            print(f"[{timestamp}] {len(new_value)} appointments created in bulk")
         else:
             # Handle status change events
             print(f"[{timestamp}] Appointment {event_type} status changed from {old_value} to {new_value}")
\ No newline at end of file
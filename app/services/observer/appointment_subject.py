@@ -14,4 +14,8 @@ class AppointmentSubject(Subject):
 
     def notify_creation(self, appointment_data):
         # Notify observers about new appointment creation
-        self.notify("creation", None, appointment_data)
\ No newline at end of file
+        self.notify("creation", None, appointment_data)
+
+    def notify_bulk_creation(self, appointments):
+        # Notify observers once about a whole batch of new appointments
+        self.notify("bulk_creation", None, appointments)
\ No newline at end of file
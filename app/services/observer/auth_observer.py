@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
 import logging
+from .event_bus import event_bus
 
 logger = logging.getLogger(__name__)
 
@@ -27,11 +28,9 @@ class AuthSubject:
 
     def notify(self, event_type, user_email, details=None):
         logger.info(f"Notifying observers of event '{event_type}' for {user_email}")
-        for observer in self._observers:
-            try:
-                observer.update(event_type, user_email, details)
-            except Exception as e:
-                logger.error(f"Error in observer {type(observer).__name__}: {str(e)}")
+        # Delivered by the event bus workers, where errors are logged, except for
+        # synchronous observers such as EmailNotifier, whose errors reach the caller
+        event_bus.publish(self._observers, event_type, user_email, details)
 
 class AuthObserver(ABC):
     @abstractmethod
@@ -43,8 +42,17 @@ class AuthLogger(AuthObserver):
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         logger.info(f"[{timestamp}] {event_type} for {user_email}: {details or 'No additional details'}")
 
+    def update_batch(self, events):
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        logger.info("\n".join(
+            f"[{timestamp}] {event_type} for {user_email}: {details or 'No additional details'}"
+            for event_type, user_email, details in events
+        ))
+
 class EmailNotifier(AuthObserver):
     _instance = None
+    # Signup and login only report "OTP sent" if handing it to the mailer worked
+    synchronous = True
 
     def __new__(cls):
         if cls._instance is None:
@@ -0,0 +1,205 @@
+from threading import Lock, Thread
+import atexit
+import logging
+import os
+import queue
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class EventBus:
+    """
+    Delivers observer notifications off the request thread.
+
+    Subjects publish (observer, args) pairs onto bounded queues, one per
+    worker thread. Every observer is assigned to one worker, so it sees its
+    events in the order they were published. A worker takes up to
+    batch_size pending events at a time; observers that define
+    update_batch(list_of_args) receive all of theirs in one call, the others
+    get update(*args) per event.
+
+    When a queue is full the publisher waits put_timeout seconds and then
+    delivers the event itself, so bursts slow requests down instead of losing
+    events or growing memory without bound; such an event can overtake ones
+    still queued for the same observer. With workers=0 every event is
+    delivered synchronously, which is what the subjects used to do.
+
+    Observers whose result the publisher needs (sending an OTP) set
+    synchronous = True: they are called on the publishing thread and their
+    exceptions propagate to it.
+    """
+    _STOP = object()
+
+    def __init__(self, max_queue_size=None, workers=None, batch_size=None, put_timeout=0.5):
+        self.max_queue_size = int(max_queue_size or os.getenv("EVENT_BUS_QUEUE_SIZE", 1000))
+        self.workers = int(workers if workers is not None else os.getenv("EVENT_BUS_WORKERS", 2))
+        self.batch_size = int(batch_size or os.getenv("EVENT_BUS_BATCH_SIZE", 50))
+        self.put_timeout = put_timeout
+        self._queues = []
+        self._shards = {}
+        self._threads = []
+        self._pid = None
+        self._start_lock = Lock()
+        self._stats = {}
+        self._stats_lock = Lock()
+        self._inline_deliveries = 0
+
+    # ── Publishing ───────────────────────────────────────────────────────
+
+    def publish(self, observers, *args):
+        for observer in list(observers):
+            if getattr(observer, "synchronous", False):
+                self._deliver_now(observer, args)
+            else:
+                self._submit(observer, args)
+
+    def _deliver_now(self, observer, args):
+        started = time.perf_counter()
+        try:
+            observer.update(*args)
+        except Exception:
+            self._record(type(observer).__name__, 1, 1, time.perf_counter() - started)
+            raise
+        self._record(type(observer).__name__, 1, 0, time.perf_counter() - started)
+
+    def _submit(self, observer, args):
+        if self.workers <= 0:
+            self._deliver(observer, [args])
+            return
+        self._ensure_started()
+        shard = self._shard_of(observer)
+        try:
+            shard.put((observer, args), timeout=self.put_timeout)
+        except queue.Full:
+            # Back-pressure: the caller pays for the delivery itself
+            with self._stats_lock:
+                self._inline_deliveries += 1
+            self._deliver(observer, [args])
+
+    def _shard_of(self, observer):
+        # Observers are spread over the workers in the order they first publish
+        shard = self._shards.get(id(observer))
+        if shard is None:
+            with self._start_lock:
+                shard = self._shards.setdefault(id(observer), self._queues[len(self._shards) % self.workers])
+        return shard
+
+    # ── Workers ──────────────────────────────────────────────────────────
+
+    def _ensure_started(self):
+        # Threads do not survive a fork, so a forked worker process starts its own
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._shards = {}
+            # max_queue_size is shared out between the workers' queues
+            self._queues = [
+                queue.Queue(maxsize=max(1, self.max_queue_size // self.workers))
+                for _ in range(self.workers)
+            ]
+            self._threads = [
+                Thread(target=self._run, args=(shard,), name=f"event-bus-{i}", daemon=True)
+                for i, shard in enumerate(self._queues)
+            ]
+            for thread in self._threads:
+                thread.start()
+            self._pid = os.getpid()
+
+    def _run(self, shard):
+        while True:
+            item = shard.get()
+            if item is self._STOP:
+                return
+            items = [item]
+            stop = False
+            while len(items) < self.batch_size:
+                try:
+                    extra = shard.get_nowait()
+                except queue.Empty:
+                    break
+                if extra is self._STOP:
+                    stop = True
+                    break
+                items.append(extra)
+
+            # Group by observer, keeping each observer's events in order
+            grouped = {}
+            for observer, args in items:
+                grouped.setdefault(id(observer), (observer, []))[1].append(args)
+            for observer, batch in grouped.values():
+                self._deliver(observer, batch)
+
+            if stop:
+                return
+
+    def _deliver(self, observer, batch):
+        started = time.perf_counter()
+        errors = 0
+        if hasattr(observer, "update_batch") and len(batch) > 1:
+            try:
+                observer.update_batch(batch)
+            except Exception as e:
+                errors = len(batch)
+                logger.error(f"Error in observer {type(observer).__name__}: {str(e)}")
+        else:
+            for args in batch:
+                try:
+                    observer.update(*args)
+                except Exception as e:
+                    errors += 1
+                    logger.error(f"Error in observer {type(observer).__name__}: {str(e)}")
+        self._record(type(observer).__name__, len(batch), errors, time.perf_counter() - started)
+
+    # ── Metrics ──────────────────────────────────────────────────────────
+
+    def _record(self, name, events, errors, elapsed):
+        with self._stats_lock:
+            stats = self._stats.setdefault(name, {
+                "events": 0, "batches": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0
+            })
+            stats["events"] += events
+            stats["batches"] += 1
+            stats["errors"] += errors
+            stats["total_seconds"] += elapsed
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+
+    def stats(self):
+        with self._stats_lock:
+            observers = {
+                name: {
+                    **values,
+                    "avg_seconds_per_event": values["total_seconds"] / values["events"] if values["events"] else 0.0
+                }
+                for name, values in self._stats.items()
+            }
+            inline = self._inline_deliveries
+        return {
+            "queued": sum(shard.qsize() for shard in self._queues),
+            "max_queue_size": self.max_queue_size,
+            "workers": self.workers,
+            "inline_deliveries": inline,
+            "observers": observers
+        }
+
+    # ── Shutdown ─────────────────────────────────────────────────────────
+
+    def shutdown(self, timeout=10):
+        """
+        Deliver everything still queued, then stop the workers
+        """
+        if self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        for shard in self._queues:
+            shard.put(self._STOP)
+        for thread in self._threads:
+            thread.join(max(0, deadline - time.monotonic()))
+        self._threads = []
+        self._pid = None
+
+
+event_bus = EventBus()
+atexit.register(event_bus.shutdown)
@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from .event_bus import event_bus
 
 class Subject:
     def __init__(self):
@@ -12,5 +13,5 @@ class Subject:
         self._observers.remove(observer)
     
     def notify(self, event_type, old_value, new_value):
-        for observer in self._observers:
-            observer.update(event_type, old_value, new_value)
\ No newline at end of file
+        # Observers run on the event bus workers, not on the request thread
+        event_bus.publish(self._observers, event_type, old_value, new_value)
\ No newline at end of file
@@ -0,0 +1,151 @@
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from pymongo import ReturnDocument
+from threading import Lock
+import hashlib
+import hmac
+import os
+
+# Outcomes of OTPStore.verify
+OTP_VALID = "valid"
+OTP_INVALID = "invalid"
+OTP_EXPIRED = "expired"
+OTP_NOT_FOUND = "not_found"
+OTP_TOO_MANY_ATTEMPTS = "too_many_attempts"
+
+
+class OTPStore(ABC):
+    """
+    Keeps one-time passwords away from the Users documents. At most one OTP
+    is live per (email, purpose); issuing a new one replaces the old one.
+    Codes are stored as keyed HMAC digests, never in clear.
+    """
+
+    def __init__(self, max_attempts=5, secret=None):
+        self.max_attempts = max_attempts
+        self._secret = (secret or os.getenv("SECRET_KEY") or "").encode("utf-8")
+
+    def _digest(self, email, purpose, otp):
+        message = f"{purpose}:{email}:{otp}".encode("utf-8")
+        return hmac.new(self._secret, message, hashlib.sha256).hexdigest()
+
+    @abstractmethod
+    def issue(self, email, purpose, otp, ttl_seconds=600):
+        pass
+
+    @abstractmethod
+    def verify(self, email, purpose, otp):
+        """
+        Check the OTP and consume it if it matches. Returns one of the OTP_* outcomes.
+        """
+        pass
+
+
+class MongoOTPStore(OTPStore):
+    """
+    OTPs in their own collection. The TTL index on expires_at (see
+    db_indexes) lets MongoDB purge expired codes in the background.
+    """
+
+    def __init__(self, collection, **kwargs):
+        super().__init__(**kwargs)
+        self.collection = collection
+
+    def issue(self, email, purpose, otp, ttl_seconds=600):
+        self.collection.replace_one(
+            {"_id": f"{purpose}:{email}"},
+            {
+                "email": email,
+                "purpose": purpose,
+                "otp_hash": self._digest(email, purpose, otp),
+                "attempts": 0,
+                "expires_at": datetime.utcnow() + timedelta(seconds=ttl_seconds)
+            },
+            upsert=True
+        )
+
+    def verify(self, email, purpose, otp):
+        key = f"{purpose}:{email}"
+        now = datetime.utcnow()
+
+        # Happy path: match and consume in a single round trip. The filter compares
+        # keyed digests, so its timing reveals nothing about the stored code.
+        if self.collection.find_one_and_delete({
+            "_id": key,
+            "otp_hash": self._digest(email, purpose, otp),
+            "expires_at": {"$gt": now},
+            "attempts": {"$lt": self.max_attempts}
+        }, projection={"_id": 1}):
+            return OTP_VALID
+
+        # Otherwise count the failed attempt and work out why it failed
+        doc = self.collection.find_one_and_update(
+            {"_id": key},
+            {"$inc": {"attempts": 1}},
+            projection={"expires_at": 1, "attempts": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if not doc:
+            return OTP_NOT_FOUND
+        if doc["expires_at"] <= now:
+            self.collection.delete_one({"_id": key})
+            return OTP_EXPIRED
+        if doc["attempts"] > self.max_attempts:
+            self.collection.delete_one({"_id": key})
+            return OTP_TOO_MANY_ATTEMPTS
+        return OTP_INVALID
+
+
+class InMemoryOTPStore(OTPStore):
+    """
+    Process-local store for single-node deployments and tests.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._entries = {}
+        self._lock = Lock()
+
+    def issue(self, email, purpose, otp, ttl_seconds=600):
+        with self._lock:
+            self._purge(datetime.utcnow())
+            self._entries[(purpose, email)] = {
+                "otp_hash": self._digest(email, purpose, otp),
+                "attempts": 0,
+                "expires_at": datetime.utcnow() + timedelta(seconds=ttl_seconds)
+            }
+
+    def verify(self, email, purpose, otp):
+        key = (purpose, email)
+        candidate = self._digest(email, purpose, otp)
+        now = datetime.utcnow()
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return OTP_NOT_FOUND
+            if entry["expires_at"] <= now:
+                del self._entries[key]
+                return OTP_EXPIRED
+            entry["attempts"] += 1
+            if entry["attempts"] > self.max_attempts:
+                del self._entries[key]
+                return OTP_TOO_MANY_ATTEMPTS
+            if hmac.compare_digest(entry["otp_hash"], candidate):
+                del self._entries[key]
+                return OTP_VALID
+            return OTP_INVALID
+
+    def _purge(self, now):
+        expired = [key for key, entry in self._entries.items() if entry["expires_at"] <= now]
+        for key in expired:
+            del self._entries[key]
+
+
+def create_otp_store(db):
+    """
+    OTP_STORE=memory selects the in-process store, anything else the Mongo one
+    """
+    max_attempts = int(os.getenv("OTP_MAX_ATTEMPTS", 5))
+    if os.getenv("OTP_STORE", "mongo").lower() == "memory":
+        return InMemoryOTPStore(max_attempts=max_attempts)
+    return MongoOTPStore(db["OTPs"], max_attempts=max_attempts)
@@ -1,5 +1,9 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
+from app.services.id_generator import create_id_generator
+
+# Shared by every strategy instance so ids stay monotonic within the process
+transaction_id_generator = create_id_generator()
 
 class PaymentStrategy(ABC):
     @abstractmethod
@@ -7,6 +11,9 @@ class PaymentStrategy(ABC):
         pass
 
 class CardPaymentStrategy(PaymentStrategy):
+    def __init__(self, id_generator=None):
+        self._id_generator = id_generator or transaction_id_generator
+
     def process_payment(self, payment_data):
         try:
             # Validate card data
@@ -17,7 +24,7 @@ class CardPaymentStrategy(PaymentStrategy):
             # For demo purposes, we'll simulate a successful payment
             return {
                 "success": True,
-                "transaction_id": f"CARD_{datetime.now().strftime('%Y%m%d%H%M%S')}",
+                "transaction_id": f"CARD_{self._id_generator.new_id()}",
                 "payment_method": "card",
                 "amount": payment_data["amount"],
                 "payment_time": datetime.now(),
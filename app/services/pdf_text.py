@@ -0,0 +1,199 @@
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from threading import Lock
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import uuid
+
+import PyPDF2
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_FOLDER = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "..", "..", "uploads", "cache", "pdf_text"
+))
+
+
+class _LazyReader:
+    """
+    Opens the PDF only if a page actually has to be extracted
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._reader = None
+
+    @property
+    def reader(self):
+        if self._reader is None:
+            self._file = open(self.path, "rb")
+            self._reader = PyPDF2.PdfReader(self._file)
+        return self._reader
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+class PdfTextCache:
+    """
+    Extracted PDF text, one file per page, kept on disk by content hash:
+
+        <directory>/ab/<sha256>/pages.json    {"pages": page count}
+        <directory>/ab/<sha256>/00001.txt     text of page 1, ...
+
+    A page is extracted the first time it is asked for and read from disk
+    afterwards, so a request for pages 10-12 of a 300-page report touches
+    three pages, and a repeated preview opens no PDF at all. Files are
+    written to a temporary name and renamed, so concurrent readers (other
+    threads, other worker processes) only ever see complete pages.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.getenv("PDF_TEXT_CACHE_FOLDER", DEFAULT_CACHE_FOLDER)
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = Lock()
+        self.pages_extracted = 0
+        self.pages_cached = 0
+
+    def entry_directory(self, digest):
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _read(self, path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, path, content):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def _page_count(self, digest, lazy_reader):
+        meta_path = os.path.join(self.entry_directory(digest), "pages.json")
+        meta = self._read(meta_path)
+        if meta is not None:
+            return json.loads(meta)["pages"]
+        count = len(lazy_reader.reader.pages)
+        self._write(meta_path, json.dumps({"pages": count}))
+        return count
+
+    def page_count(self, path, digest):
+        lazy_reader = _LazyReader(path)
+        try:
+            return self._page_count(digest, lazy_reader)
+        finally:
+            lazy_reader.close()
+
+    def pages(self, path, digest, first=1, last=None):
+        """
+        Texts of pages first..last (1-based, inclusive; last defaults to the
+        final page) of the PDF at path whose SHA-256 is digest. Raises
+        ValueError for a range outside the document.
+        """
+        lazy_reader = _LazyReader(path)
+        try:
+            count = self._page_count(digest, lazy_reader)
+            last = count if last is None else min(last, count)
+            if first < 1 or (count and first > last):
+                raise ValueError(f"Page range {first}-{last} is outside a {count}-page document")
+
+            texts = []
+            extracted = 0
+            for number in range(first, last + 1):
+                page_path = os.path.join(self.entry_directory(digest), f"{number:05d}.txt")
+                text = self._read(page_path)
+                if text is None:
+                    text = lazy_reader.reader.pages[number - 1].extract_text() or ""
+                    self._write(page_path, text)
+                    extracted += 1
+                texts.append(text)
+            with self._lock:
+                self.pages_extracted += extracted
+                self.pages_cached += len(texts) - extracted
+            return texts
+        finally:
+            lazy_reader.close()
+
+    def text(self, path, digest, first=1, last=None):
+        return "".join(self.pages(path, digest, first, last))
+
+    def scan(self):
+        """
+        Yields (digest, entry directory) of every cached document
+        """
+        for shard in _subdirectories(self.directory):
+            for entry in _subdirectories(shard.path):
+                yield entry.name, entry.path
+
+    def discard(self, digest):
+        """
+        Remove a document's pages; returns the bytes freed
+        """
+        directory = self.entry_directory(digest)
+        freed = 0
+        try:
+            with os.scandir(directory) as entries:
+                freed = sum(entry.stat().st_size for entry in entries if entry.is_file())
+        except FileNotFoundError:
+            return 0
+        shutil.rmtree(directory, ignore_errors=True)
+        return freed
+
+    def stats(self):
+        with self._lock:
+            return {"pages_extracted": self.pages_extracted, "pages_cached": self.pages_cached}
+
+
+def _subdirectories(directory):
+    try:
+        with os.scandir(directory) as entries:
+            return [entry for entry in entries if entry.is_dir()]
+    except FileNotFoundError:
+        return []
+
+
+def _warm(directory, path, digest):
+    # Runs in a worker process
+    return len(PdfTextCache(directory).pages(path, digest))
+
+
+def backfill(items, directory=None, workers=None, max_pending=None):
+    """
+    Extract every page of each (path, digest) in items into the cache using
+    a pool of worker processes. At most max_pending files are queued at
+    once, so items can be a lazy cursor over millions of reports.
+    Yields (digest, page count or the exception raised).
+    """
+    directory = directory or os.getenv("PDF_TEXT_CACHE_FOLDER", DEFAULT_CACHE_FOLDER)
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 2
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        pending = {}
+        items = iter(items)
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_pending:
+                try:
+                    path, digest = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[pool.submit(_warm, directory, path, digest)] = digest
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                digest = pending.pop(future)
+                try:
+                    yield digest, future.result()
+                except Exception as e:
+                    yield digest, e
@@ -0,0 +1,183 @@
+from abc import ABC, abstractmethod
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import letter
+import json
+import logging
+import PyPDF2
+
+from app.utils.files import file_sha256
+from app.services.pdf_text import PdfTextCache
+
+logger = logging.getLogger(__name__)
+
+# File Format Adapter Interface
+class FileFormatAdapter(ABC):
+    @abstractmethod
+    def convert_to_format(self, data, output_path):
+        """Convert data to specific format and save to output path"""
+        pass
+    
+    @abstractmethod
+    def convert_from_format(self, input_path):
+        """Convert from the format back to data dictionary"""
+        pass
+
+# PDF Adapter Implementation
+class PDFAdapter(FileFormatAdapter):
+    def __init__(self, text_cache=None):
+        # Extracted text is cached per page by content hash, see PdfTextCache
+        self.text_cache = text_cache
+
+    def convert_to_format(self, data, output_path):
+        try:
+            # Create a new PDF with ReportLab (more suitable for text content)
+            c = canvas.Canvas(output_path, pagesize=letter)
+            y = 750  # Starting y position from top
+            
+            # Add title
+            c.setFont("Helvetica-Bold", 16)
+            c.drawString(50, y, "Hospital Report")
+            y -= 30
+            
+            # Add report details
+            c.setFont("Helvetica", 12)
+            for key, value in data.items():
+                if key not in ['file', '_id'] and value is not None:  # Skip file and id fields
+                    # Format the key name
+                    key_name = key.replace('_', ' ').title()
+                    content = f"{key_name}: {str(value)}"
+                    
+                    # Handle long lines
+                    if len(content) > 70:  # If content is too long
+                        words = content.split()
+                        line = ""
+                        for word in words:
+                            if len(line + " " + word) < 70:
+                                line += " " + word
+                            else:
+                                c.drawString(50, y, line.strip())
+                                y -= 20
+                                line = word
+                        if line:  # Draw any remaining text
+                            c.drawString(50, y, line.strip())
+                    else:
+                        c.drawString(50, y, content)
+                    
+                    y -= 20
+                    
+                    # Add a new page if we're running out of space
+                    if y < 50:
+                        c.showPage()
+                        y = 750
+                        c.setFont("Helvetica", 12)
+            
+            c.save()
+            return True
+        except Exception as e:
+            logger.error(f"Error converting to PDF: {str(e)}")
+            return False
+
+    def convert_from_format(self, input_path, digest=None, first_page=1, last_page=None):
+        """
+        Text of the PDF, or of pages first_page..last_page (1-based). Pass the
+        file's SHA-256 as digest when it is known, to skip hashing the file.
+        """
+        try:
+            if self.text_cache is None:
+                with open(input_path, 'rb') as file:
+                    pages = PyPDF2.PdfReader(file).pages[first_page - 1:last_page]
+                    return {"content": "".join(page.extract_text() or "" for page in pages)}
+            digest = digest or file_sha256(input_path)
+            return {"content": self.text_cache.text(input_path, digest, first_page, last_page)}
+        except Exception as e:
+            logger.error(f"Error reading PDF: {str(e)}")
+            return None
+
+# JSON Adapter Implementation
+class JSONAdapter(FileFormatAdapter):
+    def convert_to_format(self, data, output_path):
+        try:
+            with open(output_path, 'w') as f:
+                # default=str: report documents carry datetimes (upload_date)
+                json.dump(data, f, indent=4, default=str)
+            return True
+        except Exception as e:
+            logger.error(f"Error converting to JSON: {str(e)}")
+            return False
+            
+    def convert_from_format(self, input_path):
+        try:
+            with open(input_path, 'r') as f:
+                data = json.load(f)
+            return data
+        except Exception as e:
+            logger.error(f"Error converting from JSON: {str(e)}")
+            return None
+
+
+# Plain Text Adapter Implementation
+class TextAdapter(FileFormatAdapter):
+    def convert_to_format(self, data, output_path):
+        try:
+            lines = [
+                f"{key.replace('_', ' ').title()}: {str(value)}"
+                for key, value in data.items()
+                if key != 'file' and value is not None
+            ]
+            with open(output_path, 'w') as f:
+                f.write("\n".join(lines))
+            return True
+        except Exception as e:
+            logger.error(f"Error converting to text: {str(e)}")
+            return False
+
+    def convert_from_format(self, input_path):
+        try:
+            with open(input_path, 'r') as f:
+                return {"content": f.read()}
+        except Exception as e:
+            logger.error(f"Error reading text: {str(e)}")
+            return None
+
+
+FORMAT_ADAPTERS = {
+    "pdf": PDFAdapter(PdfTextCache()),
+    "json": JSONAdapter(),
+    "text": TextAdapter(),
+}
+
+
+def render_report(output_format, data, output_path):
+    """
+    Write data to output_path in output_format and return the file's SHA-256.
+    Module-level so report conversion jobs can run it in a worker process.
+    """
+    if not FORMAT_ADAPTERS[output_format].convert_to_format(data, output_path):
+        raise RuntimeError(f"Failed to convert report to {output_format}")
+    return file_sha256(output_path)
+
+
+def _flatten(value):
+    if isinstance(value, dict):
+        return " ".join(_flatten(v) for v in value.values())
+    if isinstance(value, list):
+        return " ".join(_flatten(v) for v in value)
+    return "" if value is None else str(value)
+
+
+def extract_text(input_path, extension, digest=None):
+    """
+    Searchable text of an uploaded file; images have none. Module-level so
+    report jobs can run it in a worker process. A PDF's pages also land in
+    the text cache, which makes its first preview instant.
+    """
+    adapter = {"pdf": "pdf", "json": "json", "txt": "text"}.get(extension.lower())
+    if adapter is None:
+        return ""
+    if adapter == "pdf":
+        data = FORMAT_ADAPTERS["pdf"].convert_from_format(input_path, digest)
+    else:
+        data = FORMAT_ADAPTERS[adapter].convert_from_format(input_path)
+    if data is None:
+        raise RuntimeError(f"Failed to read text from {extension} file")
+    return data["content"] if adapter != "json" else _flatten(data)
@@ -0,0 +1,298 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from functools import partial
+from threading import Event, Lock, Thread
+import atexit
+import logging
+import multiprocessing
+import os
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from app.services.report_formats import render_report, extract_text
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# Job output that indexes the original's text for search instead of rendering a file
+SEARCH_STEP = "search"
+
+# Report fields the renderers must not see
+INTERNAL_REPORT_FIELDS = (
+    "_id", "original_file", "original_filename", "pdf_file", "json_file", "conversion_status",
+    "original_sha256", "original_size", "pdf_sha256", "json_sha256"
+)
+
+
+class ReportJobQueue:
+    """
+    Converts uploaded reports to PDF and JSON outside the request.
+
+    Jobs are documents in the ReportJobs collection, so a restart loses
+    nothing: a dispatcher thread claims queued jobs with an atomic
+    find_one_and_update and renders each output format in a process pool.
+    A job left running by a crashed process is queued again once its lease
+    expires; the dispatcher renews the lease of the jobs it is still
+    rendering on every poll. Failed renders are retried up to max_attempts
+    times.
+
+    Progress is the share of output formats already written; every
+    finished format is stored in the blob store and recorded on the report
+    itself. A job may also carry the search step, which extracts the
+    original file's text in the pool and indexes it.
+    """
+
+    def __init__(self, collection, reports_collection, blob_store, search_index=None, workers=None,
+                 lease_seconds=None, poll_interval=None, max_attempts=3):
+        self.collection = collection
+        self.reports_collection = reports_collection
+        self.blob_store = blob_store
+        self.search_index = search_index
+        self.workers = int(workers or os.getenv("REPORT_WORKERS", 2))
+        self.lease = timedelta(seconds=float(lease_seconds or os.getenv("REPORT_JOB_LEASE_SECONDS", 300)))
+        self.poll_interval = float(poll_interval or os.getenv("REPORT_JOB_POLL_SECONDS", 5))
+        self.max_attempts = max_attempts
+        self._wakeup = Event()
+        self._in_flight = set()
+        self._lock = Lock()
+        self._pid = None
+        self._pool = None
+
+    # ── Producer side, called by the upload endpoint ─────────────────────
+
+    def enqueue(self, report_id, outputs):
+        """
+        Queue rendering of a stored report to each format in outputs.
+        Returns the job id.
+        """
+        now = datetime.now()
+        job_id = self.collection.insert_one({
+            "report_id": report_id,
+            "status": JOB_QUEUED,
+            "outputs": list(outputs),
+            "completed": [],
+            "files": {},
+            "progress": 0,
+            "attempts": 0,
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        }).inserted_id
+        self.start()
+        self._wakeup.set()
+        return job_id
+
+    def get(self, job_id):
+        job = self.collection.find_one({"_id": ObjectId(job_id)})
+        if not job:
+            return None
+        done = set(job["completed"])
+        return {
+            "job_id": str(job["_id"]),
+            "report_id": str(job["report_id"]),
+            "status": job["status"],
+            "progress": job["progress"],
+            "attempts": job["attempts"],
+            "error": job.get("error"),
+            "files": {fmt: name for fmt, name in job.get("files", {}).items() if fmt in done},
+            "created_at": job["created_at"].isoformat(),
+            "updated_at": job["updated_at"].isoformat()
+        }
+
+    # ── Dispatcher ───────────────────────────────────────────────────────
+
+    def start(self):
+        # Like the event bus, a forked server process starts its own dispatcher
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pool = self._new_pool()
+            self._in_flight = set()
+            Thread(target=self._run, name="report-jobs", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _new_pool(self):
+        # Workers must not be forked from this process, which holds MongoClient
+        # threads. A fork server forks them from a clean single-threaded process
+        # instead; preloading the renderers (not __main__, which would build the
+        # whole app) makes each worker start cheap.
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(["app.services.report_formats"])
+        else:
+            context = multiprocessing.get_context("spawn")
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+
+    def _submit(self, *args):
+        try:
+            return self._pool.submit(*args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); replace the pool and carry on
+            logger.warning("Report conversion pool broke, starting a new one")
+            self._pool = self._new_pool()
+            return self._pool.submit(*args)
+
+    def shutdown(self):
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self):
+        while True:
+            try:
+                self._requeue_expired()
+                while len(self._in_flight) < self.workers:
+                    job = self._claim()
+                    if job is None:
+                        break
+                    self._dispatch(job)
+            except Exception as e:
+                logger.error(f"Report job dispatcher error: {str(e)}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _requeue_expired(self):
+        now = datetime.now()
+        with self._lock:
+            in_flight = list(self._in_flight)
+        if in_flight:
+            # Renew the lease of jobs still rendering here, so neither this
+            # nor another server process takes them over
+            self.collection.update_many(
+                {"_id": {"$in": in_flight}, "status": JOB_RUNNING},
+                {"$set": {"claimed_at": now}}
+            )
+        result = self.collection.update_many(
+            {"status": JOB_RUNNING, "claimed_at": {"$lt": now - self.lease}, "_id": {"$nin": in_flight}},
+            {"$set": {"status": JOB_QUEUED, "updated_at": now}}
+        )
+        if result.modified_count:
+            logger.warning(f"Requeued {result.modified_count} report jobs whose worker went away")
+
+    def _claim(self):
+        now = datetime.now()
+        return self.collection.find_one_and_update(
+            {"status": JOB_QUEUED},
+            {"$set": {"status": JOB_RUNNING, "claimed_at": now, "updated_at": now}, "$inc": {"attempts": 1}},
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def _dispatch(self, job):
+        report = self.reports_collection.find_one({"_id": job["report_id"]})
+        if not report:
+            self._finish(job["_id"], job["report_id"], JOB_FAILED, "Report no longer exists")
+            return
+
+        data = {k: v for k, v in report.items() if k not in INTERNAL_REPORT_FIELDS}
+        pending = [fmt for fmt in job["outputs"] if fmt not in job["completed"]]
+        if not pending:
+            # Everything was written before the previous worker went away
+            self._finish(job["_id"], job["report_id"], JOB_DONE)
+            return
+        with self._lock:
+            self._in_flight.add(job["_id"])
+        job_state = {"remaining": len(pending), "failed": None}
+        submitted = 0
+        try:
+            for fmt in pending:
+                if fmt == SEARCH_STEP:
+                    # Index the original's text; files without a digest (legacy) have only metadata
+                    digest = self.blob_store.digest_of(report.get("original_file"))
+                    extension = report["original_file"].rsplit(".", 1)[-1] if digest else ""
+                    future = self._submit(extract_text, self.blob_store.path(digest) if digest else None, extension, digest)
+                    record = partial(self._index_text, report)
+                else:
+                    tmp_path = self.blob_store.tmp_path()
+                    future = self._submit(render_report, fmt, data, tmp_path)
+                    record = partial(self._store_output, job, fmt, tmp_path)
+                future.add_done_callback(partial(self._step_done, job, fmt, job_state, record))
+                submitted += 1
+        except Exception as e:
+            # The steps never submitted will not call back; settle them here
+            logger.error(f"Report job {job['_id']}: could not start {fmt} step: {str(e)}")
+            self._steps_settled(job, job_state, len(pending) - submitted, str(e))
+
+    def _store_output(self, job, fmt, tmp_path, future):
+        try:
+            content_hash = self.blob_store.put_file(tmp_path, future.result())
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        filename = self.blob_store.name(content_hash, fmt)
+        previous = self.reports_collection.find_one_and_update(
+            {"_id": job["report_id"]},
+            {"$set": {f"{fmt}_file": filename, f"{fmt}_sha256": content_hash}},
+            projection={f"{fmt}_file": 1}
+        )
+        # Drop the reference to whatever the report pointed at before (a
+        # render repeated after a crash), or to our own if it was deleted
+        stale = self.blob_store.digest_of(previous.get(f"{fmt}_file")) if previous else content_hash
+        if stale:
+            self.blob_store.release(stale)
+        self.collection.update_one({"_id": job["_id"]}, {"$set": {f"files.{fmt}": filename}})
+
+    def _index_text(self, report, future):
+        text = future.result()
+        if self.search_index is not None:
+            self.search_index.index_report(report, text)
+
+    def _step_done(self, job, fmt, job_state, record, future):
+        try:
+            record(future)
+            updated = self.collection.find_one_and_update(
+                {"_id": job["_id"]},
+                {"$addToSet": {"completed": fmt}, "$set": {"updated_at": datetime.now()}},
+                return_document=ReturnDocument.AFTER
+            )
+            progress = int(100 * len(updated["completed"]) / len(updated["outputs"]))
+            self.collection.update_one({"_id": job["_id"]}, {"$set": {"progress": progress}})
+        except Exception as e:
+            logger.error(f"Report job {job['_id']}: {fmt} step failed: {str(e)}")
+            self._steps_settled(job, job_state, 1, str(e))
+            return
+        self._steps_settled(job, job_state, 1)
+
+    def _steps_settled(self, job, job_state, steps, error=None):
+        """
+        Count steps as finished; the last one finishes or requeues the job
+        """
+        with self._lock:
+            if error is not None:
+                job_state["failed"] = error
+            job_state["remaining"] -= steps
+            if job_state["remaining"]:
+                return
+            self._in_flight.discard(job["_id"])
+
+        if job_state["failed"] is None:
+            self._finish(job["_id"], job["report_id"], JOB_DONE)
+        elif job["attempts"] < self.max_attempts:
+            # Retry the formats still missing
+            self.collection.update_one(
+                {"_id": job["_id"]},
+                {"$set": {"status": JOB_QUEUED, "error": job_state["failed"], "updated_at": datetime.now()}}
+            )
+        else:
+            self._finish(job["_id"], job["report_id"], JOB_FAILED, job_state["failed"])
+        self._wakeup.set()
+
+    def _finish(self, job_id, report_id, status, error=None):
+        changes = {"status": status, "error": error, "updated_at": datetime.now()}
+        if status == JOB_DONE:
+            changes["progress"] = 100
+        self.collection.update_one({"_id": job_id}, {"$set": changes})
+        self.reports_collection.update_one({"_id": report_id}, {"$set": {"conversion_status": status}})
+
+
+def create_report_job_queue(db, blob_store, search_index=None):
+    queue = ReportJobQueue(db["ReportJobs"], db["Reports"], blob_store, search_index)
+    atexit.register(queue.shutdown)
+    return queue
@@ -0,0 +1,113 @@
+from app.utils.money import Money
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SERVICE = "consultation"
+
+
+class RevenueRollup:
+    """
+    Materialized revenue totals: one document per (day, doctor_email,
+    service) in the RevenueRollups collection, incremented as payments are
+    recorded. Reports over any date range sum at most a few hundred of
+    these rows instead of grouping the whole Billing collection.
+    """
+
+    def __init__(self, collection, billing_collection):
+        self.collection = collection
+        self.billing_collection = billing_collection
+
+    def record_payment(self, billing):
+        """
+        Add one stored Billing document to its rollup row
+        """
+        self.collection.update_one(
+            {
+                "day": billing["payment_date"],
+                "doctor_email": billing.get("doctor_email"),
+                "service": billing.get("service") or DEFAULT_SERVICE
+            },
+            {"$inc": {"total_cents": Money.from_document(billing).cents, "payments": 1}},
+            upsert=True
+        )
+
+    def totals(self, start=None, end=None):
+        """
+        Sum of all rollup rows, optionally for days between start and end (YYYY-MM-DD, inclusive)
+        """
+        match = {}
+        if start or end:
+            match["day"] = {}
+            if start:
+                match["day"]["$gte"] = start
+            if end:
+                match["day"]["$lte"] = end
+        rows = list(self.collection.aggregate([
+            {"$match": match},
+            {"$group": {"_id": None, "total_cents": {"$sum": "$total_cents"}, "payments": {"$sum": "$payments"}}}
+        ]))
+        return [
+            {"totalEarnings": Money(row["total_cents"]).amount, "payments": row["payments"]}
+            for row in rows
+        ]
+
+    def seed_if_empty(self):
+        """
+        Build the rollup rows when there are none yet but Billing has
+        payments, e.g. the first start after rollups were introduced.
+        Returns the number of rows built.
+        """
+        if self.collection.find_one({}, {"_id": 1}) is not None:
+            return 0
+        if self.billing_collection.find_one({"payment_date": {"$type": "string"}}, {"_id": 1}) is None:
+            return 0
+        rows = self.rebuild()
+        logger.info(f"Seeded {rows} revenue rollup rows from Billing")
+        return rows
+
+    def rebuild(self):
+        """
+        Recompute every rollup row from Billing and atomically replace the collection.
+
+        $out swaps the collection in only once the aggregation has finished,
+        so a payment recorded while it runs can be counted by neither the old
+        rows nor the new ones. Rebuild while no payments are being taken.
+        """
+        self.billing_collection.aggregate([
+            {"$match": {"payment_date": {"$type": "string"}}},
+            {"$group": {
+                "_id": {
+                    "day": "$payment_date",
+                    "doctor_email": "$doctor_email",
+                    "service": {"$ifNull": ["$service", DEFAULT_SERVICE]}
+                },
+                # Documents not yet normalized (see app.migrations.normalize_money) fall back to amount
+                "total_cents": {"$sum": {"$ifNull": [
+                    "$amount_cents",
+                    {"$toLong": {"$round": [
+                        {"$multiply": [{"$convert": {"input": "$amount", "to": "decimal", "onError": 0, "onNull": 0}}, 100]},
+                        0
+                    ]}}
+                ]}},
+                "payments": {"$sum": 1}
+            }},
+            {"$project": {
+                "_id": 0,
+                "day": "$_id.day",
+                "doctor_email": "$_id.doctor_email",
+                "service": "$_id.service",
+                "total_cents": 1,
+                "payments": 1
+            }},
+            {"$out": self.collection.name}
+        ])
+        return self.collection.count_documents({})
+
+
+if __name__ == "__main__":
+    from app.services.db_connection import DatabaseConnection
+
+    db = DatabaseConnection().get_database()
+    rows = RevenueRollup(db["RevenueRollups"], db["Billing"]).rebuild()
+    print(f"Rebuilt {rows} revenue rollup rows")
@@ -0,0 +1,141 @@
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+KIND_PRESCRIPTION = "prescription"
+KIND_REPORT = "report"
+SEARCH_KINDS = (KIND_PRESCRIPTION, KIND_REPORT)
+
+# Extracted report text beyond this is not indexed; it keeps entries well
+# under the document size limit and the text index compact
+MAX_TEXT_CHARS = 200_000
+SUMMARY_CHARS = 200
+
+
+def _medicine_names(medicines):
+    names = []
+    for medicine in medicines or []:
+        name = medicine.get("medicine") if isinstance(medicine, dict) else medicine
+        if name:
+            names.append(str(name))
+    return names
+
+
+def _summary(*parts):
+    text = " · ".join(str(part) for part in parts if part)
+    return text if len(text) <= SUMMARY_CHARS else text[:SUMMARY_CHARS - 1] + "…"
+
+
+class SearchIndex:
+    """
+    Full-text search over prescriptions and reports.
+
+    Every searchable record has one entry in the SearchIndex collection,
+    written when the record is saved, and a single MongoDB text index over
+    the entries ranks both kinds together: a disease or medicine match
+    weighs more than a word in a report's extracted text. Entries carry
+    what a result list shows, so searches never touch the source
+    collections.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    @staticmethod
+    def prescription_entry(prescription):
+        medicines = _medicine_names(prescription.get("medicines"))
+        return {
+            "kind": KIND_PRESCRIPTION,
+            "source_id": prescription["_id"],
+            "patient_email": prescription.get("patient_email"),
+            "doctor_email": prescription.get("doctor_email"),
+            "patient_name": prescription.get("patient_name"),
+            "title": prescription.get("disease") or "Prescription",
+            "summary": _summary(prescription.get("symptoms"), ", ".join(medicines)),
+            "disease": prescription.get("disease") or "",
+            "symptoms": prescription.get("symptoms") or "",
+            "medicines": medicines,
+            "text": "",
+            "created_at": prescription.get("created_at")
+        }
+
+    @staticmethod
+    def report_entry(report, text=""):
+        text = (text or "")[:MAX_TEXT_CHARS]
+        return {
+            "kind": KIND_REPORT,
+            "source_id": report["_id"],
+            "patient_email": report.get("patient_email"),
+            "doctor_email": report.get("doctor_email"),
+            "patient_name": report.get("patient_name"),
+            "title": report.get("service") or report.get("original_filename") or "Report",
+            "summary": _summary(report.get("original_filename"), " ".join(text[:SUMMARY_CHARS].split())),
+            "disease": "",
+            "symptoms": "",
+            "medicines": [],
+            "text": " ".join(filter(None, (report.get("service"), report.get("original_filename"), text))),
+            "created_at": report.get("upload_date")
+        }
+
+    @staticmethod
+    def _upsert(entry):
+        return (
+            {"kind": entry["kind"], "source_id": entry["source_id"]},
+            {"$set": {**entry, "indexed_at": datetime.now()}}
+        )
+
+    def index_prescription(self, prescription):
+        self.collection.update_one(*self._upsert(self.prescription_entry(prescription)), upsert=True)
+
+    def index_report(self, report, text=""):
+        self.collection.update_one(*self._upsert(self.report_entry(report, text)), upsert=True)
+
+    def index_many(self, entries):
+        """
+        Upsert prebuilt entries in one round trip; used by the backfill
+        """
+        if entries:
+            self.collection.bulk_write([UpdateOne(*self._upsert(entry), upsert=True) for entry in entries], ordered=False)
+
+    def remove(self, kind, source_id):
+        self.collection.delete_one({"kind": kind, "source_id": source_id})
+
+    def search(self, query, kinds=None, doctor_email=None, patient_email=None, page=1, per_page=20):
+        """
+        Entries matching query, best first. Returns (results, has_more);
+        counting every match would cost more than the page itself.
+        """
+        criteria = {"$text": {"$search": query}}
+        if kinds:
+            criteria["kind"] = {"$in": list(kinds)}
+        if doctor_email:
+            criteria["doctor_email"] = doctor_email
+        if patient_email:
+            criteria["patient_email"] = patient_email
+
+        projection = {
+            "score": {"$meta": "textScore"},
+            "kind": 1, "source_id": 1, "title": 1, "summary": 1,
+            "patient_email": 1, "doctor_email": 1, "patient_name": 1, "created_at": 1
+        }
+        cursor = (
+            self.collection.find(criteria, projection)
+            .sort([("score", {"$meta": "textScore"})])
+            .skip((page - 1) * per_page)
+            .limit(per_page + 1)
+        )
+        results = []
+        for entry in cursor:
+            created_at = entry.get("created_at")
+            results.append({
+                "kind": entry["kind"],
+                "id": str(entry["source_id"]),
+                "score": round(entry["score"], 4),
+                "title": entry.get("title"),
+                "summary": entry.get("summary"),
+                "patient_email": entry.get("patient_email"),
+                "patient_name": entry.get("patient_name"),
+                "doctor_email": entry.get("doctor_email"),
+                "created_at": created_at.isoformat() if isinstance(created_at, datetime) else created_at
+            })
+        return results[:per_page], len(results) > per_page
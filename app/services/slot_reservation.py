@@ -0,0 +1,182 @@
+import re
+
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from bson import ObjectId
+
+
+class SlotAlreadyBookedError(Exception):
+    pass
+
+
+class SlotReservationService:
+    """
+    Books appointment slots with a single write. The database guarantees a
+    (doctor_email, date, time) slot holds at most one active booking through
+    the unique partial index "active_slot_unique" (see db_indexes), so two
+    concurrent requests for the same slot can never both succeed.
+
+    Only documents carrying slot_active=True are part of that index; the flag
+    is dropped when a booking is cancelled, which frees the slot again.
+    """
+    ACTIVE_FIELD = "slot_active"
+    # Set by backfill on double bookings made before the index existed
+    CONFLICT_FIELD = "slot_conflict"
+    RELEASED_STATUSES = {"cancelled"}
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    @classmethod
+    def holds_slot(cls, status):
+        return (status or "").lower() not in cls.RELEASED_STATUSES
+
+    def reserve(self, appointment_data):
+        """
+        Insert the appointment, claiming its slot. insert_one fills in
+        appointment_data["_id"], so no read-back is needed.
+        """
+        if self.holds_slot(appointment_data.get("status")):
+            appointment_data[self.ACTIVE_FIELD] = True
+        try:
+            self.collection.insert_one(appointment_data)
+        except DuplicateKeyError:
+            raise SlotAlreadyBookedError("This time slot is already booked")
+        return appointment_data
+
+    def reserve_many(self, appointments):
+        """
+        Insert a batch of appointments with one unordered insert_many.
+        Returns {batch index: error message} for the rows that were rejected;
+        every other row is stored and has its _id filled in.
+        """
+        for appointment_data in appointments:
+            if self.holds_slot(appointment_data.get("status")):
+                appointment_data[self.ACTIVE_FIELD] = True
+        if not appointments:
+            return {}
+        try:
+            self.collection.insert_many(appointments, ordered=False)
+            return {}
+        except BulkWriteError as e:
+            failures = {}
+            for error in e.details.get("writeErrors", []):
+                if error.get("code") == 11000:
+                    failures[error["index"]] = "This time slot is already booked"
+                else:
+                    failures[error["index"]] = error.get("errmsg", "Failed to insert appointment")
+            return failures
+
+    def find_booked(self, slots):
+        """
+        Return the subset of (doctor_email, date, time) slots that already
+        hold an active booking, using one query for the whole batch.
+        """
+        if not slots:
+            return set()
+        cursor = self.collection.find(
+            {
+                self.ACTIVE_FIELD: True,
+                "$or": [{"doctor_email": d, "date": day, "time": t} for d, day, t in slots]
+            },
+            {"_id": 0, "doctor_email": 1, "date": 1, "time": 1}
+        )
+        return {(doc["doctor_email"], doc["date"], doc["time"]) for doc in cursor}
+
+    def change_status(self, appointment_id, new_status):
+        """
+        Set the status and claim or release the slot accordingly in one
+        round trip. Returns the document as it was before the update, or
+        None if no appointment has that id.
+        """
+        update = {"$set": {"status": new_status}}
+        if self.holds_slot(new_status):
+            update["$set"][self.ACTIVE_FIELD] = True
+        else:
+            update["$unset"] = {self.ACTIVE_FIELD: ""}
+
+        try:
+            return self.collection.find_one_and_update(
+                {"_id": ObjectId(appointment_id)},
+                update,
+                return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            # Re-activating a cancelled booking whose slot was taken meanwhile
+            raise SlotAlreadyBookedError("This time slot is already booked")
+
+    def _holding_statuses(self):
+        return {"status": {"$not": re.compile("^cancelled$", re.IGNORECASE)}}
+
+    def needs_backfill(self):
+        """
+        Whether appointments from before slot reservation are still
+        unflagged. The unique index cannot be built until backfill has run.
+        """
+        return self.collection.find_one(
+            {
+                self.ACTIVE_FIELD: {"$exists": False},
+                self.CONFLICT_FIELD: {"$exists": False},
+                **self._holding_statuses()
+            },
+            {"_id": 1}
+        ) is not None
+
+    def backfill(self):
+        """
+        Flag appointments created before slot reservation existed, so the
+        unique index can be built: python -m app.services.slot_reservation
+
+        A slot booked more than once stays with the booking already flagged,
+        or else the oldest. The others are marked slot_conflict, hold no
+        slot, and are returned so staff can reschedule or cancel them.
+        Returns (flagged, conflicting appointment _ids).
+        """
+        flagged = 0
+        conflicts = []
+        slots = self.collection.aggregate([
+            {"$match": {self.CONFLICT_FIELD: {"$exists": False}, **self._holding_statuses()}},
+            # Flagged bookings first (true sorts above a missing field), then oldest
+            {"$sort": {self.ACTIVE_FIELD: -1, "_id": 1}},
+            {"$group": {
+                "_id": {"doctor_email": "$doctor_email", "date": "$date", "time": "$time"},
+                "ids": {"$push": "$_id"},
+                "flagged": {"$sum": {"$cond": [{"$eq": ["$" + self.ACTIVE_FIELD, True]}, 1, 0]}}
+            }},
+            # Slots that are already consistent need nothing
+            {"$match": {"$expr": {"$or": [
+                {"$gt": [{"$size": "$ids"}, 1]},
+                {"$eq": ["$flagged", 0]}
+            ]}}},
+        ], allowDiskUse=True)
+        for slot in slots:
+            keeper, others = slot["ids"][0], slot["ids"][1:]
+            if not slot["flagged"]:
+                try:
+                    flagged += self.collection.update_one(
+                        {"_id": keeper}, {"$set": {self.ACTIVE_FIELD: True}}
+                    ).modified_count
+                except DuplicateKeyError:
+                    # Booked meanwhile through the index
+                    others = slot["ids"]
+            if others:
+                self.collection.update_many(
+                    {"_id": {"$in": others}},
+                    {"$set": {self.CONFLICT_FIELD: True}, "$unset": {self.ACTIVE_FIELD: ""}}
+                )
+                conflicts.extend(others)
+        return flagged, conflicts
+
+
+if __name__ == "__main__":
+    from app.services.db_connection import DatabaseConnection
+    from app.services.db_indexes import ensure_indexes
+
+    db = DatabaseConnection().get_database()
+    flagged, conflicts = SlotReservationService(db["Appointments"]).backfill()
+    print(f"Flagged {flagged} existing appointments as holding their slot")
+    if conflicts:
+        print(f"{len(conflicts)} appointments share a slot with an earlier booking and were marked slot_conflict:")
+        for appointment_id in conflicts:
+            print(f"  {appointment_id}")
+    ensure_indexes(db)
@@ -0,0 +1,177 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from threading import Lock
+import hashlib
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def token_digest(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU cache of already-verified JWT claims, keyed by a digest of
+    the raw token. An entry never outlives the token's own "exp", nor
+    max_ttl seconds, so a cache hit is exactly as trustworthy as a fresh
+    jwt.decode.
+    """
+
+    def __init__(self, max_entries=None, max_ttl=None):
+        self.max_entries = int(max_entries or os.getenv("TOKEN_CACHE_SIZE", 10000))
+        self.max_ttl = float(max_ttl or os.getenv("TOKEN_CACHE_TTL", 300))
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, digest):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[digest]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return dict(entry[0])
+
+    def put(self, digest, claims):
+        expires_at = time.time() + self.max_ttl
+        if "exp" in claims:
+            expires_at = min(expires_at, float(claims["exp"]))
+        with self._lock:
+            self._entries[digest] = (dict(claims), expires_at)
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
+
+
+class BloomFilter:
+    def __init__(self, size_bits=1 << 20, hashes=7):
+        self.size_bits = size_bits
+        self.hashes = hashes
+        self._bits = bytearray(size_bits // 8)
+
+    def _positions(self, item):
+        digest = hashlib.sha256(item.encode("utf-8")).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        return [(h1 + i * h2) % self.size_bits for i in range(self.hashes)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class TokenRevocationList:
+    """
+    Revoked token ids, persisted in a small collection (documents expire via
+    a TTL index once the token would have expired anyway) and mirrored into
+    an in-process Bloom filter. Almost every request is answered by the
+    filter alone; only filter hits, which include the rare false positive,
+    are confirmed against the collection.
+
+    Revocations made by other processes are picked up on the next refresh,
+    at most refresh_interval seconds later. revoked_at comes from the
+    revoking process's clock, so each refresh re-reads the last clock_skew
+    seconds as well; adding an id twice is harmless.
+    """
+
+    def __init__(self, collection, refresh_interval=None, rebuild_interval=3600, clock_skew=None):
+        self.collection = collection
+        self.refresh_interval = float(refresh_interval or os.getenv("REVOCATION_REFRESH_SECONDS", 30))
+        self.clock_skew = timedelta(seconds=float(clock_skew or os.getenv("REVOCATION_CLOCK_SKEW_SECONDS", 60)))
+        self.rebuild_interval = rebuild_interval
+        self._lock = Lock()
+        self._bloom = None
+        self._synced_until = None
+        self._last_refresh = 0.0
+        self._last_rebuild = 0.0
+        # Counters have their own lock; _lock is held across refresh queries
+        self._stats_lock = Lock()
+        self.checks = 0
+        self.filter_hits = 0
+        self.confirmed = 0
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._last_refresh < self.refresh_interval:
+            return
+        with self._lock:
+            if now - self._last_refresh < self.refresh_interval:
+                return
+            try:
+                if self._bloom is None or now - self._last_rebuild >= self.rebuild_interval:
+                    # Start over now and then so ids of long-expired tokens drop out
+                    bloom, query = BloomFilter(), {}
+                    self._last_rebuild = now
+                else:
+                    bloom, query = self._bloom, {"revoked_at": {"$gte": self._synced_until - self.clock_skew}}
+                synced_until = datetime.utcnow()
+                for doc in self.collection.find(query, {"_id": 1}):
+                    bloom.add(doc["_id"])
+                self._bloom = bloom
+                self._synced_until = synced_until
+            except Exception as e:
+                logger.error(f"Failed to refresh token revocation list: {str(e)}")
+            self._last_refresh = now
+
+    def revoke(self, token_id, expires_at):
+        """
+        expires_at: the token's exp as a UTC datetime
+        """
+        self.collection.update_one(
+            {"_id": token_id},
+            {"$set": {"revoked_at": datetime.utcnow(), "expires_at": expires_at}},
+            upsert=True
+        )
+        self._refresh()
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(token_id)
+
+    def is_revoked(self, token_id):
+        self._refresh()
+        bloom = self._bloom
+        if bloom is not None and token_id not in bloom:
+            with self._stats_lock:
+                self.checks += 1
+            return False
+        revoked = self.collection.find_one({"_id": token_id}, {"_id": 1}) is not None
+        with self._stats_lock:
+            self.checks += 1
+            self.filter_hits += 1
+            self.confirmed += revoked
+        return revoked
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "checks": self.checks,
+                "filter_hits": self.filter_hits,
+                "confirmed_revoked": self.confirmed
+            }
@@ -0,0 +1,333 @@
+from datetime import datetime, timedelta
+from threading import Lock
+import hashlib
+import logging
+import os
+import shutil
+import time
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from werkzeug.exceptions import ClientDisconnected
+
+from app.utils.files import CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_OPEN = "open"
+UPLOAD_FINALIZING = "finalizing"
+UPLOAD_COMPLETE = "complete"
+
+
+class UploadError(Exception):
+    pass
+
+
+class UploadNotFoundError(UploadError):
+    pass
+
+
+class UploadOffsetMismatchError(UploadError):
+    def __init__(self, offset):
+        super().__init__(f"Upload is at offset {offset}")
+        self.offset = offset
+
+
+class UploadTooLargeError(UploadError):
+    pass
+
+
+class UploadIncompleteError(UploadError):
+    pass
+
+
+class UploadChecksumMismatchError(UploadError):
+    pass
+
+
+class UploadSessionStore:
+    """
+    Resumable uploads for large report files.
+
+    A session is created with the file's size and the report it will
+    become, chunks are appended at the offset the server has acknowledged,
+    and finalize puts the finished file into the blob store. The report
+    itself is only inserted by the caller after finalize, who then calls
+    complete, or reopen if the report could not be created.
+
+    Chunks stream straight from the request to <directory>/<id>.part. The
+    acknowledged offset lives in the UploadSessions collection, so after a
+    dropped connection the client asks for it and resends only the rest:
+    whatever arrived before the drop is kept. Before writing, a request
+    claims the session in the collection (writer, writing_until), so two
+    server processes never write the part file at once; a claim left by a
+    crashed process lapses after write_lease seconds.
+
+    The SHA-256 is computed while the chunks are written. Finalize uses it
+    only if this process acknowledged the last chunk; otherwise (a restart,
+    another worker) the part file is hashed again, so the digest always
+    matches the bytes on disk.
+    """
+
+    def __init__(self, collection, directory, blob_store, max_bytes=None, ttl_hours=None, write_lease=None):
+        self.collection = collection
+        self.directory = directory
+        self.blob_store = blob_store
+        self.max_bytes = int(max_bytes or os.getenv("REPORT_UPLOAD_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+        self.ttl = timedelta(hours=float(ttl_hours or os.getenv("REPORT_UPLOAD_SESSION_HOURS", 24)))
+        self.write_lease = timedelta(seconds=float(write_lease or os.getenv("REPORT_UPLOAD_WRITE_LEASE_SECONDS", 60)))
+        self._hashers = {}  # session id -> (offset, running sha256)
+        self._locks = {}
+        # session id -> monotonic time its session expires, unless written to again
+        self._expires = {}
+        self._lock = Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def part_path(self, session_id):
+        return os.path.join(self.directory, f"{session_id}.part")
+
+    def create(self, owner, filename, size, report, sha256=None):
+        """
+        Open a session for a file of size bytes; report is the document to
+        insert once the upload completes. sha256, if the client sends it, is
+        checked on finalize.
+        """
+        if size <= 0:
+            raise UploadError("size must be a positive number of bytes")
+        if size > self.max_bytes:
+            raise UploadTooLargeError(f"Files are limited to {self.max_bytes} bytes")
+        now = datetime.now()
+        session_id = self.collection.insert_one({
+            "owner": owner,
+            "filename": filename,
+            "size": size,
+            "received": 0,
+            "sha256": sha256.lower() if sha256 else None,
+            "report": report,
+            "status": UPLOAD_OPEN,
+            "report_id": None,
+            "created_at": now,
+            "updated_at": now,
+            "expires_at": now + self.ttl
+        }).inserted_id
+        open(self.part_path(session_id), "wb").close()
+        return self.get(session_id, owner)
+
+    def get(self, session_id, owner):
+        try:
+            session = self.collection.find_one({"_id": ObjectId(session_id), "owner": owner})
+        except Exception:
+            session = None
+        if not session:
+            raise UploadNotFoundError("Upload not found")
+        return session
+
+    def write_chunk(self, session_id, owner, offset, stream, length=None):
+        """
+        Append a chunk that starts at offset, which must equal the offset the
+        server has acknowledged. Returns the new offset.
+        """
+        session = self.get(session_id, owner)
+        session_id = session["_id"]
+        with self._session_lock(session_id):
+            claim = self._claim(session_id, owner, offset)
+            try:
+                return self._write_claimed(claim, offset, stream, length)
+            finally:
+                self._release(session_id, claim["writer"])
+
+    def _claim(self, session_id, owner, offset):
+        """
+        Claim the range from offset for this request, in every process
+        """
+        now = datetime.now()
+        claim = self.collection.find_one_and_update(
+            {"_id": session_id, "owner": owner, "status": UPLOAD_OPEN, "received": offset,
+             "$or": [{"writing_until": None}, {"writing_until": {"$lt": now}}]},
+            {"$set": {"writer": ObjectId(), "writing_until": now + self.write_lease}},
+            return_document=ReturnDocument.AFTER
+        )
+        if claim is not None:
+            return claim
+        session = self.get(session_id, owner)
+        if session["status"] != UPLOAD_OPEN:
+            raise UploadError("Upload is already finalized")
+        if offset != session["received"]:
+            raise UploadOffsetMismatchError(session["received"])
+        raise UploadError("Another request is still writing to this upload")
+
+    def _renew(self, session_id, writer):
+        renewed = self.collection.update_one(
+            {"_id": session_id, "writer": writer},
+            {"$set": {"writing_until": datetime.now() + self.write_lease}}
+        ).matched_count
+        if not renewed:
+            # The claim lapsed and another request may be writing; stop touching the file
+            raise UploadError("Upload write was interrupted, resume from the acknowledged offset")
+
+    def _release(self, session_id, writer):
+        try:
+            self.collection.update_one(
+                {"_id": session_id, "writer": writer},
+                {"$set": {"writer": None, "writing_until": None}}
+            )
+        except Exception as e:
+            # The claim lapses on its own
+            logger.warning(f"Upload {session_id}: could not release write claim: {str(e)}")
+
+    def _write_claimed(self, session, offset, stream, length):
+        session_id, writer = session["_id"], session["writer"]
+        remaining = session["size"] - offset
+        if length is not None and length > remaining:
+            raise UploadTooLargeError(f"Chunk exceeds the declared size by {length - remaining} bytes")
+
+        # Hash into a copy: the cached hasher stays valid for offset until
+        # the new offset is acknowledged, whatever happens in between
+        hasher = self._hasher(session_id, offset).copy()
+        written = 0
+        renew_every = self.write_lease.total_seconds() / 4
+        renew_at = time.monotonic() + renew_every
+        try:
+            with open(self.part_path(session_id), "r+b") as f:
+                # Drop bytes written past the acknowledged offset by a request that failed
+                f.truncate(offset)
+                f.seek(offset)
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    if written + len(chunk) > remaining:
+                        raise UploadTooLargeError("Chunk exceeds the declared size")
+                    if time.monotonic() >= renew_at:
+                        self._renew(session_id, writer)
+                        renew_at = time.monotonic() + renew_every
+                    f.write(chunk)
+                    hasher.update(chunk)
+                    written += len(chunk)
+        except ClientDisconnected:
+            # Keep what arrived; the client resumes from the new offset
+            logger.info(f"Upload {session_id}: connection dropped after {written} bytes")
+
+        new_offset = offset + written
+        acknowledged = self.collection.update_one(
+            {"_id": session_id, "received": offset, "status": UPLOAD_OPEN, "writer": writer},
+            {"$set": {"received": new_offset, "updated_at": datetime.now(),
+                      "expires_at": datetime.now() + self.ttl}}
+        ).matched_count
+        if not acknowledged:
+            # The claim lapsed and another request took the range over
+            raise UploadOffsetMismatchError(self.get(session_id, session["owner"])["received"])
+        self._hashers[session_id] = (new_offset, hasher)
+        return new_offset
+
+    def finalize(self, session_id, owner):
+        """
+        Put a fully received file into the blob store, taking a reference
+        to it. Returns the claimed session and (digest, size); the caller
+        inserts the report and then calls complete, or releases the
+        reference and calls reopen when it cannot. Raises
+        UploadIncompleteError while bytes are missing.
+        """
+        session = self.get(session_id, owner)
+        if session["received"] < session["size"]:
+            raise UploadIncompleteError(f"{session['size'] - session['received']} bytes still missing")
+        session = self.collection.find_one_and_update(
+            {"_id": session["_id"], "status": UPLOAD_OPEN},
+            {"$set": {"status": UPLOAD_FINALIZING, "updated_at": datetime.now()}},
+            return_document=ReturnDocument.AFTER
+        )
+        if session is None:
+            raise UploadError("Upload is already being finalized")
+
+        session_id = session["_id"]
+        try:
+            with self._session_lock(session_id):
+                # Only a hash this process carried to the last acknowledged byte is trusted
+                known = self._hashers.pop(session_id, None)
+                if known and known[0] == session["size"]:
+                    digest = known[1].hexdigest()
+                else:
+                    digest = self._hasher(session_id, session["size"]).hexdigest()
+            if session["sha256"] and session["sha256"] != digest:
+                raise UploadChecksumMismatchError("Uploaded content does not match the declared SHA-256")
+            # The part file stays until complete so reopen can undo this;
+            # a hard link hands put_file its own name for the same bytes
+            tmp_path = self.blob_store.tmp_path()
+            try:
+                os.link(self.part_path(session_id), tmp_path)
+            except OSError:
+                shutil.copyfile(self.part_path(session_id), tmp_path)
+            try:
+                self.blob_store.put_file(tmp_path, digest, session["size"])
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        except Exception:
+            self.reopen(session_id)
+            raise
+        return session, (digest, session["size"])
+
+    def reopen(self, session_id):
+        """
+        Undo finalize, e.g. when the report could not be inserted: the
+        session can be finalized again or aborted
+        """
+        self.collection.update_one(
+            {"_id": session_id, "status": UPLOAD_FINALIZING},
+            {"$set": {"status": UPLOAD_OPEN, "updated_at": datetime.now()}}
+        )
+
+    def complete(self, session_id, report_id):
+        self.collection.update_one(
+            {"_id": session_id},
+            {"$set": {"status": UPLOAD_COMPLETE, "report_id": report_id, "updated_at": datetime.now()}}
+        )
+        self._discard(session_id)
+
+    def abort(self, session_id, owner):
+        session = self.get(session_id, owner)
+        if session["status"] != UPLOAD_OPEN:
+            raise UploadError("Upload is already finalized")
+        self.collection.delete_one({"_id": session["_id"], "status": UPLOAD_OPEN})
+        self._discard(session["_id"])
+
+    def _session_lock(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            # Sessions that expired, possibly in another process, never end here
+            for expired in [key for key, deadline in self._expires.items() if deadline <= now]:
+                self._expires.pop(expired)
+                self._locks.pop(expired, None)
+                self._hashers.pop(expired, None)
+            self._expires[session_id] = now + self.ttl.total_seconds()
+            return self._locks.setdefault(session_id, Lock())
+
+    def _hasher(self, session_id, offset):
+        known = self._hashers.get(session_id)
+        if known and known[0] == offset:
+            return known[1]
+        # Chunks so far went through another process; hash them once
+        hasher = hashlib.sha256()
+        with open(self.part_path(session_id), "rb") as f:
+            remaining = offset
+            while remaining:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                remaining -= len(chunk)
+        return hasher
+
+    def _discard(self, session_id):
+        """
+        Delete the part file and in-memory state of a session that has ended
+        """
+        with self._session_lock(session_id):
+            self._hashers.pop(session_id, None)
+            if os.path.exists(self.part_path(session_id)):
+                os.remove(self.part_path(session_id))
+        # A request still waiting on the old lock finds the session ended
+        # once it gets it, so a new lock for the same id is harmless
+        with self._lock:
+            self._locks.pop(session_id, None)
+            self._expires.pop(session_id, None)
@@ -0,0 +1,427 @@
+from datetime import datetime, timedelta
+from itertools import islice
+from threading import Event, Lock, Thread
+import logging
+import os
+import time
+import uuid
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.services.blob_store import BlobStore
+from app.services.upload_sessions import UPLOAD_OPEN, UPLOAD_FINALIZING
+
+logger = logging.getLogger(__name__)
+
+# Report fields naming a stored file, and the field with that file's digest
+REPORT_FILE_FIELDS = {
+    "original_file": "original_sha256",
+    "pdf_file": "pdf_sha256",
+    "json_file": "json_sha256"
+}
+LEGACY_CONVERSION_PREFIX = "converted_report_"
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class UploadsCompactor:
+    """
+    Background reclamation of disk space under uploads/.
+
+    Each run reconciles what is on disk with what the database references,
+    batch_size names per query; only the orphans found are held until the
+    end of a sweep:
+
+      reports/   legacy files no report names any more (including the
+                 converted_report_* files old versions wrote on every
+                 conversion) and stale .tmp files
+      blobs/     blobs left unreferenced by an interrupted delete, blob
+                 reference counts that disagree with the reports, and blob
+                 files without a Blobs document
+      partial/   part files of upload sessions that expired or finished
+      cache/     conversions unused for cache_max_age, and extracted PDF
+                 text of documents no report has as its original
+
+    Files younger than grace_seconds are never touched, so writes still in
+    flight are safe. Stored files are only swept against a database that
+    knows about them: with an empty Reports collection nothing under
+    reports/ or blobs/ is deleted, and a sweep that finds more than
+    max_orphan_share of the files it examined unreferenced is refused and
+    logged instead, since that means a wrong database rather than garbage.
+
+    When a disk budget is set and usage exceeds it, the conversion cache is
+    shrunk and then idle upload sessions are dropped; stored reports are
+    never deleted to meet the budget.
+
+    With several server processes only the holder of a lease in the
+    MaintenanceRuns collection runs, and it records each run's result there.
+    The server only starts it with UPLOADS_COMPACTOR_ENABLED=true; a single
+    pass can be run by hand with python -m app.services.uploads_compactor.
+    """
+
+    LEASE_ID = "uploads_compactor"
+
+    def __init__(self, maintenance_collection, reports_collection, blob_store, upload_sessions,
+                 conversion_cache, legacy_folder, budget_bytes=None, interval=None,
+                 grace_seconds=None, cache_max_age_days=None, batch_size=1000, pdf_text_cache=None,
+                 max_orphan_share=None):
+        self.maintenance_collection = maintenance_collection
+        self.reports_collection = reports_collection
+        self.blob_store = blob_store
+        self.upload_sessions = upload_sessions
+        self.conversion_cache = conversion_cache
+        self.pdf_text_cache = pdf_text_cache
+        self.legacy_folder = legacy_folder
+        self.budget_bytes = int(budget_bytes or os.getenv("UPLOADS_DISK_BUDGET_BYTES", 0))
+        self.interval = float(interval or os.getenv("UPLOADS_COMPACT_INTERVAL_SECONDS", 3600))
+        self.grace = float(grace_seconds or os.getenv("UPLOADS_ORPHAN_GRACE_SECONDS", 3600))
+        self.cache_max_age = 86400 * float(cache_max_age_days or os.getenv("REPORT_CACHE_MAX_AGE_DAYS", 30))
+        self.batch_size = batch_size
+        self.max_orphan_share = float(max_orphan_share or os.getenv("UPLOADS_MAX_ORPHAN_SHARE", 0.5))
+        self._holder = uuid.uuid4().hex
+        self._wakeup = Event()
+        self._lock = Lock()
+        self._pid = None
+        self.last_run = None
+
+    def start(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            Thread(target=self._run, name="uploads-compactor", daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            try:
+                if self._acquire_lease():
+                    self.run_once()
+            except Exception as e:
+                logger.error(f"Uploads compactor error: {str(e)}")
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def _acquire_lease(self):
+        now = datetime.now()
+        lease = {"$set": {"holder": self._holder, "lease_until": now + timedelta(seconds=self.interval * 1.5)}}
+        try:
+            return self.maintenance_collection.find_one_and_update(
+                {"_id": self.LEASE_ID, "$or": [{"holder": self._holder}, {"lease_until": {"$lt": now}}]},
+                lease,
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            ) is not None
+        except DuplicateKeyError:
+            # Another process holds an unexpired lease
+            return False
+
+    # ── One pass ─────────────────────────────────────────────────────────
+
+    def run_once(self):
+        """
+        Reconcile everything once; returns (and logs) what was reclaimed
+        """
+        started = time.monotonic()
+        self._cutoff = time.time() - self.grace
+        report = {
+            "orphans_deleted": 0,
+            "legacy_conversions_deleted": 0,
+            "blobs_collected": 0,
+            "refcounts_repaired": 0,
+            "partials_deleted": 0,
+            "cache_entries_expired": 0,
+            "pdf_text_entries_deleted": 0,
+            "bytes_reclaimed": 0,
+            "sweeps_refused": []
+        }
+        usage = {}
+        if self.reports_collection.find_one({}, {"_id": 1}) is None:
+            logger.warning("Reports is empty; leaving stored report files alone")
+            report["sweeps_refused"] += ["reports", "blobs"]
+            usage["reports"] = _disk_usage(self.legacy_folder)
+            usage["blobs"] = _disk_usage(self.blob_store.directory)
+        else:
+            usage["reports"] = self._sweep_legacy(report)
+            usage["blobs"] = self._reconcile_blobs(report)
+            self._sweep_blob_files(report)
+        usage["partial"] = self._sweep_partials(report)
+        expired, freed = self.conversion_cache.expire(self.cache_max_age)
+        report["cache_entries_expired"] += expired
+        report["bytes_reclaimed"] += freed
+        usage["cache"] = self.conversion_cache.stats()["bytes"]
+        if self.pdf_text_cache is not None:
+            if report["sweeps_refused"]:
+                usage["pdf_text"] = _disk_usage(self.pdf_text_cache.directory)
+            else:
+                usage["pdf_text"] = self._sweep_pdf_text(report)
+
+        if self.budget_bytes and sum(usage.values()) > self.budget_bytes:
+            self._enforce_budget(usage, report)
+        total = sum(usage.values())
+        report.update({
+            "disk_usage": {**usage, "total": total},
+            "budget_bytes": self.budget_bytes or None,
+            "over_budget": bool(self.budget_bytes) and total > self.budget_bytes,
+            "finished_at": datetime.now().isoformat(),
+            "duration_ms": round((time.monotonic() - started) * 1000)
+        })
+        if report["over_budget"]:
+            logger.warning(f"Uploads use {total} bytes, over the {self.budget_bytes} byte budget")
+        logger.info(f"Uploads compactor reclaimed {report['bytes_reclaimed']} bytes: {report}")
+        self.last_run = report
+        self.maintenance_collection.update_one({"_id": self.LEASE_ID}, {"$set": {"last_run": report}}, upsert=True)
+        return report
+
+    def _is_stale(self, stat):
+        return stat.st_mtime < self._cutoff
+
+    def _remove(self, path, stat, report, counter):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        report[counter] += 1
+        report["bytes_reclaimed"] += stat.st_size
+
+    def _refuse(self, sweep, orphans, examined, report):
+        """
+        True, after logging why, when a sweep would delete too large a share
+        of what it examined to be trusted
+        """
+        if orphans <= self.max_orphan_share * examined:
+            return False
+        logger.warning(f"Not sweeping {sweep}: {orphans} of {examined} files are unreferenced, "
+                       "check that the server uses the right database")
+        report["sweeps_refused"].append(sweep)
+        return True
+
+    def _sweep_legacy(self, report):
+        """
+        Files in the flat reports folder that no report names. Returns the
+        bytes kept.
+        """
+        if not os.path.isdir(self.legacy_folder):
+            return 0
+        kept = examined = 0
+        conversions, orphans = [], []
+        with os.scandir(self.legacy_folder) as entries:
+            for batch in batched((e for e in entries if e.is_file()), self.batch_size):
+                names = [e.name for e in batch]
+                referenced = set()
+                query = {"$or": [{field: {"$in": names}} for field in REPORT_FILE_FIELDS]}
+                for doc in self.reports_collection.find(query, {field: 1 for field in REPORT_FILE_FIELDS}):
+                    referenced.update(doc.get(field) for field in REPORT_FILE_FIELDS)
+                for entry in batch:
+                    stat = entry.stat()
+                    if entry.name.startswith(LEGACY_CONVERSION_PREFIX):
+                        # Unreferenced by design, so they say nothing about the database
+                        candidates = conversions
+                    else:
+                        candidates = orphans
+                        examined += 1
+                    if entry.name in referenced or not self._is_stale(stat):
+                        kept += stat.st_size
+                    else:
+                        candidates.append((entry.path, stat))
+
+        if self._refuse("reports", len(orphans), examined, report):
+            return kept + sum(stat.st_size for _, stat in conversions + orphans)
+        for path, stat in conversions:
+            self._remove(path, stat, report, "legacy_conversions_deleted")
+        for path, stat in orphans:
+            self._remove(path, stat, report, "orphans_deleted")
+        return kept
+
+    def _reconcile_blobs(self, report):
+        """
+        Recount each blob's references from the reports, fixing and collecting
+        as needed. Returns the bytes of the blobs kept.
+        """
+        kept = 0
+        cutoff = datetime.fromtimestamp(self._cutoff)
+        last_id = None
+        while True:
+            query = {} if last_id is None else {"_id": {"$gt": last_id}}
+            blobs = list(self.blob_store.collection.find(query).sort("_id", 1).limit(self.batch_size))
+            if not blobs:
+                return kept
+            last_id = blobs[-1]["_id"]
+
+            counts = self._reference_counts([blob["_id"] for blob in blobs])
+            for blob in blobs:
+                digest, actual = blob["_id"], counts.get(blob["_id"], 0)
+                # Recent changes may belong to an upload or render whose report
+                # is not written yet
+                if blob["refcount"] != actual and (blob.get("updated_at") or datetime.min) < cutoff:
+                    fixed = self.blob_store.collection.update_one(
+                        {"_id": digest, "refcount": blob["refcount"]},
+                        {"$set": {"refcount": actual}}
+                    ).modified_count
+                    if fixed:
+                        logger.warning(f"Blob {digest}: refcount {blob['refcount']} corrected to {actual}")
+                        report["refcounts_repaired"] += 1
+                        blob["refcount"] = actual
+                if blob["refcount"] <= 0:
+                    freed = self.blob_store.collect(digest)
+                    if freed:
+                        report["blobs_collected"] += 1
+                        report["bytes_reclaimed"] += freed
+                        continue
+                kept += blob.get("size", 0)
+
+    def _reference_counts(self, digests):
+        query = {"$or": [{hash_field: {"$in": digests}} for hash_field in REPORT_FILE_FIELDS.values()]}
+        counts = {}
+        for doc in self.reports_collection.find(query, {field: 1 for field in REPORT_FILE_FIELDS}):
+            for field in REPORT_FILE_FIELDS:
+                # Legacy reports carry digests too, but their names point elsewhere
+                digest = BlobStore.digest_of(doc.get(field))
+                if digest:
+                    counts[digest] = counts.get(digest, 0) + 1
+        return counts
+
+    def _sweep_blob_files(self, report):
+        """
+        Blob files without a Blobs document, and abandoned scratch files
+        """
+        examined = 0
+        orphans = []
+        for batch in batched(self.blob_store.scan(), self.batch_size):
+            examined += len(batch)
+            known = {doc["_id"] for doc in self.blob_store.collection.find({"_id": {"$in": batch}}, {"_id": 1})}
+            for digest in batch:
+                if digest in known:
+                    continue
+                try:
+                    if self._is_stale(os.stat(self.blob_store.path(digest))):
+                        orphans.append(digest)
+                except FileNotFoundError:
+                    continue
+
+        if not self._refuse("blobs", len(orphans), examined, report):
+            for digest in orphans:
+                freed = self.blob_store.discard(digest)
+                if freed:
+                    report["orphans_deleted"] += 1
+                    report["bytes_reclaimed"] += freed
+
+        with os.scandir(self.blob_store.tmp_directory) as entries:
+            for entry in entries:
+                if entry.is_file() and self._is_stale(entry.stat()):
+                    self._remove(entry.path, entry.stat(), report, "orphans_deleted")
+
+    def _sweep_partials(self, report):
+        """
+        Part files of upload sessions that are gone or complete (a
+        finalizing session may still be reopened). Returns the bytes kept.
+        """
+        kept = 0
+        directory = self.upload_sessions.directory
+        with os.scandir(directory) as entries:
+            for batch in batched((e for e in entries if e.is_file()), self.batch_size):
+                ids = [ObjectId(e.name[:-len(".part")]) for e in batch
+                       if e.name.endswith(".part") and ObjectId.is_valid(e.name[:-len(".part")])]
+                open_ids = {
+                    str(doc["_id"]) for doc in self.upload_sessions.collection.find(
+                        {"_id": {"$in": ids}, "status": {"$in": [UPLOAD_OPEN, UPLOAD_FINALIZING]}}, {"_id": 1}
+                    )
+                }
+                for entry in batch:
+                    stat = entry.stat()
+                    if entry.name[:-len(".part")] in open_ids or not self._is_stale(stat):
+                        kept += stat.st_size
+                    else:
+                        self._remove(entry.path, stat, report, "partials_deleted")
+        return kept
+
+    def _sweep_pdf_text(self, report):
+        """
+        Extracted text of PDFs that are no report's original any more.
+        Returns the bytes kept.
+        """
+        kept = 0
+        for batch in batched(self.pdf_text_cache.scan(), self.batch_size):
+            referenced = {
+                doc["original_sha256"] for doc in self.reports_collection.find(
+                    {"original_sha256": {"$in": [digest for digest, _ in batch]}}, {"original_sha256": 1}
+                )
+            }
+            for digest, directory in batch:
+                try:
+                    if digest in referenced or not self._is_stale(os.stat(directory)):
+                        with os.scandir(directory) as entries:
+                            kept += sum(entry.stat().st_size for entry in entries if entry.is_file())
+                        continue
+                except FileNotFoundError:
+                    continue
+                freed = self.pdf_text_cache.discard(digest)
+                report["pdf_text_entries_deleted"] += 1
+                report["bytes_reclaimed"] += freed
+        return kept
+
+    def _enforce_budget(self, usage, report):
+        """
+        Shrink the conversion cache, then drop the longest idle upload
+        sessions, until usage fits the budget. Updates usage in place.
+        """
+        excess = sum(usage.values()) - self.budget_bytes
+        freed = self.conversion_cache.trim(max(0, usage["cache"] - excess))
+        usage["cache"] -= freed
+        report["bytes_reclaimed"] += freed
+
+        idle_before = datetime.fromtimestamp(self._cutoff)
+        idle = self.upload_sessions.collection.find(
+            {"status": UPLOAD_OPEN, "updated_at": {"$lt": idle_before}},
+            {"owner": 1, "received": 1}
+        ).sort("updated_at", 1)
+        for session in idle:
+            if freed >= excess:
+                break
+            try:
+                self.upload_sessions.abort(session["_id"], session["owner"])
+            except Exception:
+                continue  # resumed or finalized meanwhile
+            logger.warning(f"Dropped idle upload {session['_id']} to stay within the disk budget")
+            report["partials_deleted"] += 1
+            report["bytes_reclaimed"] += session["received"]
+            usage["partial"] -= session["received"]
+            freed += session["received"]
+
+    def stats(self):
+        """
+        The latest run, which may have been another process's
+        """
+        if self.last_run is None:
+            state = self.maintenance_collection.find_one({"_id": self.LEASE_ID}, {"last_run": 1})
+            return (state or {}).get("last_run")
+        return self.last_run
+
+
+def _disk_usage(directory):
+    total = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            try:
+                total += os.stat(os.path.join(root, name)).st_size
+            except FileNotFoundError:
+                continue
+    return total
+
+
+def create_uploads_compactor(db, blob_store, upload_sessions, conversion_cache, legacy_folder, pdf_text_cache=None):
+    return UploadsCompactor(db["MaintenanceRuns"], db["Reports"], blob_store, upload_sessions,
+                            conversion_cache, legacy_folder, pdf_text_cache=pdf_text_cache)
+
+
+if __name__ == "__main__":
+    from app.controllers.reports_controller import uploads_compactor
+
+    print(uploads_compactor.run_once())
@@ -1,9 +1,147 @@
 from flask_bcrypt import Bcrypt
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from threading import Lock
+import atexit
+import logging
+import os
+
+logger = logging.getLogger(__name__)
 
 bcrypt = Bcrypt()
 
+
+def _hash(password, rounds):
+    return bcrypt.generate_password_hash(password, rounds).decode("utf-8")
+
+
+def _check(hashed_password, password):
+    return bcrypt.check_password_hash(hashed_password, password)
+
+
+def hash_rounds(hashed_password):
+    """
+    Cost factor of a bcrypt hash ("$2b$12$..." -> 12), or None if unparseable
+    """
+    try:
+        return int(hashed_password.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class PasswordHasherBusyError(Exception):
+    pass
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated executor so the number of hashes computed at
+    once is bounded by the pool size rather than by the number of request
+    threads. bcrypt releases the GIL, so a thread pool already uses several
+    cores; executor="process" moves the work out of the web process entirely.
+
+    A request still needs the result to answer, but it waits at most
+    max_wait seconds: under a login storm the work it gave up on is
+    cancelled and PasswordHasherBusyError raised, so callers can shed load
+    instead of piling up request threads behind the pool. Callers can also
+    start a hash with hash_async and do their database work meanwhile.
+    """
+
+    def __init__(self, rounds=12, pool_size=None, executor="thread", max_wait=None):
+        self.rounds = rounds
+        self.pool_size = pool_size or os.cpu_count() or 2
+        self.executor_kind = executor
+        self.max_wait = float(max_wait or os.getenv("BCRYPT_MAX_WAIT_SECONDS", 5))
+        self._executor = None
+        self._lock = Lock()
+
+    def _get_executor(self):
+        # Created on first use, so importing this module never spawns workers
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.executor_kind == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.pool_size)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def hash_async(self, password):
+        return self._get_executor().submit(_hash, password, self.rounds)
+
+    def check_async(self, hashed_password, password):
+        return self._get_executor().submit(_check, hashed_password, password)
+
+    def wait(self, future):
+        try:
+            return future.result(timeout=self.max_wait)
+        except FutureTimeoutError:
+            future.cancel()
+            raise PasswordHasherBusyError("Too many logins at once, please try again shortly")
+
+    def hash(self, password):
+        return self.wait(self.hash_async(password))
+
+    def check(self, hashed_password, password):
+        return self.wait(self.check_async(hashed_password, password))
+
+    def needs_rehash(self, hashed_password):
+        # Only upgrade: lowering the configured cost must not weaken existing hashes
+        return (hash_rounds(hashed_password) or 0) < self.rounds
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    rounds=int(os.getenv("BCRYPT_LOG_ROUNDS", 12)),
+    pool_size=int(os.getenv("BCRYPT_POOL_SIZE", 0)) or None,
+    executor=os.getenv("BCRYPT_EXECUTOR", "thread")
+)
+atexit.register(password_hasher.shutdown)
+
+
 def hash_password(password):
-    return bcrypt.generate_password_hash(password).decode("utf-8")
+    return password_hasher.hash(password)
+
+
+def hash_password_async(password):
+    """
+    Start hashing; pass the future to wait_for_hash when the hash is needed
+    """
+    return password_hasher.hash_async(password)
+
+
+def wait_for_hash(future):
+    return password_hasher.wait(future)
+
 
 def check_password(hashed_password, password):
-    return bcrypt.check_password_hash(hashed_password, password)
+    return password_hasher.check(hashed_password, password)
+
+
+def needs_rehash(hashed_password):
+    return password_hasher.needs_rehash(hashed_password)
+
+
+def rehash_in_background(password, on_done):
+    """
+    Hash password with the current cost and call on_done(new_hash) when ready.
+    A rehash that fails or is cancelled is logged; the old hash keeps working.
+    """
+    def done(f):
+        if f.cancelled():
+            logger.warning("Password rehash cancelled")
+            return
+        if f.exception() is not None:
+            logger.error(f"Password rehash failed: {str(f.exception())}")
+            return
+        try:
+            on_done(f.result())
+        except Exception as e:
+            logger.error(f"Failed to store rehashed password: {str(e)}")
+
+    future = password_hasher.hash_async(password)
+    future.add_done_callback(done)
+    return future
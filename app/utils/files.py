@@ -0,0 +1,35 @@
+import hashlib
+import os
+import uuid
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(path, chunk_size=CHUNK_SIZE):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_stream(stream, path, chunk_size=CHUNK_SIZE):
+    """
+    Copy a readable stream (e.g. an uploaded file) to path, hashing it on the
+    way so the content is read only once. The file appears under its final
+    name only when complete. Returns (sha256 hex digest, size in bytes).
+    """
+    digest = hashlib.sha256()
+    size = 0
+    tmp_path = os.path.join(os.path.dirname(path), f".{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            for chunk in iter(lambda: stream.read(chunk_size), b""):
+                digest.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return digest.hexdigest(), size
@@ -1,6 +1,7 @@
 import jwt
 import datetime
 import os
+import uuid
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 
@@ -11,6 +12,7 @@ def generate_jwt(user_info):
     """
     payload = {
         **user_info,
+        "jti": uuid.uuid4().hex,  # lets a single token be revoked
         "exp": datetime.datetime.utcnow() + datetime.timedelta(days=1)
     }
     token = jwt.encode(payload, SECRET_KEY, algorithm="HS256")
@@ -1,30 +1,120 @@
-from flask_mail import Mail
+import atexit
+import heapq
+import itertools
 import logging
+import os
+import queue
 import smtplib
+import ssl
+import time
+from contextlib import contextmanager
+from email import policy
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-import os
-import ssl
+from threading import Condition, Lock, Semaphore, Thread
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-def send_otp_email(to_email, otp):
-    try:
-        # Get credentials from environment
-        smtp_server = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
-        smtp_port = int(os.getenv('MAIL_PORT', 587))
-        smtp_username = os.getenv('MAIL_USERNAME')
-        smtp_password = os.getenv('MAIL_PASSWORD')
 
-        logger.debug(f"Attempting to send email using: {smtp_username} via {smtp_server}:{smtp_port}")
+class SMTPConnectionPool:
+    """
+    Keeps authenticated SMTP connections open between sends, so the TCP,
+    STARTTLS and AUTH round trips are paid once per connection rather than
+    once per email. Connections idle for longer than idle_check seconds are
+    probed with NOOP before reuse; any connection that fails mid-send is
+    discarded and replaced on the next acquire.
+    """
+
+    def __init__(self, host, port, username=None, password=None, use_tls=True,
+                 size=2, timeout=10, idle_check=30, debug=False):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.idle_check = idle_check
+        self.debug = debug
+        self._ssl_context = ssl.create_default_context() if use_tls else None
+        self._idle = queue.LifoQueue()
+        self._slots = Semaphore(size)
+
+    def _connect(self):
+        logger.debug(f"Opening SMTP connection to {self.host}:{self.port}")
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.set_debuglevel(1 if self.debug else 0)
+            if self.use_tls:
+                conn.starttls(context=self._ssl_context)
+            if self.username:
+                conn.login(self.username, self.password)
+        except Exception:
+            self._close(conn)
+            raise
+        return conn
+
+    def _close(self, conn):
+        try:
+            conn.quit()
+        except Exception:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def _acquire(self):
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - last_used < self.idle_check:
+                return conn
+            try:
+                if conn.noop()[0] == 250:
+                    return conn
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self._close(conn)
 
-        # Create message
+    @contextmanager
+    def connection(self):
+        with self._slots:
+            conn = self._acquire()
+            try:
+                yield conn
+            except Exception:
+                self._close(conn)
+                raise
+            self._idle.put((conn, time.monotonic()))
+
+    def close(self):
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(conn)
+
+
+class OTPEmailTemplate:
+    """
+    The OTP email rendered once to wire-format bytes. Sending only swaps the
+    recipient and code into the placeholders instead of rebuilding the MIME tree.
+    """
+    TO_PLACEHOLDER = b"__HMS_TO__"
+    OTP_PLACEHOLDER = b"__HMS_OTP__"
+
+    def __init__(self, sender, subject="Your HMS Authentication Code"):
+        otp = self.OTP_PLACEHOLDER.decode("ascii")
         msg = MIMEMultipart('alternative')
-        msg['Subject'] = 'Your HMS Authentication Code'
-        msg['From'] = smtp_username
-        msg['To'] = to_email
+        msg['Subject'] = subject
+        msg['From'] = sender or ""
+        msg['To'] = self.TO_PLACEHOLDER.decode("ascii")
 
         # Create HTML content
         html = f"""
@@ -42,34 +132,156 @@ def send_otp_email(to_email, otp):
         </html>
         """
 
-        text_part = MIMEText("Your authentication code is: " + str(otp), 'plain')
-        html_part = MIMEText(html, 'html')
-
-        msg.attach(text_part)
-        msg.attach(html_part)
-
-        # Create SMTP connection with explicit SSL/TLS handling
-        logger.debug("Creating SMTP connection...")
-        
-        context = ssl.create_default_context()
-        with smtplib.SMTP(smtp_server, smtp_port) as server:
-            server.set_debuglevel(1)  # Enable SMTP debug
-            server.starttls(context=context)
-            
-            logger.debug("Attempting SMTP login...")
-            server.login(smtp_username, smtp_password)
-            
-            logger.debug(f"Sending email to {to_email}")
-            server.send_message(msg)
-            logger.debug("Email sent successfully!")
-            return True
-
-    except smtplib.SMTPAuthenticationError as e:
-        logger.error(f"SMTP Authentication failed: {str(e)}")
-        raise Exception("Email authentication failed. Please check Gmail credentials.")
-    except smtplib.SMTPException as e:
-        logger.error(f"SMTP error occurred: {str(e)}")
-        raise Exception(f"Failed to send email: {str(e)}")
-    except Exception as e:
-        logger.error(f"Unexpected error sending email: {str(e)}")
-        raise Exception(f"Failed to send email: {str(e)}")
+        # us-ascii bodies are sent as 7bit, so the placeholders survive encoding untouched
+        msg.attach(MIMEText("Your authentication code is: " + otp, 'plain', 'us-ascii'))
+        msg.attach(MIMEText(html, 'html', 'us-ascii'))
+        self._template = msg.as_bytes(policy=policy.SMTP)
+
+    def render(self, to_email, otp):
+        if any(c in to_email for c in "\r\n"):
+            raise ValueError("Invalid recipient address")
+        return (self._template
+                .replace(self.TO_PLACEHOLDER, to_email.encode("utf-8"))
+                .replace(self.OTP_PLACEHOLDER, str(otp).encode("ascii")))
+
+
+class MailQueue:
+    """
+    Sends emails from background threads through an SMTPConnectionPool.
+    Transient failures (dropped connections, 4xx replies) are retried with
+    exponential backoff; authentication errors and 5xx replies are not.
+    """
+
+    def __init__(self, pool, sender, workers=1, max_size=1000, max_attempts=5,
+                 backoff_base=1.0, backoff_max=60.0):
+        self.pool = pool
+        self.sender = sender
+        self.max_size = max_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._heap = []
+        self._sequence = itertools.count()
+        self._cond = Condition()
+        self._stopping = False
+        self._in_flight = 0
+        self._threads = [Thread(target=self._run, name=f"mail-queue-{i}", daemon=True) for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def enqueue(self, to_email, message_bytes):
+        with self._cond:
+            if self._stopping:
+                raise RuntimeError("Mail queue is shut down")
+            if len(self._heap) >= self.max_size:
+                raise RuntimeError("Mail queue is full")
+            heapq.heappush(self._heap, (time.monotonic(), next(self._sequence), to_email, message_bytes, 1))
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._heap and (self._stopping or self._heap[0][0] <= time.monotonic()):
+                        break
+                    if self._stopping and not self._heap:
+                        return
+                    self._cond.wait(self._heap[0][0] - time.monotonic() if self._heap else None)
+                _, _, to_email, message_bytes, attempt = heapq.heappop(self._heap)
+                self._in_flight += 1
+            try:
+                self._send(to_email, message_bytes, attempt)
+            finally:
+                with self._cond:
+                    self._in_flight -= 1
+                    self._cond.notify_all()
+
+    def _send(self, to_email, message_bytes, attempt):
+        try:
+            with self.pool.connection() as conn:
+                conn.sendmail(self.sender, [to_email], message_bytes)
+            logger.debug(f"Email sent to {to_email} (attempt {attempt})")
+            return
+        except smtplib.SMTPAuthenticationError as e:
+            logger.error(f"SMTP Authentication failed: {str(e)}")
+            return
+        except smtplib.SMTPResponseException as e:
+            if not 400 <= e.smtp_code < 500:
+                logger.error(f"Permanent SMTP error sending to {to_email}: {str(e)}")
+                return
+            error = e
+        except smtplib.SMTPRecipientsRefused as e:
+            logger.error(f"Recipient refused {to_email}: {str(e)}")
+            return
+        except (smtplib.SMTPException, OSError) as e:
+            error = e
+
+        with self._cond:
+            if attempt >= self.max_attempts or self._stopping:
+                logger.error(f"Giving up on email to {to_email} after {attempt} attempts: {str(error)}")
+                return
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+            logger.warning(f"Email to {to_email} failed ({str(error)}), retrying in {delay:.1f}s")
+            heapq.heappush(self._heap, (time.monotonic() + delay, next(self._sequence), to_email, message_bytes, attempt + 1))
+            self._cond.notify()
+
+    def flush(self, timeout=None):
+        """
+        Wait until every email currently due has been attempted
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._in_flight or any(item[0] <= time.monotonic() for item in self._heap):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining if remaining is not None else 0.1)
+        return True
+
+    def shutdown(self, timeout=10):
+        """
+        Send what is still queued (pending retries get one last attempt), then stop
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0, deadline - time.monotonic()))
+        self.pool.close()
+
+
+_otp_template = None
+_mail_queue = None
+_mail_lock = Lock()
+
+
+def get_mail_queue():
+    # Built on first use so the environment from .env is already loaded
+    global _otp_template, _mail_queue
+    with _mail_lock:
+        if _mail_queue is None:
+            smtp_username = os.getenv('MAIL_USERNAME')
+            pool = SMTPConnectionPool(
+                host=os.getenv('MAIL_SERVER', 'smtp.gmail.com'),
+                port=int(os.getenv('MAIL_PORT', 587)),
+                username=smtp_username,
+                password=os.getenv('MAIL_PASSWORD'),
+                use_tls=os.getenv('MAIL_USE_TLS', 'True').lower() == 'true',
+                size=int(os.getenv('MAIL_POOL_SIZE', 2)),
+                debug=os.getenv('MAIL_SMTP_DEBUG', 'False').lower() == 'true'
+            )
+            _otp_template = OTPEmailTemplate(smtp_username)
+            _mail_queue = MailQueue(pool, smtp_username, workers=int(os.getenv('MAIL_WORKERS', 1)))
+            atexit.register(_mail_queue.shutdown)
+        return _mail_queue
+
+
+def send_otp_email(to_email, otp):
+    """
+    Queue the OTP email for background delivery and return immediately
+    """
+    mail_queue = get_mail_queue()
+    logger.debug(f"Queueing OTP email to {to_email}")
+    mail_queue.enqueue(to_email, _otp_template.render(to_email, otp))
+    return True
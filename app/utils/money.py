@@ -0,0 +1,93 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+CENTS = Decimal("0.01")
+# amount_cents is stored as a BSON int64
+MAX_CENTS = 2 ** 63 - 1
+
+
+class InvalidAmountError(ValueError):
+    pass
+
+
+class Money:
+    """
+    An amount of money held as an integer number of cents.
+
+    Documents store it as two fields: amount_cents, an exact integer that
+    aggregations sum without rounding drift, and amount, a numeric copy in
+    currency units that keeps the existing API responses unchanged.
+    """
+
+    __slots__ = ("cents",)
+
+    def __init__(self, cents):
+        if isinstance(cents, bool) or not isinstance(cents, int):
+            raise InvalidAmountError("cents must be an integer")
+        if not -MAX_CENTS <= cents <= MAX_CENTS:
+            raise InvalidAmountError("Amount is too large")
+        self.cents = cents
+
+    @classmethod
+    def parse(cls, value):
+        """
+        Build from client or stored input: "12.5", 12.5, 12, Decimal or Decimal128.
+        Sub-cent digits are rounded half up.
+        """
+        if isinstance(value, Money):
+            return value
+        if value is None or isinstance(value, bool):
+            raise InvalidAmountError(f"Invalid amount: {value!r}")
+        if hasattr(value, "to_decimal"):  # bson Decimal128
+            value = value.to_decimal()
+        try:
+            # str() so floats convert by their shortest repr: 0.1 -> 0.10, not 0.1000000000000000055
+            amount = Decimal(value if isinstance(value, Decimal) else str(value).strip())
+            if not amount.is_finite():
+                raise InvalidAmountError(f"Invalid amount: {value!r}")
+            # Raises InvalidOperation once the cents need more digits than the context holds ("1e30")
+            cents = int(amount.quantize(CENTS, rounding=ROUND_HALF_UP).scaleb(2))
+        except (InvalidOperation, ValueError):
+            raise InvalidAmountError(f"Invalid amount: {value!r}")
+        return cls(cents)
+
+    @classmethod
+    def from_document(cls, doc, field="amount"):
+        """
+        Read a stored amount, preferring the exact cents field when present
+        """
+        cents = doc.get(f"{field}_cents")
+        if isinstance(cents, int) and not isinstance(cents, bool):
+            return cls(cents)
+        return cls.parse(doc.get(field))
+
+    def to_document(self, field="amount"):
+        return {field: self.amount, f"{field}_cents": self.cents}
+
+    @property
+    def amount(self):
+        return self.cents / 100
+
+    def to_decimal(self):
+        return Decimal(self.cents).scaleb(-2)
+
+    def __add__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return Money(self.cents + other.cents)
+
+    def __eq__(self, other):
+        return isinstance(other, Money) and self.cents == other.cents
+
+    def __lt__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self.cents < other.cents
+
+    def __hash__(self):
+        return hash(self.cents)
+
+    def __str__(self):
+        return f"{self.to_decimal():.2f}"
+
+    def __repr__(self):
+        return f"Money('{self}')"
@@ -0,0 +1,88 @@
+import base64
+import json
+from bson import ObjectId
+from datetime import datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """
+    Parse a ?limit= query value, clamped to [1, maximum]
+    """
+    if value in (None, ""):
+        return default
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    return max(1, min(size, maximum))
+
+
+def encode_cursor(sort_value, doc_id):
+    """
+    Encode the (sort key, _id) of the last document of a page into an opaque token
+    """
+    payload = {"k": sort_value, "id": str(doc_id)}
+    if isinstance(sort_value, datetime):
+        payload.update(k=sort_value.isoformat(), t="dt")
+    payload = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Decode a token produced by encode_cursor back into (sort key, ObjectId)
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        sort_value = datetime.fromisoformat(payload["k"]) if payload.get("t") == "dt" else payload["k"]
+        return sort_value, ObjectId(payload["id"])
+    except Exception:
+        raise InvalidCursorError("Invalid pagination cursor")
+
+
+def keyset_filter(sort_field, cursor):
+    """
+    Build the filter selecting documents strictly after the cursor when sorting
+    ascending on (sort_field, _id)
+    """
+    sort_value, doc_id = decode_cursor(cursor)
+    if sort_value is None:
+        # Null and missing values sort first, and $gt: null matches nothing
+        return {"$or": [
+            {sort_field: {"$ne": None}},
+            {sort_field: None, "_id": {"$gt": doc_id}}
+        ]}
+    return {"$or": [
+        {sort_field: {"$gt": sort_value}},
+        {sort_field: sort_value, "_id": {"$gt": doc_id}}
+    ]}
+
+
+def paginate(collection, query, sort_field, limit, cursor=None, projection=None):
+    """
+    Fetch one page of documents ordered by (sort_field, _id).
+    Returns (documents, next_cursor); next_cursor is None on the last page.
+    """
+    if cursor:
+        query = {"$and": [query, keyset_filter(sort_field, cursor)]} if query else keyset_filter(sort_field, cursor)
+
+    docs = list(
+        collection.find(query, projection)
+        .sort([(sort_field, 1), ("_id", 1)])
+        .limit(limit + 1)
+    )
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last.get(sort_field), last["_id"])
+    return docs, next_cursor
@@ -0,0 +1,78 @@
+"""
+Time the AnalyticsEngine metrics on synthetic Billing and Appointments
+columns, bypassing MongoDB so only the NumPy work is measured.
+
+    python -m benchmarks.analytics_bench --rows 1000000 5000000 --doctors 200
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.analytics_engine import (
+    AnalyticsEngine, AppointmentColumns, BillingColumns, ColumnEncoder
+)
+
+STATUSES = ["scheduled", "visited", "completed", "cancelled", "no-show"]
+
+
+def synthetic_columns(rows, doctors, days, seed=0):
+    rng = np.random.default_rng(seed)
+    doctor_encoder = ColumnEncoder()
+    for i in range(doctors):
+        doctor_encoder.encode(f"doctor{i}@hospital.test")
+    status_encoder = ColumnEncoder()
+    for status in STATUSES:
+        status_encoder.encode(status)
+
+    first_day = np.datetime64("2024-01-01", "D").astype(np.int64)
+    billing = BillingColumns(
+        amounts=np.round(rng.lognormal(6, 0.8, rows), 2),
+        doctors=rng.integers(0, doctors, rows, dtype=np.int32),
+        days=first_day + rng.integers(0, days, rows),
+        doctor_encoder=doctor_encoder
+    )
+    appointments = AppointmentColumns(
+        statuses=rng.integers(0, len(STATUSES), rows, dtype=np.int32),
+        doctors=rng.integers(0, doctors, rows, dtype=np.int32),
+        days=first_day + rng.integers(0, days, rows),
+        status_encoder=status_encoder,
+        doctor_encoder=doctor_encoder
+    )
+    return billing, appointments
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 5_000_000])
+    parser.add_argument("--doctors", type=int, default=200)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    metrics = {
+        "revenue/doctor": lambda e: e.revenue("doctor"),
+        "revenue/day": lambda e: e.revenue("day"),
+        "revenue/week": lambda e: e.revenue("week"),
+        "revenue/range": lambda e: e.revenue("day", "2024-03-01", "2024-09-30"),
+        "volumes": lambda e: e.appointment_volumes(),
+        "no-show": lambda e: e.no_show_rates(),
+        "percentiles": lambda e: e.payment_percentiles(),
+    }
+
+    print(f"{'rows':>10} {'metric':>15} {'best ms':>9}")
+    for rows in args.rows:
+        billing, appointments = synthetic_columns(rows, args.doctors, args.days)
+        # cache_ttl=0 so every call recomputes
+        engine = AnalyticsEngine(lambda: billing, lambda: appointments, cache_ttl=0)
+        for name, metric in metrics.items():
+            best = float("inf")
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                metric(engine)
+                best = min(best, time.perf_counter() - started)
+            print(f"{rows:>10} {name:>15} {best * 1000:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Login throughput of the bcrypt PasswordHasher at different cost factors,
+pool sizes and executor kinds.
+
+Simulates `clients` request threads each doing check_password for a
+stored hash, the CPU-heavy part of /api/auth/login.
+
+    python -m benchmarks.bcrypt_login_bench --rounds 10 12 --pools 1 2 4 --clients 16
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils.encryption import PasswordHasher, _hash
+
+
+def run(rounds, pool_size, executor, clients, logins):
+    hasher = PasswordHasher(rounds=rounds, pool_size=pool_size, executor=executor)
+    stored = _hash("correct horse battery staple", rounds)
+    hasher.check(stored, "warm up the pool")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as request_threads:
+        results = list(request_threads.map(
+            lambda _: hasher.check(stored, "correct horse battery staple"),
+            range(logins)
+        ))
+    elapsed = time.perf_counter() - started
+    hasher.shutdown()
+
+    assert all(results)
+    return logins / elapsed, elapsed / logins * clients
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 12])
+    parser.add_argument("--pools", type=int, nargs="+", default=[1, 2, os.cpu_count() or 4])
+    parser.add_argument("--executors", nargs="+", default=["thread", "process"])
+    parser.add_argument("--clients", type=int, default=16, help="concurrent request threads")
+    parser.add_argument("--logins", type=int, default=64, help="logins per configuration")
+    args = parser.parse_args()
+
+    print(f"{'cost':>4} {'executor':>8} {'pool':>4} {'logins/s':>10} {'latency ms':>11}")
+    for rounds in args.rounds:
+        for executor in args.executors:
+            for pool_size in args.pools:
+                throughput, latency = run(rounds, pool_size, executor, args.clients, args.logins)
+                print(f"{rounds:>4} {executor:>8} {pool_size:>4} {throughput:>10.1f} {latency * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
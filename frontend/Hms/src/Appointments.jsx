@@ -1,13 +1,17 @@
 // Appointments.jsx
-import React, { useEffect, useState } from "react";
+import React, { useState } from "react";
 import axios from "axios";
+import { useAppointmentPages } from "./useAppointmentPages";
+import LoadMoreButton from "./LoadMoreButton";
 import { FaSpinner, FaEdit, FaTrash, FaPlus } from "react-icons/fa";
 import { motion } from "framer-motion";
 import Header from "./header";
 import Footer from "./footer";
 
 const Appointments = () => {
-  const [appointments, setAppointments] = useState([]);
+  const {
+    appointments, loading, loadingMore, error, setError, hasMore, loadMore, reload: fetchAppointments,
+  } = useAppointmentPages();
   const [form, setForm] = useState({
     patient_name: "",
     patient_email: "",
@@ -17,27 +21,6 @@ const Appointments = () => {
     time: "",
     status: "pending",
   });
-  const [loading, setLoading] = useState(true);
-  const [error, setError] = useState("");
-
-  const fetchAppointments = async () => {
-    try {
-      const token = localStorage.getItem("token");
-      const { data } = await axios.get("http://localhost:5000/api/appointments/", {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      setAppointments(data.appointments);
-    } catch (err) {
-      setError(err.response?.data?.error || "Failed to load appointments.");
-    } finally {
-      setLoading(false);
-    }
-  };
-
-  useEffect(() => {
-    fetchAppointments();
-  }, []);
-
   const handleInputChange = (e) =>
     setForm((prev) => ({ ...prev, [e.target.name]: e.target.value }));
 
@@ -263,6 +246,7 @@ const Appointments = () => {
             </div>
           </>
         )}
+        <LoadMoreButton hasMore={!loading && hasMore} loading={loadingMore} onClick={loadMore} />
       </main>
       <Footer />
     </div>
@@ -1,36 +1,18 @@
-import React, { useEffect, useState } from 'react';
+import React from 'react';
 import { motion } from "framer-motion";
 import { FaSpinner, FaEdit, FaTrash, FaNotesMedical, FaHistory } from "react-icons/fa";
 import Header from './header';
 import Footer from './footer';
 import axios from 'axios';
+import { useAppointmentPages } from './useAppointmentPages';
+import LoadMoreButton from './LoadMoreButton';
 
 const DoctorAppointmentList = () => {
-    const [appointments, setAppointments] = useState([]);
-    const [loading, setLoading] = useState(true);
-    const [error, setError] = useState("");
-
-    const fetchAppointments = async () => {
-        try {
-            const token = localStorage.getItem("token");
-            const response = await axios.get("http://localhost:5000/api/appointments/", {
-                headers: { Authorization: `Bearer ${token}` },
-            });
-
-            const filteredAppointments = response.data.appointments.filter(
-                appointment => appointment.doctor_email === localStorage.getItem("email")
-            );
-            setAppointments(filteredAppointments);
-        } catch (err) {
-            setError(err.response?.data?.error || "Failed to load appointments.");
-        } finally {
-            setLoading(false);
-        }
-    };
-
-    useEffect(() => {
-        fetchAppointments();
-    }, []);
+    const doctorEmail = localStorage.getItem("email");
+    const {
+        appointments: fetched, loading, loadingMore, error, setError, hasMore, loadMore, reload: fetchAppointments,
+    } = useAppointmentPages({ doctor_email: doctorEmail });
+    const appointments = fetched.filter(appointment => appointment.doctor_email === doctorEmail);
 
     const handleDelete = async (id) => {
         if (!window.confirm("Are you sure you want to delete this appointment?")) return;
@@ -164,6 +146,7 @@ const DoctorAppointmentList = () => {
                         )}
                     </motion.div>
                 )}
+                <LoadMoreButton hasMore={!loading && hasMore} loading={loadingMore} onClick={loadMore} />
             </main>
             <Footer />
         </div>
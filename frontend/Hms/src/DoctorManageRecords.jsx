@@ -1,40 +1,22 @@
-import React, { useEffect, useState } from "react";
+import React from "react";
 import { motion } from "framer-motion";
 import { FaSpinner, FaSearch, FaEye } from "react-icons/fa";
-import axios from "axios";
+import { useAppointmentPages } from "./useAppointmentPages";
+import LoadMoreButton from "./LoadMoreButton";
 import { useNavigate } from "react-router-dom";
 import Header from "./header";
 import Footer from "./footer";
 
 const DoctorManageRecords = () => {
-  const [appointments, setAppointments] = useState([]);
-  const [loading, setLoading] = useState(true);
-  const [error, setError] = useState(null);
   const navigate = useNavigate();
-
-  useEffect(() => {
-    const fetchAppointments = async () => {
-      try {
-        const token = localStorage.getItem("token");
-        const doctorEmail = localStorage.getItem("email");
-        const response = await axios.get("http://localhost:5000/api/appointments/", {
-          headers: { Authorization: `Bearer ${token}` },
-        });
-        const filtered = (response.data.appointments || []).filter(
-          a =>
-            (a.doctor_email === doctorEmail || a.doctorEmail === doctorEmail) &&
-            (a.status?.toLowerCase() === "visited" || a.status?.toLowerCase() === "completed")
-        );
-        setAppointments(filtered);
-      } catch (err) {
-        setError("Failed to fetch records: " + (err?.message || err));
-        console.error("Fetch appointments error:", err);
-      } finally {
-        setLoading(false);
-      }
-    };
-    fetchAppointments();
-  }, []);
+  const doctorEmail = localStorage.getItem("email");
+  const { appointments: fetched, loading, loadingMore, error, hasMore, loadMore } =
+    useAppointmentPages({ doctor_email: doctorEmail });
+  const appointments = fetched.filter(
+    a =>
+      (a.doctor_email === doctorEmail || a.doctorEmail === doctorEmail) &&
+      (a.status?.toLowerCase() === "visited" || a.status?.toLowerCase() === "completed")
+  );
 
   return (
     <div className="flex flex-col min-h-screen bg-[url('../image/bg-01.jpg')] bg-fixed bg-cover bg-center">
@@ -126,6 +108,7 @@ const DoctorManageRecords = () => {
             </table>
           </motion.div>
         )}
+        <LoadMoreButton hasMore={!loading && hasMore} loading={loadingMore} onClick={loadMore} />
       </main>
       <Footer />
     </div>
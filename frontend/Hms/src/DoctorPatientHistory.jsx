@@ -6,6 +6,10 @@ import Footer from './footer';
 import { useLocation } from 'react-router-dom';
 import axios from 'axios';
 
+// The chart endpoint returns the newest `limit` records of each section (at most 100)
+const CHART_PAGE_SIZE = 20;
+const MAX_CHART_LIMIT = 100;
+
 const DoctorPatientHistory = () => {
     const location = useLocation();
     const query = new URLSearchParams(location.search);
@@ -13,35 +17,40 @@ const DoctorPatientHistory = () => {
     const doctorEmail = localStorage.getItem('email');
     const [history, setHistory] = useState([]);
     const [reports, setReports] = useState([]);
+    const [limit, setLimit] = useState(CHART_PAGE_SIZE);
+    const [hasMore, setHasMore] = useState(false);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
     const [error, setError] = useState('');
 
     useEffect(() => {
         const fetchHistory = async () => {
             try {
                 const token = localStorage.getItem('token');
-                // Fetch prescriptions
-                const res = await axios.get(`http://localhost:5000/api/prescriptions?patient_email=${encodeURIComponent(patientEmail)}&doctor_email=${encodeURIComponent(doctorEmail)}`, {
-                    headers: { Authorization: `Bearer ${token}` }
-                });
-                setHistory(res.data.prescriptions || []);
-
-                // Fetch reports
-                const reportsRes = await axios.get(`http://localhost:5000/api/reports/${patientEmail}`, {
+                // Prescriptions and reports arrive together in the patient's chart
+                const res = await axios.get(`http://localhost:5000/api/patients/${encodeURIComponent(patientEmail)}/chart?doctor_email=${encodeURIComponent(doctorEmail)}&limit=${limit}`, {
                     headers: { Authorization: `Bearer ${token}` }
                 });
-                setReports(reportsRes.data.reports || []);
+                setHistory(res.data.prescriptions?.items || []);
+                setReports(res.data.reports?.items || []);
+                setHasMore(Boolean(res.data.prescriptions?.has_more || res.data.reports?.has_more));
             } catch (err) {
                 setError(err.response?.data?.error || 'Failed to fetch patient history');
             } finally {
                 setLoading(false);
+                setLoadingMore(false);
             }
         };
 
         if (patientEmail) {
             fetchHistory();
         }
-    }, [patientEmail, doctorEmail]);
+    }, [patientEmail, doctorEmail, limit]);
+
+    const loadMore = () => {
+        setLoadingMore(true);
+        setLimit((current) => Math.min(current + CHART_PAGE_SIZE, MAX_CHART_LIMIT));
+    };
 
     return (
         <div className="flex flex-col min-h-screen bg-[url('../image/bg-01.jpg')] bg-fixed bg-cover bg-center">
@@ -194,6 +203,22 @@ const DoctorPatientHistory = () => {
                                 </div>
                             </motion.div>
                         )}
+
+                        {hasMore && (
+                            <div className="text-center">
+                                {limit < MAX_CHART_LIMIT ? (
+                                    <button
+                                        onClick={loadMore}
+                                        disabled={loadingMore}
+                                        className="px-6 py-2 bg-blue-500 text-white rounded-lg hover:bg-blue-600 transition disabled:opacity-50"
+                                    >
+                                        {loadingMore ? <FaSpinner className="animate-spin inline" /> : 'Load older records'}
+                                    </button>
+                                ) : (
+                                    <p className="text-white">Showing the latest {MAX_CHART_LIMIT} prescriptions and reports.</p>
+                                )}
+                            </div>
+                        )}
                     </div>
                 )}
             </main>
@@ -1,35 +1,20 @@
-import React, { useEffect, useState } from "react";
+import React from "react";
 import { motion } from "framer-motion";
 import { FaSpinner, FaCalendarAlt } from "react-icons/fa";
-import axios from "axios";
+import { useAppointmentPages } from "./useAppointmentPages";
+import LoadMoreButton from "./LoadMoreButton";
 import Header from "./header";
 import Footer from "./footer";
 
 const DoctorSchedule = () => {
-  const [appointments, setAppointments] = useState([]);
-  const [loading, setLoading] = useState(true);
-  const [error, setError] = useState("");
-
-  useEffect(() => {
-    const fetchAppointments = async () => {
-      try {
-        const token = localStorage.getItem("token");
-        const doctorEmail = localStorage.getItem("email");
-        const { data } = await axios.get("http://localhost:5000/api/appointments/", {
-          headers: { Authorization: `Bearer ${token}` },
-        });
-        const scheduled = data.appointments.filter(
-          (a) => a.status?.toLowerCase() === "scheduled" && a.doctor_email === doctorEmail
-        );
-        setAppointments(scheduled);
-      } catch (err) {
-        setError(err.response?.data?.error || "Failed to load schedule.");
-      } finally {
-        setLoading(false);
-      }
-    };
-    fetchAppointments();
-  }, []);
+  const doctorEmail = localStorage.getItem("email");
+  // Upcoming appointments only, soonest first
+  const today = new Date().toISOString().split("T")[0];
+  const { appointments: fetched, loading, loadingMore, error, hasMore, loadMore } =
+    useAppointmentPages({ doctor_email: doctorEmail, from: today });
+  const appointments = fetched.filter(
+    (a) => a.status?.toLowerCase() === "scheduled" && a.doctor_email === doctorEmail
+  );
 
   return (
     <div className="flex flex-col min-h-screen bg-[url('../image/bg-01.jpg')] bg-fixed bg-cover bg-center">
@@ -98,6 +83,7 @@ const DoctorSchedule = () => {
             </table>
           </motion.div>
         )}
+        <LoadMoreButton hasMore={!loading && hasMore} loading={loadingMore} onClick={loadMore} />
       </main>
       <Footer />
     </div>
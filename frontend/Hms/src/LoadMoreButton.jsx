@@ -0,0 +1,18 @@
+import React from "react";
+import { FaSpinner } from "react-icons/fa";
+
+// Fetches the next page of a paginated list; hidden on the last page
+const LoadMoreButton = ({ hasMore, loading, onClick }) =>
+  hasMore ? (
+    <div className="text-center mt-6">
+      <button
+        onClick={onClick}
+        disabled={loading}
+        className="px-6 py-2 bg-blue-500 text-white rounded-lg hover:bg-blue-600 transition disabled:opacity-50"
+      >
+        {loading ? <FaSpinner className="animate-spin inline" /> : "Load more"}
+      </button>
+    </div>
+  ) : null;
+
+export default LoadMoreButton;
@@ -17,6 +17,8 @@ const PatientPayment = () => {
     });
     const [error, setError] = useState('');
     const [loading, setLoading] = useState(false);
+    // One key per payment: resubmitting after a timeout cannot charge twice
+    const [idempotencyKey] = useState(() => crypto.randomUUID());
 
     const handleInputChange = (e) => {
         const { name, value } = e.target;
@@ -68,7 +70,8 @@ const PatientPayment = () => {
                 { 
                     headers: { 
                         'Authorization': `Bearer ${token}`,
-                        'Content-Type': 'application/json'
+                        'Content-Type': 'application/json',
+                        'Idempotency-Key': idempotencyKey
                     } 
                 }
             );
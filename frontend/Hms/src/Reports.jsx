@@ -14,6 +14,8 @@ import { motion } from "framer-motion";
 import Header from "./header";
 import Footer from "./footer";
 
+const UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024;
+
 const Reports = () => {
   const [reports, setReports] = useState([]);
   const [statusFilter, setStatusFilter] = useState("");
@@ -134,36 +136,79 @@ const Reports = () => {
     setUploadForm(prev => ({ ...prev, [name]: value }));
   };
 
+  // PDF/JSON versions are rendered in the background; refresh once they exist
+  const waitForConversion = async (statusUrl, token) => {
+    for (let attempt = 0; attempt < 60; attempt++) {
+      await new Promise(resolve => setTimeout(resolve, 2000));
+      try {
+        const { data: job } = await axios.get(`http://localhost:5000${statusUrl}`, {
+          headers: { Authorization: `Bearer ${token}` }
+        });
+        if (job.status === "done" || job.status === "failed") {
+          fetchReports();
+          return;
+        }
+      } catch {
+        return;
+      }
+    }
+  };
+
+  // Sends the file in chunks; after a failed chunk it asks the server how
+  // much arrived and resends only the rest
+  const uploadInChunks = async (file, fields, token) => {
+    const headers = { Authorization: `Bearer ${token}` };
+    const { data: session } = await axios.post(
+      "http://localhost:5000/api/reports/uploads",
+      { ...fields, filename: file.name, size: file.size },
+      { headers }
+    );
+    const uploadUrl = `http://localhost:5000${session.upload_url}`;
+
+    let offset = session.offset;
+    let failures = 0;
+    while (offset < file.size) {
+      try {
+        const { data } = await axios.put(uploadUrl, file.slice(offset, offset + UPLOAD_CHUNK_SIZE), {
+          headers: {
+            ...headers,
+            "Content-Type": "application/octet-stream",
+            "Upload-Offset": String(offset)
+          }
+        });
+        offset = data.offset;
+        failures = 0;
+      } catch (err) {
+        if (++failures > 5) throw err;
+        await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+        const { data } = await axios.get(uploadUrl, { headers });
+        offset = data.offset;
+      }
+    }
+
+    const { data: upload } = await axios.post(`${uploadUrl}/complete`, {}, { headers });
+    return upload;
+  };
+
   const handleUpload = async e => {
     e.preventDefault();
     try {
       const token = checkAuth();
       if (!token) return;
 
-      const formData = new FormData();
       if (!uploadForm.file) {
         throw new Error("Please select a file to upload");
       }
 
-      formData.append("file", uploadForm.file);
-      formData.append("patient_name", uploadForm.patient_name);
-      formData.append("service", uploadForm.service);
-      formData.append("amount", uploadForm.amount);
-      formData.append("report_date", uploadForm.report_date);
-      formData.append("report_time", uploadForm.report_time);
-      formData.append("patient_email", uploadForm.patient_email || "");
-      formData.append("doctor_email", localStorage.getItem("email") || "");
-
-      await axios.post(
-        "http://localhost:5000/api/reports/upload",
-        formData,
-        {
-          headers: {
-            Authorization: `Bearer ${token}`,
-            "Content-Type": "multipart/form-data"
-          }
-        }
-      );
+      const upload = await uploadInChunks(uploadForm.file, {
+        patient_name: uploadForm.patient_name,
+        service: uploadForm.service,
+        amount: uploadForm.amount,
+        report_date: uploadForm.report_date,
+        report_time: uploadForm.report_time,
+        patient_email: uploadForm.patient_email || "",
+        doctor_email: localStorage.getItem("email") || ""
+      }, token);
 
       setUploadForm({
         file: null,
@@ -177,6 +222,7 @@ const Reports = () => {
       setShowUploadForm(false);
       fetchReports();
       setError(null);
+      waitForConversion(upload.status_url, token);
     } catch (err) {
       const errorMessage = err.response?.data?.error || err.response?.data?.details || err.message;
       setError(errorMessage);
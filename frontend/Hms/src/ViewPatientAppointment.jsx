@@ -1,36 +1,19 @@
-import React, { useEffect, useState } from 'react';
+import React from 'react';
 import { motion } from "framer-motion";
 import { FaSpinner, FaEdit, FaTrash } from "react-icons/fa";
 import Header from './header';
 import Footer from './footer';
 import axios from 'axios';
+import { useAppointmentPages } from './useAppointmentPages';
+import LoadMoreButton from './LoadMoreButton';
 
 const ViewPatientAppointment = () => {
-    const [appointments, setAppointments] = useState([]);
-    const [loading, setLoading] = useState(true);
-    const [error, setError] = useState("");
-
-    // Fetch appointments from the backend
-    const fetchAppointments = async () => {
-        try {
-            const token = localStorage.getItem("token");
-            const response = await axios.get("http://localhost:5000/api/appointments/", {
-                headers: { Authorization: `Bearer ${token}` },
-            });
-
-            const filteredAppointments = response.data.appointments.filter(appointment => appointment.patient_email === localStorage.getItem("email"));
-            setAppointments(filteredAppointments);
-
-        } catch (err) {
-            setError(err.response?.data?.error || "Failed to load appointments.");
-        } finally {
-            setLoading(false);
-        }
-    };
-
-    useEffect(() => {
-        fetchAppointments();
-    }, []);
+    // Fetch appointments from the backend, a page at a time
+    const patientEmail = localStorage.getItem("email");
+    const {
+        appointments: fetched, loading, loadingMore, error, setError, hasMore, loadMore, reload: fetchAppointments,
+    } = useAppointmentPages({ patient_email: patientEmail });
+    const appointments = fetched.filter(appointment => appointment.patient_email === patientEmail);
 
     // Delete an appointment (DELETE)
     const handleDelete = async (id) => {
@@ -142,6 +125,7 @@ const ViewPatientAppointment = () => {
                         )}
                     </div>
                 )}
+                <LoadMoreButton hasMore={!loading && hasMore} loading={loadingMore} onClick={loadMore} />
             </main>
             <Footer />
         </div>
@@ -0,0 +1,68 @@
+// useAppointmentPages.js
+import { useCallback, useEffect, useState } from "react";
+import axios from "axios";
+
+const PAGE_SIZE = 50;
+
+const fetchAppointmentPage = async (params, cursor) => {
+  const token = localStorage.getItem("token");
+  const { data } = await axios.get("http://localhost:5000/api/appointments/", {
+    headers: { Authorization: `Bearer ${token}` },
+    params: { ...params, limit: PAGE_SIZE, ...(cursor ? { cursor } : {}) },
+  });
+  return data;
+};
+
+// GET /api/appointments returns one page at a time, oldest first. Views show
+// the first page and fetch the next one (through next_cursor) only when the
+// user asks for it, so no view ever downloads a whole history up front.
+export const useAppointmentPages = (params = {}) => {
+  const key = JSON.stringify(params);
+  const [appointments, setAppointments] = useState([]);
+  const [cursor, setCursor] = useState(null);
+  const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [error, setError] = useState("");
+
+  const reload = useCallback(async () => {
+    try {
+      const data = await fetchAppointmentPage(JSON.parse(key), null);
+      setAppointments(data.appointments || []);
+      setCursor(data.next_cursor);
+      setError("");
+    } catch (err) {
+      setError(err.response?.data?.error || "Failed to load appointments.");
+    } finally {
+      setLoading(false);
+    }
+  }, [key]);
+
+  const loadMore = async () => {
+    if (!cursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const data = await fetchAppointmentPage(JSON.parse(key), cursor);
+      setAppointments((current) => [...current, ...(data.appointments || [])]);
+      setCursor(data.next_cursor);
+    } catch (err) {
+      setError(err.response?.data?.error || "Failed to load appointments.");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  useEffect(() => {
+    reload();
+  }, [reload]);
+
+  return {
+    appointments,
+    loading,
+    loadingMore,
+    error,
+    setError,
+    hasMore: Boolean(cursor),
+    loadMore,
+    reload,
+  };
+};
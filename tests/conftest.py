@@ -0,0 +1,101 @@
+import os
+from uuid import uuid4
+
+import pytest
+
+TEST_MONGO_URI = os.getenv("TEST_MONGO_URI", "mongodb://localhost:27017")
+
+# Set before app modules load .env (which never overrides), so the shared
+# connection can only ever reach the test server
+os.environ["MONGO_URI"] = TEST_MONGO_URI
+os.environ.setdefault("SECRET_KEY", "test-secret-key-for-the-test-suite-only")
+
+
+def connect():
+    """
+    A client for the test server (TEST_MONGO_URI); skips the test when none
+    is reachable
+    """
+    pymongo = pytest.importorskip("pymongo")
+    from pymongo.errors import PyMongoError
+
+    client = pymongo.MongoClient(
+        TEST_MONGO_URI,
+        serverSelectionTimeoutMS=500
+    )
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip("MongoDB is not reachable, set TEST_MONGO_URI")
+    return client
+
+
+@pytest.fixture
+def db():
+    """
+    A throwaway database on a real server
+    """
+    client = connect()
+    db = client[f"HMS_Test_{uuid4().hex[:12]}"]
+    yield db
+    client.drop_database(db.name)
+    client.close()
+
+
+@pytest.fixture(scope="session")
+def api_db():
+    """
+    The database behind the controllers for the whole session. They bind
+    their collections when first imported, so the shared connection is
+    pointed at a throwaway database before any of them is.
+    """
+    from app.services.db_connection import DatabaseConnection
+    from app.services.db_indexes import ensure_indexes
+
+    client = connect()
+    db = client[f"HMS_Test_{uuid4().hex[:12]}"]
+    DatabaseConnection().db = db
+    ensure_indexes(db)
+    yield db
+    client.drop_database(db.name)
+    client.close()
+
+
+@pytest.fixture(scope="session")
+def api_app(api_db):
+    from flask import Flask
+    from app.controllers.appointment_controller import appointment_bp
+    from app.controllers.auth_controller import auth_bp
+    from app.controllers.billing_controller import billing_bp
+    from app.controllers.patient_controller import patient_bp
+    from app.controllers.reports_controller import reports_bp
+
+    app = Flask(__name__)
+    app.register_blueprint(appointment_bp, url_prefix="/api/appointments")
+    app.register_blueprint(auth_bp, url_prefix="/api/auth")
+    app.register_blueprint(billing_bp, url_prefix="/api/billing")
+    app.register_blueprint(reports_bp, url_prefix="/api/reports")
+    app.register_blueprint(patient_bp, url_prefix="/api/patients")
+    return app
+
+
+@pytest.fixture
+def api(api_app, api_db):
+    """
+    A test client over empty collections
+    """
+    for name in api_db.list_collection_names():
+        api_db[name].delete_many({})
+    return api_app.test_client()
+
+
+@pytest.fixture
+def auth():
+    """
+    auth(email, role) gives the Authorization header of a fresh token
+    """
+    from app.utils.jwt_auth import generate_jwt
+
+    def headers(email="doctor@example.com", role="doctor"):
+        return {"Authorization": f"Bearer {generate_jwt({'email': email, 'role': role, 'name': email})}"}
+    return headers
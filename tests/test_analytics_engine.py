@@ -0,0 +1,91 @@
+from functools import partial
+
+import pytest
+
+from app.services.analytics_engine import AnalyticsEngine, load_appointment_columns, load_billing_columns
+
+
+@pytest.fixture
+def engine(db):
+    db["Billing"].insert_many([
+        {"doctor_email": "house@example.com", "payment_date": "2025-05-05", "amount": 100.0, "amount_cents": 10000},
+        {"doctor_email": "house@example.com", "payment_date": "2025-05-06", "amount": "50.25"},   # not normalized yet
+        {"doctor_email": "house@example.com", "payment_date": "n/a", "amount": 5.0, "amount_cents": 500},
+        {"doctor_email": "wilson@example.com", "payment_date": "2025-05-11", "amount": 200.0, "amount_cents": 20000},
+        {"doctor_email": "wilson@example.com", "payment_date": "2025-05-12", "amount": 10.0, "amount_cents": 1000},
+    ])
+    db["Appointments"].insert_many([
+        {"doctor_email": "house@example.com", "date": "2025-05-05", "status": status}
+        for status in ("Visited", "No-Show", "Completed", "Scheduled")
+    ] + [
+        {"doctor_email": "wilson@example.com", "date": "2025-05-06", "status": status}
+        for status in ("no-show", "Cancelled", " visited ")
+    ])
+    return AnalyticsEngine(
+        partial(load_billing_columns, db["Billing"], batch_size=2),
+        partial(load_appointment_columns, db["Appointments"], batch_size=2),
+        cache_ttl=60
+    )
+
+
+def test_revenue_per_doctor_day_and_week(engine):
+    assert engine.revenue("doctor") == [
+        {"doctor_email": "wilson@example.com", "total": 210.0, "payments": 2},
+        {"doctor_email": "house@example.com", "total": 155.25, "payments": 3},
+    ]
+    # The undated payment has no day to go in
+    assert engine.revenue("day") == [
+        {"date": "2025-05-05", "total": 100.0, "payments": 1},
+        {"date": "2025-05-06", "total": 50.25, "payments": 1},
+        {"date": "2025-05-11", "total": 200.0, "payments": 1},
+        {"date": "2025-05-12", "total": 10.0, "payments": 1},
+    ]
+    # Weeks start on Monday: the 11th is a Sunday, the 12th a Monday
+    assert engine.revenue("week") == [
+        {"week_start": "2025-05-05", "total": 350.25, "payments": 3},
+        {"week_start": "2025-05-12", "total": 10.0, "payments": 1},
+    ]
+    assert engine.revenue("doctor", start="2025-05-06", end="2025-05-11") == [
+        {"doctor_email": "wilson@example.com", "total": 200.0, "payments": 1},
+        {"doctor_email": "house@example.com", "total": 50.25, "payments": 1},
+    ]
+    assert engine.revenue("day", doctor_email="nobody@example.com") == []
+    with pytest.raises(ValueError):
+        engine.revenue("month")
+
+
+def test_appointment_volumes_and_no_show_rates(engine):
+    assert engine.appointment_volumes() == {
+        "visited": 2, "no-show": 2, "completed": 1, "scheduled": 1, "cancelled": 1
+    }
+    assert engine.appointment_volumes(doctor_email="wilson@example.com") == {
+        "no-show": 1, "cancelled": 1, "visited": 1
+    }
+
+    rates = engine.no_show_rates()
+    # Only appointments with an outcome count: scheduled and cancelled do not
+    assert (rates["no_shows"], rates["appointments"], rates["rate"]) == (2, 5, 0.4)
+    assert rates["doctors"] == [
+        {"doctor_email": "house@example.com", "no_shows": 1, "appointments": 3, "rate": pytest.approx(1 / 3)},
+        {"doctor_email": "wilson@example.com", "no_shows": 1, "appointments": 2, "rate": 0.5},
+    ]
+    assert engine.no_show_rates(start="2025-05-06")["rate"] == 0.5
+
+
+def test_payment_percentiles(engine):
+    # Amounts 5, 10, 50.25, 100, 200 with linear interpolation
+    assert engine.payment_percentiles((0, 50, 75, 100)) == {
+        "count": 5,
+        "mean": 73.05,
+        "percentiles": {"p0": 5.0, "p50": 50.25, "p75": 100.0, "p100": 200.0}
+    }
+    assert engine.payment_percentiles(start="2030-01-01") == {"count": 0, "percentiles": {}}
+
+
+def test_results_are_cached_until_invalidated(engine, db):
+    before = engine.revenue("doctor")
+    db["Billing"].insert_one({"doctor_email": "cuddy@example.com", "payment_date": "2025-05-07", "amount_cents": 700})
+
+    assert engine.revenue("doctor") == before
+    engine.invalidate()
+    assert engine.revenue("doctor")[-1] == {"doctor_email": "cuddy@example.com", "total": 7.0, "payments": 1}
@@ -0,0 +1,97 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+import pytest
+
+pymongo = pytest.importorskip("pymongo")
+
+from pymongo.errors import PyMongoError
+from app.services.db_indexes import ensure_indexes
+from app.services.slot_reservation import SlotReservationService, SlotAlreadyBookedError
+
+
+@pytest.fixture
+def appointments_collection():
+    # Runs against a real server: the guarantee under test is the database's unique index
+    client = pymongo.MongoClient(
+        os.getenv("TEST_MONGO_URI", "mongodb://localhost:27017"),
+        serverSelectionTimeoutMS=500
+    )
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip("MongoDB is not reachable, set TEST_MONGO_URI")
+
+    db = client[f"HMS_Test_{uuid4().hex[:12]}"]
+    ensure_indexes(db)
+    yield db["Appointments"]
+    client.drop_database(db.name)
+    client.close()
+
+
+def make_booking(patient_number):
+    return {
+        "patient_email": f"patient{patient_number}@example.com",
+        "doctor_email": "doctor@example.com",
+        "date": "2025-05-01",
+        "time": "10:00",
+        "status": "Scheduled"
+    }
+
+
+def test_parallel_bookings_for_one_slot_only_one_succeeds(appointments_collection):
+    service = SlotReservationService(appointments_collection)
+
+    def attempt(i):
+        try:
+            service.reserve(make_booking(i))
+            return True
+        except SlotAlreadyBookedError:
+            return False
+
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        outcomes = list(pool.map(attempt, range(64)))
+
+    assert outcomes.count(True) == 1
+    assert appointments_collection.count_documents({}) == 1
+
+
+def test_cancelling_frees_the_slot(appointments_collection):
+    service = SlotReservationService(appointments_collection)
+    first = service.reserve(make_booking(1))
+
+    with pytest.raises(SlotAlreadyBookedError):
+        service.reserve(make_booking(2))
+
+    service.change_status(first["_id"], "Cancelled")
+    second = service.reserve(make_booking(2))
+
+    # The original booking cannot be revived while the slot is taken again
+    with pytest.raises(SlotAlreadyBookedError):
+        service.change_status(first["_id"], "Scheduled")
+    assert appointments_collection.find_one({"_id": second["_id"]})["slot_active"] is True
+
+
+def test_backfill_reports_double_bookings_before_the_index_is_built(db):
+    appointments = db["Appointments"]
+    # Booked before slot reservation existed: the first slot twice
+    oldest, double, other = (appointments.insert_one(make_booking(i)).inserted_id for i in range(3))
+    appointments.update_one({"_id": other}, {"$set": {"time": "11:00"}})
+    appointments.insert_one({**make_booking(3), "status": "Cancelled"})
+
+    ensure_indexes(db)
+    assert "active_slot_unique" not in appointments.index_information()
+
+    service = SlotReservationService(appointments)
+    assert service.needs_backfill()
+    assert service.backfill() == (2, [double])
+    assert appointments.find_one({"_id": oldest})["slot_active"] is True
+    assert "slot_active" not in appointments.find_one({"_id": double})
+    assert not service.needs_backfill()
+    assert service.backfill() == (0, [])
+
+    ensure_indexes(db)
+    assert "active_slot_unique" in appointments.index_information()
+    with pytest.raises(SlotAlreadyBookedError):
+        service.reserve(make_booking(4))
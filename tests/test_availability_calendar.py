@@ -0,0 +1,56 @@
+from datetime import date
+
+from app.services.availability_calendar import AvailabilityCalendar
+
+DOCTOR = "doctor@example.com"
+DAY = "2025-05-01"
+
+
+def day_of(calendar):
+    return calendar.availability(DOCTOR, date(2025, 5, 1), date(2025, 5, 1))[0]
+
+
+def test_booking_and_release_count_slot_bookings(db):
+    calendar = AvailabilityCalendar(
+        db["DoctorCalendar"], db["Appointments"], slot_minutes=30,
+        open_time="09:00", close_time="11:00", cache_ttl=0
+    )
+    assert day_of(calendar)["free"] == ["09:00", "09:30", "10:00", "10:30"]
+
+    # Two appointments in the 09:00 slot and one at 10:30
+    for time in ("09:00", "09:15", "10:30"):
+        calendar.book(DOCTOR, DAY, time)
+    assert day_of(calendar) == {"date": DAY, "free": ["09:30", "10:00"], "booked": ["09:00", "10:30"]}
+
+    # The 09:00 slot stays booked while one of its appointments is active
+    calendar.release(DOCTOR, DAY, "09:00")
+    assert day_of(calendar)["booked"] == ["09:00", "10:30"]
+
+    calendar.release(DOCTOR, DAY, "09:15")
+    assert day_of(calendar)["booked"] == ["10:30"]
+
+    # A stray release cannot take the count below zero and hide the next booking
+    calendar.release(DOCTOR, DAY, "09:00")
+    calendar.book_many([(DOCTOR, DAY, "09:00")])
+    assert day_of(calendar)["booked"] == ["09:00", "10:30"]
+
+
+def test_rebuild_matches_incremental_updates(db):
+    appointments = db["Appointments"]
+    calendar = AvailabilityCalendar(db["DoctorCalendar"], appointments, slot_minutes=30, cache_ttl=0)
+    appointments.insert_many([
+        {"doctor_email": DOCTOR, "date": DAY, "time": "09:00 AM", "slot_active": True},
+        {"doctor_email": DOCTOR, "date": DAY, "time": "09:15", "slot_active": True},
+        {"doctor_email": DOCTOR, "date": DAY, "time": "14:30", "slot_active": True},
+        {"doctor_email": DOCTOR, "date": DAY, "time": "15:00", "slot_active": False},
+    ])
+    # Drifted counts, and a day whose bookings are all gone
+    calendar.book(DOCTOR, DAY, "15:00")
+    calendar.book(DOCTOR, "2025-05-02", "10:00")
+
+    assert calendar.rebuild() == 1
+    assert day_of(calendar)["booked"] == ["09:00", "14:30"]
+    assert db["DoctorCalendar"].count_documents({}) == 1
+
+    calendar.release(DOCTOR, DAY, "09:00")
+    assert day_of(calendar)["booked"] == ["09:00", "14:30"]
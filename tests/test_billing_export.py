@@ -0,0 +1,79 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+
+def payment(transaction_id, doctor, paid_at, cents=150000):
+    return {
+        "transaction_id": transaction_id,
+        "patient_email": "alice@example.com",
+        "patient_name": "Alice",
+        "doctor_email": f"{doctor}@example.com",
+        "doctor_name": doctor,
+        "amount": cents / 100,
+        "amount_cents": cents,
+        "paid_at": paid_at,
+        "payment_status": "Paid",
+        "internal_note": "not exported",
+    }
+
+
+def seed(api_db):
+    api_db["Billing"].insert_many([
+        payment("TX-1", "house", datetime(2025, 4, 30, 23, 59)),
+        payment("TX-2", "house", datetime(2025, 5, 1, 9, 0)),
+        payment("TX-3", "wilson", datetime(2025, 5, 2, 10, 30)),
+        payment("TX-4", "house", datetime(2025, 5, 3, 0, 0)),
+    ])
+
+
+def test_ndjson_export_streams_one_record_per_line(api, api_db, auth):
+    seed(api_db)
+
+    response = api.get("/api/billing/export?from=2025-05-01&to=2025-05-02", headers=auth())
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert response.is_streamed
+    assert "attachment; filename=billing_export_" in response.headers["Content-Disposition"]
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert sorted(r["transaction_id"] for r in records) == ["TX-2", "TX-3"]
+    record = next(r for r in records if r["transaction_id"] == "TX-2")
+    assert record["paid_at"] == "2025-05-01T09:00:00"
+    assert record["amount_cents"] == 150000
+    assert "internal_note" not in record
+
+
+def test_csv_export_has_a_header_and_filters_by_doctor(api, api_db, auth):
+    seed(api_db)
+
+    response = api.get("/api/billing/export?format=csv&doctor_email=house@example.com", headers=auth())
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/csv"
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert sorted(row["transaction_id"] for row in rows) == ["TX-1", "TX-2", "TX-4"]
+    assert rows[0]["amount_cents"] == "150000"
+    # Same datetime format as the NDJSON export
+    assert next(row for row in rows if row["transaction_id"] == "TX-2")["paid_at"] == "2025-05-01T09:00:00"
+    assert "internal_note" not in rows[0]
+
+
+def test_gzip_export_is_a_gzip_stream(api, api_db, auth):
+    seed(api_db)
+
+    response = api.get("/api/billing/export?gzip=1", headers=auth())
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/gzip"
+    assert response.headers["Content-Disposition"].endswith(".ndjson.gz")
+    lines = gzip.decompress(response.get_data()).decode("utf-8").splitlines()
+    assert len(lines) == 4
+
+
+def test_export_rejects_bad_parameters(api, auth):
+    assert api.get("/api/billing/export?format=xml", headers=auth()).status_code == 400
+    assert api.get("/api/billing/export?from=05/01/2025", headers=auth()).status_code == 400
+    assert api.get("/api/billing/export").status_code == 401
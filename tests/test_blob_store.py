@@ -0,0 +1,55 @@
+import hashlib
+import io
+import os
+from uuid import uuid4
+
+import pytest
+
+pymongo = pytest.importorskip("pymongo")
+
+from pymongo.errors import PyMongoError
+from app.services.blob_store import BlobStore
+
+
+@pytest.fixture
+def blob_store(tmp_path):
+    client = pymongo.MongoClient(
+        os.getenv("TEST_MONGO_URI", "mongodb://localhost:27017"),
+        serverSelectionTimeoutMS=500
+    )
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip("MongoDB is not reachable, set TEST_MONGO_URI")
+
+    db = client[f"HMS_Test_{uuid4().hex[:12]}"]
+    yield BlobStore(str(tmp_path / "blobs"), db["Blobs"])
+    client.drop_database(db.name)
+    client.close()
+
+
+def test_identical_uploads_share_one_file(blob_store):
+    first, size = blob_store.put_stream(io.BytesIO(b"lab result"))
+    second, _ = blob_store.put_stream(io.BytesIO(b"lab result"))
+
+    assert first == second == hashlib.sha256(b"lab result").hexdigest()
+    assert size == len(b"lab result")
+    assert blob_store.collection.find_one({"_id": first})["refcount"] == 2
+    assert os.listdir(blob_store.tmp_directory) == []
+
+
+def test_blob_is_deleted_with_its_last_reference(blob_store):
+    digest, _ = blob_store.put_stream(io.BytesIO(b"scan"))
+    blob_store.put_stream(io.BytesIO(b"scan"))
+
+    assert blob_store.release(digest) == 0
+    assert os.path.exists(blob_store.path(digest))
+    assert blob_store.release(digest) == len(b"scan")
+    assert not os.path.exists(blob_store.path(digest))
+    assert blob_store.collection.find_one({"_id": digest}) is None
+
+
+def test_blob_names():
+    digest = hashlib.sha256(b"x").hexdigest()
+    assert BlobStore.digest_of(BlobStore.name(digest, "PDF")) == digest
+    assert BlobStore.digest_of("scan.pdf") is None
@@ -0,0 +1,84 @@
+from pymongo.errors import PyMongoError
+
+from app.controllers import appointment_controller
+
+
+def appointment(patient, time, payment_id, day="2025-05-01"):
+    return {
+        "patient_email": f"{patient}@example.com",
+        "patient_name": patient,
+        "doctor_email": "doctor@example.com",
+        "doctor_name": "Doctor",
+        "date": day,
+        "time": time,
+        "status": "Scheduled",
+        "payment_id": payment_id
+    }
+
+
+def test_bulk_booking_checks_payments_and_clashes_per_row(api, api_db, auth):
+    api_db["Billing"].insert_many([
+        {"transaction_id": "TX-A", "patient_email": "alice@example.com"},
+        {"transaction_id": "TX-B", "patient_email": "bob@example.com"},
+    ])
+    api_db["Appointments"].insert_one({
+        **appointment("carol", "11:00", "TX-C"), "slot_active": True
+    })
+
+    response = api.post("/api/appointments/bulk", headers=auth(), json={"appointments": [
+        appointment("alice", "09:00", "TX-A"),
+        appointment("alice", "09:00", "TX-A"),             # same slot as row 0
+        appointment("alice", "10:00", "TX-B"),             # someone else's payment
+        appointment("alice", "10:30", "TX-UNKNOWN"),
+        appointment("bob", "11:00", "TX-B"),               # already booked in the database
+        appointment("bob", "12:00", "TX-B"),
+        {"patient_email": "bob@example.com"},
+    ]})
+
+    assert response.status_code == 201
+    results = response.get_json()["results"]
+    assert [r["success"] for r in results] == [True, False, False, False, False, True, False]
+    assert results[1]["error"] == "This time slot is booked twice in the batch"
+    assert results[2]["error"] == "Payment reference does not match patient"
+    assert results[3]["error"] == "Invalid payment reference"
+    assert results[4]["error"] == "This time slot is already booked"
+    assert results[6]["error"].startswith("Missing required appointment fields")
+    assert api_db["Appointments"].count_documents({"slot_active": True}) == 3
+
+
+def test_bulk_booking_with_no_valid_rows_is_rejected(api, auth):
+    response = api.post("/api/appointments/bulk", headers=auth(), json={"appointments": [
+        appointment("alice", "09:00", "TX-NONE")
+    ]})
+
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
+
+
+def test_unparseable_date_or_time_is_rejected(api, api_db, auth):
+    api_db["Billing"].insert_one({"transaction_id": "TX-A", "patient_email": "alice@example.com"})
+
+    response = api.post("/api/appointments/", headers=auth(), json=appointment("alice", "9 o'clock", "TX-A"))
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Invalid date or time. Use YYYY-MM-DD and HH:MM."
+
+    response = api.post("/api/appointments/bulk", headers=auth(), json={"appointments": [
+        appointment("alice", "09:00", "TX-A", day="01/05/2025"),
+        appointment("alice", "10:00", "TX-A"),
+    ]})
+    results = response.get_json()["results"]
+    assert [r["success"] for r in results] == [False, True]
+    assert results[0]["error"] == "Invalid date or time. Use YYYY-MM-DD and HH:MM."
+    assert api_db["Appointments"].count_documents({"scheduled_at": None}) == 0
+
+
+def test_booking_survives_a_failed_calendar_update(api, api_db, auth, monkeypatch):
+    def unavailable(*args):
+        raise PyMongoError("calendar unavailable")
+    monkeypatch.setattr(appointment_controller.availability_calendar, "book", unavailable)
+    api_db["Billing"].insert_one({"transaction_id": "TX-A", "patient_email": "alice@example.com"})
+
+    response = api.post("/api/appointments/", headers=auth(), json=appointment("alice", "09:00", "TX-A"))
+
+    assert response.status_code == 201
+    assert api_db["Appointments"].count_documents({"slot_active": True}) == 1
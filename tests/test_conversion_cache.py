@@ -0,0 +1,44 @@
+import os
+
+from app.services.conversion_cache import ConversionCache
+
+
+def writer(size):
+    def render(path):
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+    return render
+
+
+def test_hits_skip_rendering(tmp_path):
+    cache = ConversionCache(str(tmp_path), max_bytes=1000)
+    key = ConversionCache.key("r1", "hash", "pdf")
+    first = cache.get_or_create(key, "pdf", writer(10))
+
+    def fail(path):
+        raise AssertionError("rendered twice")
+
+    assert cache.get_or_create(key, "pdf", fail) == first
+    assert cache.stats()["hits"] == 1
+
+
+def test_least_recently_used_is_evicted_over_budget(tmp_path):
+    cache = ConversionCache(str(tmp_path), max_bytes=250)
+    keys = [ConversionCache.key(f"r{i}", "hash", "pdf") for i in range(3)]
+    paths = [cache.get_or_create(key, "pdf", writer(100)) for key in keys[:2]]
+    cache.get(keys[0], "pdf")  # r0 is now more recent than r1
+    cache.get_or_create(keys[2], "pdf", writer(100))
+
+    assert os.path.exists(paths[0])
+    assert not os.path.exists(paths[1])
+    assert cache.stats()["bytes"] == 200
+
+
+def test_recency_survives_restart(tmp_path):
+    cache = ConversionCache(str(tmp_path), max_bytes=10_000)
+    key = ConversionCache.key("r1", "hash", "text")
+    cache.get_or_create(key, "text", writer(100))
+
+    reopened = ConversionCache(str(tmp_path), max_bytes=10_000)
+    assert reopened.get(key, "text") is not None
+    assert reopened.stats()["bytes"] == 100
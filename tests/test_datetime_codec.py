@@ -0,0 +1,61 @@
+from datetime import datetime
+
+from app.migrations.native_datetimes import migrate_appointments
+from app.models.datetime_codec import (
+    APPOINTMENT_CODEC, PRESCRIPTION_CODEC, combine, day_range, parse_timestamp
+)
+
+
+def test_combine_accepts_every_appointment_time_format():
+    expected = datetime(2025, 3, 14, 14, 30)
+    assert combine("2025-03-14", "14:30") == expected
+    assert combine("2025-03-14", "14:30:00") == expected
+    assert combine("2025-03-14", "02:30 PM") == expected
+    assert combine("2025-03-14", "later") is None
+    assert combine(None, "14:30") is None
+
+
+def test_parse_timestamp():
+    assert parse_timestamp("2025-03-14 09:15:00") == datetime(2025, 3, 14, 9, 15)
+    assert parse_timestamp("2025-03-14T09:15:00") == datetime(2025, 3, 14, 9, 15)
+    assert parse_timestamp("2025-03-14T09:15:00Z").tzinfo is None
+    assert parse_timestamp("") is None
+    assert parse_timestamp("yesterday") is None
+
+
+def test_day_range_is_half_open():
+    assert day_range("2025-03-01", "2025-03-31") == {
+        "$gte": datetime(2025, 3, 1),
+        "$lt": datetime(2025, 4, 1)
+    }
+    assert day_range(None, None) == {}
+
+
+def test_wire_format_is_unchanged():
+    appointment = APPOINTMENT_CODEC.to_wire({
+        "date": "2025-03-14",
+        "scheduled_at": datetime(2025, 3, 14, 14, 30),
+        "created_at": datetime(2025, 3, 1, 8, 0, 5)
+    })
+    assert appointment["created_at"] == "2025-03-01 08:00:05"
+    assert appointment["scheduled_at"] == "2025-03-14 14:30:00"
+
+    prescription = PRESCRIPTION_CODEC.to_wire({"created_at": datetime(2025, 3, 1, 8, 0, 5)})
+    assert prescription == {"createdAt": "2025-03-01T08:00:05"}
+
+
+def test_migration_leaves_unparseable_appointments_without_scheduled_at(db):
+    collection = db["Appointments"]
+    collection.insert_many([
+        {"date": "2025-05-01", "time": "09:30 AM", "created_at": "2025-04-01 08:00:00"},
+        {"date": "someday", "time": "09:30", "created_at": "2025-04-01 08:00:00"},
+        {"date": "someday", "time": "09:30"},
+    ])
+
+    assert migrate_appointments(collection) == (2, 1)
+    good, bad, untouched = collection.find().sort("_id", 1)
+    assert good["scheduled_at"] == datetime(2025, 5, 1, 9, 30)
+    assert "scheduled_at" not in bad and bad["created_at"] == datetime(2025, 4, 1, 8, 0)
+    assert "scheduled_at" not in untouched
+    # Nothing left to do but the two it cannot parse
+    assert migrate_appointments(collection) == (0, 2)
@@ -0,0 +1,86 @@
+import threading
+
+import pytest
+
+from app.services.observer.event_bus import EventBus
+
+
+class Recorder:
+    def __init__(self, gate=None):
+        self.events = []
+        self.batches = []
+        self.threads = []
+        self.gate = gate
+        self.started = threading.Event()
+
+    def update(self, *args):
+        # Only the first delivery waits for the gate
+        if not self.started.is_set():
+            self.started.set()
+            if self.gate is not None:
+                self.gate.wait(5)
+        self.events.append(args)
+        self.threads.append(threading.current_thread().name)
+
+
+class BatchRecorder(Recorder):
+    def update_batch(self, batch):
+        self.batches.append(len(batch))
+        self.events.extend(batch)
+
+
+def test_each_observer_sees_its_events_in_order():
+    bus = EventBus(workers=4, batch_size=7)
+    observers = [Recorder() for _ in range(6)]
+    for i in range(300):
+        bus.publish(observers, "updated", i)
+    bus.shutdown()
+
+    for observer in observers:
+        assert [args[1] for args in observer.events] == list(range(300))
+
+
+def test_pending_events_are_delivered_as_one_batch():
+    gate = threading.Event()
+    bus = EventBus(workers=1, batch_size=50)
+    observer = BatchRecorder(gate)
+    bus.publish([observer], "created", 0)
+    assert observer.started.wait(5)
+    for i in range(1, 11):
+        bus.publish([observer], "created", i)
+    gate.set()
+    bus.shutdown()
+
+    assert observer.batches == [10]
+    assert [args[1] for args in observer.events] == list(range(11))
+    assert bus.stats()["observers"]["BatchRecorder"]["events"] == 11
+
+
+def test_full_queue_delivers_on_the_publishing_thread():
+    gate = threading.Event()
+    bus = EventBus(max_queue_size=1, workers=1, put_timeout=0.01)
+    observer = Recorder(gate)
+    bus.publish([observer], "created", 0)   # taken by the worker, which waits on the gate
+    assert observer.started.wait(5)
+    bus.publish([observer], "created", 1)   # fills the queue
+
+    bus.publish([observer], "created", 2)   # no room: delivered inline
+    gate.set()
+    bus.shutdown()
+
+    assert bus.stats()["inline_deliveries"] == 1
+    assert sorted(args[1] for args in observer.events) == [0, 1, 2]
+    assert observer.threads[observer.events.index(("created", 2))] == threading.current_thread().name
+
+
+def test_synchronous_observers_raise_to_the_publisher():
+    class FailingNotifier:
+        synchronous = True
+
+        def update(self, *args):
+            raise RuntimeError("mailer down")
+
+    bus = EventBus(workers=1)
+    with pytest.raises(RuntimeError, match="mailer down"):
+        bus.publish([FailingNotifier()], "OTP_GENERATED", "user@example.com", {"otp": "123456"})
+    assert bus.stats()["observers"]["FailingNotifier"]["errors"] == 1
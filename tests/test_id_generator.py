@@ -0,0 +1,73 @@
+import multiprocessing
+import time
+
+import pytest
+
+from app.migrations.dedupe_transaction_ids import dedupe_transaction_ids
+from app.services.id_generator import ULIDGenerator, SnowflakeIdGenerator
+
+PROCESSES = 4
+IDS_PER_PROCESS = 100_000
+# Combined rate was about 200k/s (ULID) and 480k/s (Snowflake) on a single
+# core; the floor leaves room for slow CI machines
+MIN_IDS_PER_SECOND = 50_000
+
+
+def issue_ids(kind, worker_id, count, start_event, results):
+    generator = ULIDGenerator() if kind == "ulid" else SnowflakeIdGenerator(worker_id)
+    start_event.wait()
+    started = time.perf_counter()
+    ids = [generator.new_id() for _ in range(count)]
+    results.put((worker_id, time.perf_counter() - started, ids))
+
+
+@pytest.mark.parametrize("kind", ["ulid", "snowflake"])
+def test_ids_never_collide_across_processes(kind):
+    context = multiprocessing.get_context("spawn")
+    start_event = context.Event()
+    results = context.Queue()
+    workers = [
+        context.Process(target=issue_ids, args=(kind, worker_id, IDS_PER_PROCESS, start_event, results))
+        for worker_id in range(PROCESSES)
+    ]
+    for worker in workers:
+        worker.start()
+    start_event.set()
+    outputs = [results.get(timeout=120) for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    all_ids = set()
+    slowest = 0.0
+    for _, elapsed, ids in outputs:
+        # Sortable and strictly increasing within a process
+        key = int if kind == "snowflake" else str
+        assert [key(i) for i in ids] == sorted(key(i) for i in ids)
+        assert len(set(ids)) == len(ids)
+        all_ids.update(ids)
+        slowest = max(slowest, elapsed)
+
+    assert len(all_ids) == PROCESSES * IDS_PER_PROCESS
+    rate = PROCESSES * IDS_PER_PROCESS / slowest
+    assert rate >= MIN_IDS_PER_SECOND, f"{kind}: {rate:,.0f} ids/s across {PROCESSES} processes"
+
+
+def test_duplicated_transaction_ids_are_renamed_except_the_oldest(db):
+    db["Billing"].insert_many([
+        {"transaction_id": "CARD_20250501090000", "patient_email": "alice@example.com"},
+        {"transaction_id": "CARD_20250501090000", "patient_email": "bob@example.com"},
+        {"transaction_id": "CARD_20250501090000", "patient_email": "carol@example.com"},
+        {"transaction_id": "CARD_20250501090001", "patient_email": "dave@example.com"},
+    ])
+    db["Appointments"].insert_one({"payment_id": "CARD_20250501090000"})
+
+    renamed, affected = dedupe_transaction_ids(db["Billing"], db["Appointments"], ULIDGenerator())
+
+    assert (renamed, affected) == (2, ["CARD_20250501090000"])
+    kept = db["Billing"].find_one({"transaction_id": "CARD_20250501090000"})
+    assert kept["patient_email"] == "alice@example.com"
+    for payment in db["Billing"].find({"original_transaction_id": "CARD_20250501090000"}):
+        assert payment["transaction_id"].startswith("CARD_20250501090000-")
+    assert len(db["Billing"].distinct("transaction_id")) == 4
+    assert dedupe_transaction_ids(db["Billing"], db["Appointments"]) == (0, [])
+
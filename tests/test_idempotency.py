@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from app.services.idempotency_store import (
+    IdempotencyStore, IDEMPOTENCY_COMPLETED, IDEMPOTENCY_IN_PROGRESS, IDEMPOTENCY_STARTED
+)
+
+
+def payment_request(**overrides):
+    return {
+        "patient_email": "alice@example.com",
+        "patient_name": "Alice",
+        "doctor_email": "doctor@example.com",
+        "doctor_name": "Doctor",
+        "amount": "1500.00",
+        "card_number": "4111 1111 1111 1111",
+        "card_holder": "Alice",
+        "expiry_date": "12/30",
+        "schedule_date": "2025-05-01",
+        "schedule_time": "09:00",
+        **overrides
+    }
+
+
+def test_retried_payment_is_replayed_not_charged_twice(api, api_db, auth):
+    headers = {**auth("alice@example.com", "patient"), "Idempotency-Key": uuid4().hex}
+
+    first = api.post("/api/billing/", headers=headers, json=payment_request())
+    retry = api.post("/api/billing/", headers=headers, json=payment_request())
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert retry.get_json() == first.get_json()
+    assert api_db["Billing"].count_documents({}) == 1
+
+
+def test_key_reused_with_another_body_is_rejected(api, api_db, auth):
+    headers = {**auth("alice@example.com", "patient"), "Idempotency-Key": uuid4().hex}
+
+    assert api.post("/api/billing/", headers=headers, json=payment_request()).status_code == 201
+    response = api.post("/api/billing/", headers=headers, json=payment_request(amount="99.00"))
+
+    assert response.status_code == 422
+    assert api_db["Billing"].count_documents({}) == 1
+
+
+def test_keys_are_scoped_to_the_caller(api, api_db, auth):
+    key = uuid4().hex
+
+    api.post("/api/billing/", headers={**auth("alice@example.com", "patient"), "Idempotency-Key": key},
+             json=payment_request())
+    response = api.post("/api/billing/", headers={**auth("bob@example.com", "patient"), "Idempotency-Key": key},
+                        json=payment_request(patient_email="bob@example.com"))
+
+    assert response.status_code == 201
+    assert "Idempotent-Replayed" not in response.headers
+    assert api_db["Billing"].count_documents({}) == 2
+
+
+def test_requests_without_a_key_are_not_deduplicated(api, api_db, auth):
+    api.post("/api/billing/", headers=auth("alice@example.com", "patient"), json=payment_request())
+    api.post("/api/billing/", headers=auth("alice@example.com", "patient"), json=payment_request())
+
+    assert api_db["Billing"].count_documents({}) == 2
+
+
+def test_a_lapsed_claim_is_taken_over_once(db):
+    store = IdempotencyStore(db["IdempotencyKeys"], lease_seconds=60)
+    assert store.begin("live", "body") == (IDEMPOTENCY_STARTED, None)
+    # Claimed by a process that died before answering
+    db["IdempotencyKeys"].insert_one({
+        "_id": "crashed", "fingerprint": "body", "status": IDEMPOTENCY_IN_PROGRESS,
+        "created_at": datetime.utcnow(), "locked_until": datetime.utcnow() - timedelta(seconds=1)
+    })
+
+    assert store.begin("live", "body") == (IDEMPOTENCY_IN_PROGRESS, None)
+    assert store.begin("crashed", "body") == (IDEMPOTENCY_STARTED, None)
+    assert store.begin("crashed", "body") == (IDEMPOTENCY_IN_PROGRESS, None)
+
+    store.complete("crashed", 201, {"ok": True})
+    assert store.begin("crashed", "body") == (IDEMPOTENCY_COMPLETED, {"status": 201, "body": {"ok": True}})
+
+
+def test_cached_responses_expire_with_the_record(db):
+    store = IdempotencyStore(db["IdempotencyKeys"], ttl_seconds=3600)
+    store.begin("key", "body")
+    store.complete("key", 201, {"ok": True})
+    # What the TTL monitor does once created_at is an hour old
+    db["IdempotencyKeys"].delete_one({"_id": "key"})
+    store._cache["key"]["created_at"] -= timedelta(hours=1)
+
+    assert store.begin("key", "body") == (IDEMPOTENCY_STARTED, None)
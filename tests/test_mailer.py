@@ -0,0 +1,113 @@
+import socketserver
+import threading
+import time
+
+import pytest
+
+from app.utils.mailer import MailQueue, OTPEmailTemplate, SMTPConnectionPool
+
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    """
+    Just enough SMTP to accept mail locally. fail_data_replies makes the
+    next N DATA commands answer 451 so retries can be exercised.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StandInSMTPHandler)
+        self.messages = []
+        self.connections = 0
+        self.fail_data_replies = 0
+        self.lock = threading.Lock()
+
+
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 stand-in ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("ascii").strip().upper()
+            if command.startswith("EHLO"):
+                self.reply("250 stand-in")
+            elif command.startswith("DATA"):
+                with server.lock:
+                    failing = server.fail_data_replies > 0
+                    server.fail_data_replies -= 1 if failing else 0
+                if failing:
+                    self.reply("451 try again later")
+                    continue
+                self.reply("354 go ahead")
+                body = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if data_line in (b".\r\n", b""):
+                        break
+                    body.append(data_line)
+                with server.lock:
+                    server.messages.append(b"".join(body))
+                self.reply("250 queued")
+            elif command.startswith("QUIT"):
+                self.reply("221 bye")
+                return
+            else:
+                # MAIL, RCPT, RSET, NOOP
+                self.reply("250 ok")
+
+
+@pytest.fixture
+def smtp_server():
+    server = StandInSMTPServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_queue(server, **kwargs):
+    host, port = server.server_address
+    pool = SMTPConnectionPool(host, port, use_tls=False, size=1)
+    return MailQueue(pool, "hms@example.com", **kwargs)
+
+
+def test_emails_reuse_one_connection(smtp_server):
+    template = OTPEmailTemplate("hms@example.com")
+    mail_queue = make_queue(smtp_server)
+    for i, otp in enumerate(["111111", "222222", "333333"]):
+        mail_queue.enqueue(f"user{i}@example.com", template.render(f"user{i}@example.com", otp))
+    assert mail_queue.flush(timeout=5)
+    mail_queue.shutdown()
+
+    assert smtp_server.connections == 1
+    assert len(smtp_server.messages) == 3
+    assert b"To: user1@example.com" in smtp_server.messages[1]
+    assert b"222222" in smtp_server.messages[1]
+
+
+def test_transient_failure_is_retried(smtp_server):
+    smtp_server.fail_data_replies = 2
+    template = OTPEmailTemplate("hms@example.com")
+    mail_queue = make_queue(smtp_server, backoff_base=0.01)
+    mail_queue.enqueue("user@example.com", template.render("user@example.com", "424242"))
+
+    deadline = time.monotonic() + 5
+    while not smtp_server.messages and time.monotonic() < deadline:
+        time.sleep(0.01)
+    mail_queue.shutdown()
+    assert len(smtp_server.messages) == 1
+    assert b"424242" in smtp_server.messages[0]
+
+
+def test_header_injection_is_rejected():
+    with pytest.raises(ValueError):
+        OTPEmailTemplate("hms@example.com").render("victim@example.com\r\nBcc: x@example.com", "123456")
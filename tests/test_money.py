@@ -0,0 +1,45 @@
+from decimal import Decimal
+
+import pytest
+
+from app.utils.money import Money, InvalidAmountError
+
+
+@pytest.mark.parametrize("value, cents", [
+    ("12.50", 1250),
+    (" 12.5 ", 1250),
+    (12.5, 1250),
+    (12, 1200),
+    (0.1, 10),
+    (Decimal("19.999"), 2000),
+    ("0.005", 1),
+])
+def test_parse_to_cents(value, cents):
+    assert Money.parse(value).cents == cents
+
+
+@pytest.mark.parametrize("value", [None, "", "abc", "NaN", "inf", True, [1], "1e30", "92233720368547758.08"])
+def test_parse_rejects_non_numbers(value):
+    with pytest.raises(InvalidAmountError):
+        Money.parse(value)
+
+
+def test_cents_must_fit_in_int64():
+    assert Money.parse("92233720368547758.07").cents == 2 ** 63 - 1
+    with pytest.raises(InvalidAmountError):
+        Money(2 ** 63 - 1) + Money(1)
+
+
+def test_document_round_trip_prefers_cents():
+    doc = Money.parse("1234.56").to_document()
+    assert doc == {"amount": 1234.56, "amount_cents": 123456}
+    assert Money.from_document({"amount": "999", "amount_cents": 123456}) == Money(123456)
+    assert Money.from_document({"amount": "7.10"}) == Money(710)
+
+
+def test_sums_are_exact():
+    total = Money(0)
+    for _ in range(10):
+        total = total + Money.parse(0.1)
+    assert total == Money.parse("1.00")
+    assert str(total) == "1.00"
@@ -0,0 +1,42 @@
+import pytest
+
+from app.services.otp_store import (
+    InMemoryOTPStore, MongoOTPStore,
+    OTP_VALID, OTP_INVALID, OTP_EXPIRED, OTP_NOT_FOUND, OTP_TOO_MANY_ATTEMPTS
+)
+
+EMAIL = "patient@example.com"
+
+
+@pytest.fixture(params=["memory", "mongo"])
+def store(request):
+    if request.param == "memory":
+        return InMemoryOTPStore(max_attempts=3, secret="test")
+    return MongoOTPStore(request.getfixturevalue("db")["OTPs"], max_attempts=3, secret="test")
+
+
+def test_codes_are_single_use(store):
+    store.issue(EMAIL, "login", "123456")
+
+    assert store.verify(EMAIL, "signup", "123456") == OTP_NOT_FOUND
+    assert store.verify(EMAIL, "login", "123456") == OTP_VALID
+    assert store.verify(EMAIL, "login", "123456") == OTP_NOT_FOUND
+
+
+def test_attempts_are_limited_even_for_the_right_code(store):
+    store.issue(EMAIL, "login", "123456")
+
+    assert [store.verify(EMAIL, "login", "000000") for _ in range(3)] == [OTP_INVALID] * 3
+    assert store.verify(EMAIL, "login", "123456") == OTP_TOO_MANY_ATTEMPTS
+    assert store.verify(EMAIL, "login", "123456") == OTP_NOT_FOUND
+
+    # A new code starts a fresh count
+    store.issue(EMAIL, "login", "654321")
+    assert store.verify(EMAIL, "login", "654321") == OTP_VALID
+
+
+def test_expired_codes_are_rejected(store):
+    store.issue(EMAIL, "signup", "123456", ttl_seconds=-1)
+
+    assert store.verify(EMAIL, "signup", "123456") == OTP_EXPIRED
+    assert store.verify(EMAIL, "signup", "123456") == OTP_NOT_FOUND
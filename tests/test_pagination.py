@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+from app.utils.pagination import paginate
+
+
+def test_pages_split_equal_sort_values_without_gaps_or_repeats(db):
+    collection = db["Appointments"]
+    start = datetime(2025, 5, 1, 10, 0)
+    # Five appointments share one time, so pages must break ties by _id
+    collection.insert_many(
+        [{"scheduled_at": start} for _ in range(5)]
+        + [{"scheduled_at": start - timedelta(hours=1)}, {"scheduled_at": start + timedelta(hours=1)}]
+    )
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = paginate(collection, {}, "scheduled_at", 2, cursor=cursor)
+        seen.extend(page)
+        if cursor is None:
+            break
+
+    expected = list(collection.find().sort([("scheduled_at", 1), ("_id", 1)]))
+    assert [doc["_id"] for doc in seen] == [doc["_id"] for doc in expected]
+
+
+def test_pages_continue_past_missing_and_null_sort_values(db):
+    collection = db["Appointments"]
+    # Appointments whose date/time never parsed have no scheduled_at; they sort first
+    collection.insert_many(
+        [{"scheduled_at": None}, {}, {"scheduled_at": None}]
+        + [{"scheduled_at": datetime(2025, 5, 1, hour)} for hour in (9, 10, 11)]
+    )
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = paginate(collection, {}, "scheduled_at", 2, cursor=cursor)
+        seen.extend(page)
+        if cursor is None:
+            break
+
+    expected = list(collection.find().sort([("scheduled_at", 1), ("_id", 1)]))
+    assert [doc["_id"] for doc in seen] == [doc["_id"] for doc in expected]
+    assert len(seen) == 6
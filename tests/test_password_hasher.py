@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+
+from app.utils import encryption
+from app.utils.encryption import PasswordHasher, PasswordHasherBusyError, hash_rounds
+
+
+def test_pool_bounds_concurrent_hashes(monkeypatch):
+    running, peak, lock = [0], [0], threading.Lock()
+
+    def slow_hash(password, rounds):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return f"hash-of-{password}"
+
+    monkeypatch.setattr(encryption, "_hash", slow_hash)
+    hasher = PasswordHasher(rounds=4, pool_size=2)
+    futures = [hasher.hash_async(str(i)) for i in range(8)]
+
+    assert [f.result() for f in futures] == [f"hash-of-{i}" for i in range(8)]
+    assert peak[0] == 2
+    hasher.shutdown()
+
+
+def test_waiting_is_bounded_and_abandoned_work_cancelled(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(encryption, "_hash", lambda password, rounds: release.wait(5) and password)
+    hasher = PasswordHasher(rounds=4, pool_size=1, max_wait=0.05)
+    busy = hasher.hash_async("first")
+
+    queued = hasher.hash_async("second")
+    with pytest.raises(PasswordHasherBusyError):
+        hasher.wait(queued)
+    assert queued.cancelled()
+
+    release.set()
+    assert busy.result(5) == "first"
+    hasher.shutdown()
+
+
+def test_only_weaker_hashes_need_rehashing():
+    hasher = PasswordHasher(rounds=5)
+
+    assert hasher.needs_rehash(encryption._hash("secret", 4))
+    assert not hasher.needs_rehash(encryption._hash("secret", 5))
+    assert not hasher.needs_rehash(encryption._hash("secret", 6))
+
+
+def test_failed_background_rehash_is_logged_not_stored(monkeypatch, caplog):
+    def broken_hash(password, rounds):
+        raise ValueError("bcrypt unavailable")
+    monkeypatch.setattr(encryption, "_hash", broken_hash)
+    monkeypatch.setattr(encryption, "password_hasher", PasswordHasher(rounds=4, pool_size=1))
+    stored = []
+
+    future = encryption.rehash_in_background("secret", stored.append)
+    # Joins the worker, so the done callback has run
+    encryption.password_hasher.shutdown()
+
+    assert isinstance(future.exception(), ValueError)
+    assert stored == []
+    assert "Password rehash failed: bcrypt unavailable" in caplog.text
+
+
+def test_login_upgrades_an_outdated_hash(api, api_db, monkeypatch):
+    from app.controllers.auth_controller import email_notifier
+
+    monkeypatch.setattr(encryption.password_hasher, "rounds", 5)
+    monkeypatch.setattr(email_notifier, "mailer", lambda to_email, otp: True)
+    api_db["Users"].insert_many([
+        {"email": "old@example.com", "password": encryption._hash("secret", 4), "is_verified": True},
+        {"email": "strong@example.com", "password": encryption._hash("secret", 6), "is_verified": True},
+    ])
+
+    for email in ("old@example.com", "strong@example.com"):
+        response = api.post("/api/auth/login", json={"email": email, "password": "secret"})
+        assert response.status_code == 200
+
+    deadline = time.monotonic() + 5
+    while hash_rounds(api_db["Users"].find_one({"email": "old@example.com"})["password"]) != 5:
+        assert time.monotonic() < deadline, "hash was not upgraded"
+        time.sleep(0.01)
+    upgraded = api_db["Users"].find_one({"email": "old@example.com"})["password"]
+    assert encryption._check(upgraded, "secret")
+    assert hash_rounds(api_db["Users"].find_one({"email": "strong@example.com"})["password"]) == 6
@@ -0,0 +1,75 @@
+from datetime import datetime
+
+
+def seed(api_db):
+    api_db["Prescriptions"].insert_many([
+        {"patient_email": "alice@example.com", "doctor_email": "house@example.com",
+         "disease": f"visit {day}", "created_at": datetime(2025, 5, day)}
+        for day in (1, 2, 3)
+    ] + [
+        {"patient_email": "alice@example.com", "doctor_email": "wilson@example.com",
+         "disease": "wilson's", "created_at": datetime(2025, 5, 4)},
+        {"patient_email": "bob@example.com", "doctor_email": "house@example.com",
+         "disease": "bob's", "created_at": datetime(2025, 5, 5)},
+    ])
+    api_db["Reports"].insert_many([
+        {"patient_email": "alice@example.com", "service": service, "upload_date": datetime(2025, 5, day),
+         "original_sha256": "not shown"}
+        for day, service in ((1, "MRI"), (6, "X-Ray"))
+    ])
+    api_db["Appointments"].insert_many([
+        {"patient_email": "alice@example.com", "doctor_email": doctor, "date": date, "time": "09:00",
+         "scheduled_at": datetime.strptime(date, "%Y-%m-%d").replace(hour=9)}
+        for doctor, date in (("house@example.com", "2025-05-07"), ("wilson@example.com", "2025-05-08"))
+    ])
+    api_db["Billing"].insert_one({
+        "patient_email": "alice@example.com", "transaction_id": "TX-1", "paid_at": datetime(2025, 5, 1, 9, 30)
+    })
+
+
+def test_chart_sections_are_newest_first_and_flag_more(api, api_db, auth):
+    seed(api_db)
+
+    response = api.get("/api/patients/alice@example.com/chart?doctor_email=house@example.com&limit=2",
+                       headers=auth())
+
+    assert response.status_code == 200
+    chart = response.get_json()
+    assert chart["limit"] == 2
+    # Prescriptions and appointments narrowed to the doctor; reports and payments are the patient's
+    assert [p["disease"] for p in chart["prescriptions"]["items"]] == ["visit 3", "visit 2"]
+    assert chart["prescriptions"]["has_more"] is True
+    assert [r["service"] for r in chart["reports"]["items"]] == ["X-Ray", "MRI"]
+    assert chart["reports"]["has_more"] is False
+    assert "original_sha256" not in chart["reports"]["items"][0]
+    assert chart["reports"]["items"][0]["upload_date"] == "2025-05-06T00:00:00"
+    assert chart["payments"] == {
+        "items": [{"patient_email": "alice@example.com", "transaction_id": "TX-1", "paid_at": "2025-05-01 09:30:00"}],
+        "has_more": False
+    }
+    assert [(a["doctor_email"], a["date"]) for a in chart["appointments"]["items"]] == [
+        ("house@example.com", "2025-05-07")
+    ]
+    assert chart["appointments"]["has_more"] is False
+
+
+def test_whole_chart_without_a_doctor(api, api_db, auth):
+    seed(api_db)
+
+    chart = api.get("/api/patients/alice@example.com/chart", headers=auth()).get_json()
+
+    assert chart["limit"] == 20
+    assert [p["disease"] for p in chart["prescriptions"]["items"]] == ["wilson's", "visit 3", "visit 2", "visit 1"]
+    assert chart["prescriptions"]["has_more"] is False
+    assert [a["doctor_email"] for a in chart["appointments"]["items"]] == ["wilson@example.com", "house@example.com"]
+
+
+def test_patients_only_see_their_own_chart(api, api_db, auth):
+    seed(api_db)
+
+    own = api.get("/api/patients/alice@example.com/chart", headers=auth("alice@example.com", "patient"))
+    other = api.get("/api/patients/bob@example.com/chart", headers=auth("alice@example.com", "patient"))
+
+    assert own.status_code == 200
+    assert other.status_code == 403
+    assert api.get("/api/patients/alice@example.com/chart?limit=many", headers=auth()).status_code == 400
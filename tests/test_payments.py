@@ -0,0 +1,37 @@
+def frontend_payment(**overrides):
+    # The body PatientPayment.jsx posts: amount as typed, no amount_cents
+    return {
+        "patient_email": "alice@example.com",
+        "patient_name": "Alice",
+        "doctor_email": "doctor@example.com",
+        "doctor_name": "Doctor",
+        "amount": "500",
+        "card_number": "4111 1111 1111 1111",
+        "card_holder": "Alice",
+        "expiry_date": "12/30",
+        "schedule_date": "2025-05-01",
+        "schedule_time": "09:00",
+        **overrides
+    }
+
+
+def test_payment_from_the_frontend_is_stored_in_cents(api, api_db, auth):
+    response = api.post("/api/billing/", headers=auth("alice@example.com", "patient"), json=frontend_payment())
+
+    assert response.status_code == 201
+    stored = api_db["Billing"].find_one({"transaction_id": response.get_json()["transaction_id"]})
+    assert (stored["amount"], stored["amount_cents"]) == (500.0, 50000)
+    rollup = api_db["RevenueRollups"].find_one({"doctor_email": "doctor@example.com"})
+    assert (rollup["total_cents"], rollup["payments"]) == (50000, 1)
+
+
+def test_invalid_payments_are_rejected(api, api_db, auth):
+    headers = auth("alice@example.com", "patient")
+
+    assert api.post("/api/billing/", headers=headers, json=frontend_payment(amount="5OO")).status_code == 400
+    assert api.post("/api/billing/", headers=headers, json=frontend_payment(amount="0")).status_code == 400
+    assert api.post("/api/billing/", headers=headers, json=frontend_payment(amount="1e30")).status_code == 400
+    assert api.post("/api/billing/", headers=headers, json=frontend_payment(card_number="1234")).status_code == 400
+    response = api.post("/api/billing/", headers=headers, json=frontend_payment(card_holder=""))
+    assert response.get_json()["error"] == "Missing required payment fields: card_holder"
+    assert api_db["Billing"].count_documents({}) == 0
@@ -0,0 +1,42 @@
+import io
+
+from reportlab.pdfgen import canvas
+
+from app.services.pdf_text import PdfTextCache, backfill
+from app.utils.files import file_sha256
+
+
+def make_pdf(path, pages):
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer)
+    for number in range(1, pages + 1):
+        pdf.drawString(72, 720, f"Page {number} findings")
+        pdf.showPage()
+    pdf.save()
+    path.write_bytes(buffer.getvalue())
+    return str(path)
+
+
+def test_page_range_extracts_only_requested_pages(tmp_path):
+    path = make_pdf(tmp_path / "report.pdf", 5)
+    digest = file_sha256(path)
+    cache = PdfTextCache(str(tmp_path / "cache"))
+
+    texts = cache.pages(path, digest, 2, 3)
+    assert ["Page 2" in texts[0], "Page 3" in texts[1]] == [True, True]
+    assert cache.stats() == {"pages_extracted": 2, "pages_cached": 0}
+
+    assert cache.page_count(path, digest) == 5
+    assert "Page 5" in cache.text(path, digest, 3)
+    assert cache.stats() == {"pages_extracted": 4, "pages_cached": 1}
+
+
+def test_cached_pages_do_not_need_the_pdf(tmp_path):
+    path = make_pdf(tmp_path / "report.pdf", 3)
+    digest = file_sha256(path)
+    directory = str(tmp_path / "cache")
+
+    assert list(backfill([(path, digest)], directory, workers=1)) == [(digest, 3)]
+
+    (tmp_path / "report.pdf").unlink()
+    assert "Page 3" in PdfTextCache(directory).text(path, digest)
@@ -0,0 +1,52 @@
+import hashlib
+import os
+
+NAME = "report_20250420_123338.json"
+PATH = os.path.join(os.path.dirname(__file__), "..", "uploads", "reports", NAME)
+
+
+def content():
+    with open(PATH, "rb") as f:
+        return f.read()
+
+
+def test_download_carries_a_content_etag(api, auth):
+    response = api.get(f"/api/reports/download/{NAME}", headers=auth())
+
+    assert response.status_code == 200
+    assert response.data == content()
+    assert response.headers["ETag"] == f'"{hashlib.sha256(content()).hexdigest()}"'
+    assert response.headers["Accept-Ranges"] == "bytes"
+    # A legacy name can be overwritten, so clients must revalidate
+    assert "no-cache" in response.headers["Cache-Control"]
+
+
+def test_matching_etag_is_answered_with_304(api, auth):
+    etag = api.get(f"/api/reports/download/{NAME}", headers=auth()).headers["ETag"]
+
+    response = api.get(f"/api/reports/download/{NAME}", headers={**auth(), "If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.data == b""
+
+
+def test_range_is_answered_with_206(api, auth):
+    size = len(content())
+
+    response = api.get(f"/api/reports/download/{NAME}", headers={**auth(), "Range": "bytes=10-19"})
+
+    assert response.status_code == 206
+    assert response.data == content()[10:20]
+    assert response.headers["Content-Range"] == f"bytes 10-19/{size}"
+
+    # A resumed download whose copy is outdated gets the whole file again
+    response = api.get(f"/api/reports/download/{NAME}", headers={**auth(), "Range": "bytes=10-19", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.data == content()
+
+    response = api.get(f"/api/reports/download/{NAME}", headers={**auth(), "Range": f"bytes={size}-"})
+    assert response.status_code == 416
+
+
+def test_missing_file_is_404(api, auth):
+    assert api.get("/api/reports/download/report_19990101_000000.json", headers=auth()).status_code == 404
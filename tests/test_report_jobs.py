@@ -0,0 +1,59 @@
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+from app.services.report_jobs import ReportJobQueue, JOB_QUEUED, JOB_RUNNING
+
+
+def running_job(collection, claimed_at):
+    return collection.insert_one({
+        "status": JOB_RUNNING, "claimed_at": claimed_at, "updated_at": claimed_at
+    }).inserted_id
+
+
+def test_only_abandoned_jobs_are_requeued(db):
+    queue = ReportJobQueue(db["ReportJobs"], db["Reports"], blob_store=None, lease_seconds=60)
+    long_ago = datetime.now() - timedelta(minutes=10)
+    abandoned = running_job(db["ReportJobs"], long_ago)
+    rendering_here = running_job(db["ReportJobs"], long_ago)   # a slow render outliving its lease
+    recent = running_job(db["ReportJobs"], datetime.now())
+    queue._in_flight.add(rendering_here)
+
+    queue._requeue_expired()
+
+    status = {job["_id"]: job for job in db["ReportJobs"].find()}
+    assert status[abandoned]["status"] == JOB_QUEUED
+    assert status[rendering_here]["status"] == JOB_RUNNING
+    assert status[recent]["status"] == JOB_RUNNING
+    # Its lease was renewed, so other server processes leave it alone too
+    assert status[rendering_here]["claimed_at"] > long_ago + timedelta(minutes=9)
+
+
+class ScratchBlobs:
+    def tmp_path(self):
+        return "/nonexistent/render.tmp"
+
+    def put_file(self, tmp_path, *args):
+        raise AssertionError("nothing renders in this test")
+
+
+def test_a_failed_submit_does_not_strand_the_job(db):
+    queue = ReportJobQueue(db["ReportJobs"], db["Reports"], blob_store=ScratchBlobs())
+    report_id = db["Reports"].insert_one({"service": "MRI"}).inserted_id
+    job = {"report_id": report_id, "status": JOB_RUNNING, "outputs": ["pdf", "json"], "completed": [],
+           "attempts": 1, "claimed_at": datetime.now()}
+    job["_id"] = db["ReportJobs"].insert_one(job).inserted_id
+
+    def submit(*args):
+        # The pdf render starts and fails, then the pool cannot take the json one
+        if args[1] == "json":
+            raise RuntimeError("pool unavailable")
+        future = Future()
+        future.set_exception(ValueError("render failed"))
+        return future
+    queue._submit = submit
+
+    queue._dispatch(job)
+
+    assert queue._in_flight == set()
+    stored = db["ReportJobs"].find_one({"_id": job["_id"]})
+    assert (stored["status"], stored["error"]) == (JOB_QUEUED, "pool unavailable")
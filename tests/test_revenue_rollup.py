@@ -0,0 +1,35 @@
+from app.services.revenue_rollup import RevenueRollup
+
+
+def payment(day, doctor, cents):
+    return {"payment_date": day, "doctor_email": f"{doctor}@example.com", "amount": cents / 100, "amount_cents": cents}
+
+
+def test_recorded_payments_and_a_rebuild_agree(db):
+    rollup = RevenueRollup(db["RevenueRollups"], db["Billing"])
+    payments = [
+        payment("2025-05-01", "house", 150000),
+        payment("2025-05-01", "house", 2550),
+        payment("2025-05-02", "wilson", 99999),
+    ]
+    for billing in payments:
+        db["Billing"].insert_one(billing)
+        rollup.record_payment(billing)
+
+    assert rollup.totals() == [{"totalEarnings": 2525.49, "payments": 3}]
+    assert rollup.totals("2025-05-02", "2025-05-02") == [{"totalEarnings": 999.99, "payments": 1}]
+    assert rollup.rebuild() == 2
+    assert rollup.totals() == [{"totalEarnings": 2525.49, "payments": 3}]
+
+
+def test_rollups_are_seeded_only_when_empty(db):
+    rollup = RevenueRollup(db["RevenueRollups"], db["Billing"])
+    assert rollup.seed_if_empty() == 0
+
+    db["Billing"].insert_many([payment("2025-05-01", "house", 1000), payment("2025-05-03", "house", 500)])
+    assert rollup.seed_if_empty() == 2
+    assert rollup.totals() == [{"totalEarnings": 15.0, "payments": 2}]
+
+    db["Billing"].insert_one(payment("2025-05-04", "house", 700))
+    assert rollup.seed_if_empty() == 0
+    assert rollup.totals() == [{"totalEarnings": 15.0, "payments": 2}]
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from bson import ObjectId
+
+from app.services.search_index import SearchIndex, MAX_TEXT_CHARS, SUMMARY_CHARS
+
+
+def test_prescription_entry_indexes_medicine_names():
+    entry = SearchIndex.prescription_entry({
+        "_id": ObjectId(),
+        "symptoms": "fever, cough",
+        "disease": "Influenza",
+        "medicines": [{"medicine": "Oseltamivir", "timetable": "1-0-1"}, {"medicine": "", "timetable": ""}],
+        "patient_email": "patient@example.com",
+        "created_at": datetime(2025, 5, 1)
+    })
+
+    assert entry["kind"] == "prescription"
+    assert entry["title"] == "Influenza"
+    assert entry["medicines"] == ["Oseltamivir"]
+    assert entry["summary"] == "fever, cough · Oseltamivir"
+
+
+def test_report_entry_bounds_text_and_summary():
+    entry = SearchIndex.report_entry(
+        {"_id": ObjectId(), "service": "Chest X-ray", "original_filename": "xray.pdf"},
+        "word " * MAX_TEXT_CHARS
+    )
+
+    assert entry["title"] == "Chest X-ray"
+    assert entry["text"].startswith("Chest X-ray xray.pdf word")
+    assert len(entry["text"]) <= MAX_TEXT_CHARS + len("Chest X-ray xray.pdf ")
+    assert len(entry["summary"]) == SUMMARY_CHARS
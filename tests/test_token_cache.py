@@ -0,0 +1,77 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from pymongo.errors import PyMongoError
+
+from app.middleware import auth_middleware
+from app.services.token_cache import VerifiedTokenCache, TokenRevocationList
+
+
+class EmptyCollection:
+    def find(self, query, projection=None):
+        return []
+
+    def find_one(self, query, projection=None):
+        return None
+
+
+def test_counters_are_exact_under_concurrent_requests():
+    cache = VerifiedTokenCache(max_entries=10, max_ttl=60)
+    cache.put("known", {"email": "user@example.com", "exp": time.time() + 60})
+    revocations = TokenRevocationList(EmptyCollection(), refresh_interval=3600)
+
+    def request(i):
+        cache.get("known" if i % 2 else f"unknown-{i}")
+        revocations.is_revoked(f"token-{i}")
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(request, range(20000)))
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (10000, 10000)
+    assert revocations.stats()["checks"] == 20000
+
+
+def test_entries_never_outlive_the_token():
+    cache = VerifiedTokenCache(max_entries=10, max_ttl=60)
+    cache.put("expired", {"exp": time.time() - 1})
+
+    assert cache.get("expired") is None
+    assert cache.stats()["size"] == 0
+
+
+class RevokedTokens:
+    def __init__(self):
+        self.docs = []
+
+    def find(self, query, projection=None):
+        since = query.get("revoked_at", {}).get("$gte", datetime.min)
+        return [{"_id": doc["_id"]} for doc in self.docs if doc["revoked_at"] >= since]
+
+    def find_one(self, query, projection=None):
+        return next(({"_id": doc["_id"]} for doc in self.docs if doc["_id"] == query["_id"]), None)
+
+
+def test_refresh_overlaps_revocations_stamped_by_a_slower_clock():
+    collection = RevokedTokens()
+    revocations = TokenRevocationList(collection, refresh_interval=0.001, clock_skew=30)
+    assert not revocations.is_revoked("first")
+
+    # Revoked by a node whose clock runs 10 seconds behind ours
+    collection.docs.append({"_id": "late", "revoked_at": datetime.utcnow() - timedelta(seconds=10)})
+    time.sleep(0.01)
+
+    assert revocations.is_revoked("late")
+    assert revocations.stats()["filter_hits"] == 1
+
+
+def test_requests_fail_closed_when_revocations_cannot_be_read(api, auth, monkeypatch):
+    def unreachable(token_id):
+        raise PyMongoError("RevokedTokens unreachable")
+    monkeypatch.setattr(auth_middleware.revocation_list, "is_revoked", unreachable)
+
+    response = api.get("/api/appointments/", headers=auth())
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
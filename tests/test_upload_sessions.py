@@ -0,0 +1,161 @@
+import hashlib
+import io
+import os
+import time
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
+
+pymongo = pytest.importorskip("pymongo")
+
+from pymongo.errors import PyMongoError
+from app.services.blob_store import BlobStore
+from app.services.upload_sessions import (
+    UploadSessionStore, UploadError, UploadIncompleteError, UploadOffsetMismatchError, UploadTooLargeError,
+    UPLOAD_OPEN
+)
+
+
+@pytest.fixture
+def upload_sessions(tmp_path):
+    client = pymongo.MongoClient(
+        os.getenv("TEST_MONGO_URI", "mongodb://localhost:27017"),
+        serverSelectionTimeoutMS=500
+    )
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip("MongoDB is not reachable, set TEST_MONGO_URI")
+
+    db = client[f"HMS_Test_{uuid4().hex[:12]}"]
+    blob_store = BlobStore(str(tmp_path / "blobs"), db["Blobs"])
+    yield UploadSessionStore(db["UploadSessions"], str(tmp_path / "partial"), blob_store, max_bytes=1000)
+    client.drop_database(db.name)
+    client.close()
+
+
+def test_resumed_upload_is_hashed_and_stored(upload_sessions):
+    payload = os.urandom(600)
+    session = upload_sessions.create("doc@example.com", "scan.pdf", len(payload), {"service": "MRI"})
+    session_id = str(session["_id"])
+
+    assert upload_sessions.write_chunk(session_id, "doc@example.com", 0, io.BytesIO(payload[:250])) == 250
+    with pytest.raises(UploadOffsetMismatchError) as mismatch:
+        upload_sessions.write_chunk(session_id, "doc@example.com", 0, io.BytesIO(payload[:250]))
+    assert mismatch.value.offset == 250
+    with pytest.raises(UploadIncompleteError):
+        upload_sessions.finalize(session_id, "doc@example.com")
+
+    upload_sessions._hashers.clear()  # as if another worker takes over
+    upload_sessions.write_chunk(session_id, "doc@example.com", 250, io.BytesIO(payload[250:]))
+    session, (digest, size) = upload_sessions.finalize(session_id, "doc@example.com")
+
+    assert (digest, size) == (hashlib.sha256(payload).hexdigest(), len(payload))
+    with open(upload_sessions.blob_store.path(digest), "rb") as f:
+        assert f.read() == payload
+    upload_sessions.complete(session["_id"], report_id=None)
+    assert not os.path.exists(upload_sessions.part_path(session["_id"]))
+
+
+def test_chunks_past_the_declared_size_are_rejected(upload_sessions):
+    session = upload_sessions.create("doc@example.com", "scan.pdf", 10, {})
+    with pytest.raises(UploadTooLargeError):
+        upload_sessions.write_chunk(str(session["_id"]), "doc@example.com", 0, io.BytesIO(b"x" * 11))
+    with pytest.raises(UploadTooLargeError):
+        upload_sessions.create("doc@example.com", "scan.pdf", 1001, {})
+
+
+def test_an_unacknowledged_chunk_leaves_the_running_hash_intact(upload_sessions, monkeypatch):
+    payload = os.urandom(300)
+    session = upload_sessions.create("doc@example.com", "scan.pdf", len(payload), {})
+    session_id = str(session["_id"])
+    upload_sessions.write_chunk(session_id, "doc@example.com", 0, io.BytesIO(payload[:100]))
+
+    # The bytes are written but the offset is never acknowledged
+    collection = upload_sessions.collection
+    update_one = collection.update_one
+
+    def unreachable(*args, **kwargs):
+        monkeypatch.setattr(collection, "update_one", update_one)
+        raise PyMongoError("connection reset")
+    monkeypatch.setattr(collection, "update_one", unreachable)
+    with pytest.raises(PyMongoError):
+        upload_sessions.write_chunk(session_id, "doc@example.com", 100, io.BytesIO(payload[100:200]))
+
+    upload_sessions.write_chunk(session_id, "doc@example.com", 100, io.BytesIO(payload[100:]))
+    _, (digest, _) = upload_sessions.finalize(session_id, "doc@example.com")
+
+    assert digest == hashlib.sha256(payload).hexdigest()
+
+
+def test_reopened_upload_can_be_finalized_again(upload_sessions):
+    payload = os.urandom(200)
+    session = upload_sessions.create("doc@example.com", "scan.pdf", len(payload), {})
+    session_id = str(session["_id"])
+    upload_sessions.write_chunk(session_id, "doc@example.com", 0, io.BytesIO(payload))
+    lock = upload_sessions._session_lock(session["_id"])
+
+    _, (digest, _) = upload_sessions.finalize(session_id, "doc@example.com")
+    with pytest.raises(UploadError):
+        upload_sessions.finalize(session_id, "doc@example.com")
+    # As the controller does when the report cannot be inserted
+    upload_sessions.blob_store.release(digest)
+    upload_sessions.reopen(session["_id"])
+
+    assert upload_sessions.get(session_id, "doc@example.com")["status"] == UPLOAD_OPEN
+    assert upload_sessions._session_lock(session["_id"]) is lock
+    _, (again, _) = upload_sessions.finalize(session_id, "doc@example.com")
+    assert again == digest
+    assert upload_sessions.blob_store.collection.find_one({"_id": digest})["refcount"] == 1
+    with open(upload_sessions.blob_store.path(digest), "rb") as f:
+        assert f.read() == payload
+
+
+def test_only_one_process_writes_a_range(upload_sessions):
+    payload = os.urandom(400)
+    session = upload_sessions.create("doc@example.com", "scan.pdf", len(payload), {})
+    session_id = str(session["_id"])
+    # Another server process sharing the collection and directory
+    other = UploadSessionStore(upload_sessions.collection, upload_sessions.directory, upload_sessions.blob_store)
+    collection = upload_sessions.collection
+
+    collection.update_one({"_id": session["_id"]}, {"$set": {
+        "writer": "other", "writing_until": datetime.now() + timedelta(minutes=1)
+    }})
+    with pytest.raises(UploadError, match="still writing"):
+        upload_sessions.write_chunk(session_id, "doc@example.com", 0, io.BytesIO(payload[:200]))
+
+    # Its claim lapses while this request writes, and the range is taken over
+    class TakenOver(io.BytesIO):
+        def read(self, size=-1):
+            collection.update_one({"_id": session["_id"]}, {"$set": {"writer": "other"}})
+            return super().read(size)
+    collection.update_one({"_id": session["_id"]}, {"$set": {"writing_until": datetime.now() - timedelta(seconds=1)}})
+    with pytest.raises(UploadOffsetMismatchError):
+        upload_sessions.write_chunk(session_id, "doc@example.com", 0, TakenOver(payload[:200]))
+    assert upload_sessions.get(session_id, "doc@example.com")["received"] == 0
+
+    collection.update_one({"_id": session["_id"]}, {"$set": {"writer": None, "writing_until": None}})
+    upload_sessions.write_chunk(session_id, "doc@example.com", 0, io.BytesIO(payload[:200]))
+    other.write_chunk(session_id, "doc@example.com", 200, io.BytesIO(payload[200:]))
+    # This process did not acknowledge the last chunk, so it hashes the file itself
+    _, (digest, _) = upload_sessions.finalize(session_id, "doc@example.com")
+
+    assert digest == hashlib.sha256(payload).hexdigest()
+    assert upload_sessions.get(session_id, "doc@example.com")["writer"] is None
+
+
+def test_state_of_sessions_that_expired_elsewhere_is_dropped(upload_sessions):
+    first = upload_sessions.create("doc@example.com", "scan.pdf", 10, {})
+    upload_sessions.write_chunk(str(first["_id"]), "doc@example.com", 0, io.BytesIO(b"x" * 5))
+    assert first["_id"] in upload_sessions._locks and first["_id"] in upload_sessions._hashers
+
+    # Not written to for the whole session TTL, so the TTL index removed it
+    upload_sessions._expires[first["_id"]] = time.monotonic() - 1
+    second = upload_sessions.create("doc@example.com", "scan.pdf", 10, {})
+    upload_sessions.write_chunk(str(second["_id"]), "doc@example.com", 0, io.BytesIO(b"y" * 5))
+
+    assert first["_id"] not in upload_sessions._locks
+    assert first["_id"] not in upload_sessions._hashers
+    assert second["_id"] in upload_sessions._locks
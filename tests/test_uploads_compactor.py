@@ -0,0 +1,128 @@
+import io
+import os
+import time
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+pymongo = pytest.importorskip("pymongo")
+
+from pymongo.errors import PyMongoError
+from app.services.blob_store import BlobStore
+from app.services.conversion_cache import ConversionCache
+from app.services.pdf_text import PdfTextCache
+from app.services.upload_sessions import UploadSessionStore
+from app.services.uploads_compactor import UploadsCompactor
+
+
+@pytest.fixture
+def db():
+    client = pymongo.MongoClient(
+        os.getenv("TEST_MONGO_URI", "mongodb://localhost:27017"),
+        serverSelectionTimeoutMS=500
+    )
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip("MongoDB is not reachable, set TEST_MONGO_URI")
+
+    db = client[f"HMS_Test_{uuid4().hex[:12]}"]
+    yield db
+    client.drop_database(db.name)
+    client.close()
+
+
+def write(path, size, age_seconds=7200):
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    stamp = time.time() - age_seconds
+    os.utime(path, (stamp, stamp))
+
+
+def test_orphans_are_reclaimed_and_referenced_files_kept(db, tmp_path):
+    legacy = tmp_path / "reports"
+    legacy.mkdir()
+    blob_store = BlobStore(str(tmp_path / "blobs"), db["Blobs"])
+    upload_sessions = UploadSessionStore(db["UploadSessions"], str(tmp_path / "partial"), blob_store)
+    compactor = UploadsCompactor(
+        db["MaintenanceRuns"], db["Reports"], blob_store, upload_sessions,
+        ConversionCache(str(tmp_path / "cache")), str(legacy), batch_size=2
+    )
+
+    write(legacy / "scan.pdf", 100)
+    write(legacy / "orphan.pdf", 200)
+    write(legacy / "converted_report_1.pdf", 300)
+    write(legacy / "uploading.pdf", 400, age_seconds=0)
+    kept, _ = blob_store.put_stream(io.BytesIO(b"kept"))
+    leaked, _ = blob_store.put_stream(io.BytesIO(b"leaked"))
+    db["Blobs"].update_many({}, {"$set": {"updated_at": datetime(2020, 1, 1)}})
+    db["Reports"].insert_many([
+        {"original_file": "scan.pdf"},
+        {"original_file": BlobStore.name(kept, "pdf"), "original_sha256": kept}
+    ])
+
+    report = compactor.run_once()
+
+    assert sorted(os.listdir(legacy)) == ["scan.pdf", "uploading.pdf"]
+    assert report["orphans_deleted"] == 1
+    assert report["legacy_conversions_deleted"] == 1
+    assert report["refcounts_repaired"] == 1
+    assert report["blobs_collected"] == 1
+    assert report["bytes_reclaimed"] == 200 + 300 + len(b"leaked")
+    assert os.path.exists(blob_store.path(kept))
+    assert not os.path.exists(blob_store.path(leaked))
+    assert compactor.run_once()["bytes_reclaimed"] == 0
+
+
+def test_pdf_text_of_deleted_reports_is_reclaimed(db, tmp_path):
+    blob_store = BlobStore(str(tmp_path / "blobs"), db["Blobs"])
+    pdf_text_cache = PdfTextCache(str(tmp_path / "pdf_text"))
+    compactor = UploadsCompactor(
+        db["MaintenanceRuns"], db["Reports"], blob_store,
+        UploadSessionStore(db["UploadSessions"], str(tmp_path / "partial"), blob_store),
+        ConversionCache(str(tmp_path / "cache")), str(tmp_path), pdf_text_cache=pdf_text_cache
+    )
+
+    kept, deleted = "a" * 64, "b" * 64
+    for digest in (kept, deleted):
+        directory = pdf_text_cache.entry_directory(digest)
+        os.makedirs(directory)
+        write(os.path.join(directory, "00001.txt"), 50)
+        stamp = time.time() - 7200
+        os.utime(directory, (stamp, stamp))
+    db["Reports"].insert_one({"original_file": BlobStore.name(kept, "pdf"), "original_sha256": kept})
+
+    report = compactor.run_once()
+
+    assert report["pdf_text_entries_deleted"] == 1
+    assert report["disk_usage"]["pdf_text"] == 50
+    assert [digest for digest, _ in pdf_text_cache.scan()] == [kept]
+
+
+def test_stored_files_are_left_alone_against_an_unfamiliar_database(db, tmp_path):
+    legacy = tmp_path / "reports"
+    legacy.mkdir()
+    blob_store = BlobStore(str(tmp_path / "blobs"), db["Blobs"])
+    compactor = UploadsCompactor(
+        db["MaintenanceRuns"], db["Reports"], blob_store,
+        UploadSessionStore(db["UploadSessions"], str(tmp_path / "partial"), blob_store),
+        ConversionCache(str(tmp_path / "cache")), str(legacy)
+    )
+    for name in ("a.pdf", "b.pdf", "c.pdf"):
+        write(legacy / name, 100)
+
+    # Fresh database: no reports at all
+    report = compactor.run_once()
+    assert report["sweeps_refused"] == ["reports", "blobs"]
+    assert report["disk_usage"]["reports"] == 300
+
+    # A database naming only one of the files
+    db["Reports"].insert_one({"original_file": "a.pdf"})
+    report = compactor.run_once()
+    assert report["sweeps_refused"] == ["reports"]
+    assert sorted(os.listdir(legacy)) == ["a.pdf", "b.pdf", "c.pdf"]
+
+    db["Reports"].insert_one({"original_file": "b.pdf"})
+    assert compactor.run_once()["orphans_deleted"] == 1
+    assert sorted(os.listdir(legacy)) == ["a.pdf", "b.pdf"]